@@ -0,0 +1,295 @@
+"""Write-behind writer untuk ActivityLog.
+
+Event dari route read-only (decrypt, export) di-queue lalu ditulis dengan satu
+bulk INSERT saat antrian mencapai AUDIT_FLUSH_SIZE atau setiap
+AUDIT_FLUSH_INTERVAL detik, sehingga request tidak menunggu commit log.
+Batch yang gagal dicoba ulang (terpisah dari event baru) sampai AUDIT_MAX_RETRIES
+kali, lalu dipecah dua terus sampai row yang memang tidak bisa ditulis
+terisolasi; row itu dibuang dan dihitung di stats (dropped / errors).
+Route yang memang menulis ke DB cukup menambahkan ActivityLog ke transaksi
+yang sama (lihat log_activity).
+
+Raw log hari yang sudah lewat diringkas ke ActivityRollup (per hari, per
+action, per password) dan raw log yang lebih tua dari ACTIVITY_RETENTION_DAYS
+dihapus, sehingga tabel activity_logs tidak tumbuh terus.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from typing import Optional
+import atexit
+import threading
+import time
+import os
+from database import SessionLocal
+from models import User, ActivityLog, ActivityRollup, Password
+from versioning import bump_versions, prune_tombstones
+
+AUDIT_WRITE_BEHIND = os.getenv("AUDIT_WRITE_BEHIND", "0" if os.getenv("VERCEL") else "1") == "1"
+AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "100"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2"))
+AUDIT_MAX_RETRIES = int(os.getenv("AUDIT_MAX_RETRIES", "3"))  # percobaan per batch sebelum dipecah
+ACTIVITY_RETENTION_DAYS = int(os.getenv("ACTIVITY_RETENTION_DAYS", "90"))  # 0 = simpan raw log selamanya
+ACTIVITY_COMPACT_INTERVAL = float(os.getenv("ACTIVITY_COMPACT_INTERVAL", "3600"))  # detik
+ACTIVITY_COMPACT_CHUNK = int(os.getenv("ACTIVITY_COMPACT_CHUNK", "1000"))  # raw row per transaksi compaction
+
+def log_activity(db: Session, user_id: int, action: str, description: str, password_id: Optional[int] = None) -> ActivityLog:
+    """Tambahkan ActivityLog ke transaksi request (ikut commit yang sama)"""
+    activity = ActivityLog(
+        user_id=user_id,
+        password_id=password_id,
+        action=action,
+        description=description
+    )
+    db.add(activity)
+    return activity
+
+def as_date(value) -> date:
+    # func.date() mengembalikan string di SQLite dan date di Postgres / MySQL
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+def start_of_day(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+def _add_to_rollups(db: Session, user_id: int, counts: dict) -> None:
+    """Tambahkan count ke rollup yang sudah ada, insert kalau key belum ada"""
+    for (day, action, password_id), count in counts.items():
+        updated = db.query(ActivityRollup).filter(
+            ActivityRollup.user_id == user_id,
+            ActivityRollup.day == day,
+            ActivityRollup.action == action,
+            ActivityRollup.password_id == password_id
+        ).update({ActivityRollup.count: ActivityRollup.count + count}, synchronize_session=False)
+        if not updated:
+            db.execute(insert(ActivityRollup), [{
+                "user_id": user_id, "day": day, "action": action, "password_id": password_id, "count": count
+            }])
+
+def compact_activity_logs(db: Session, retention_days: int = ACTIVITY_RETENTION_DAYS, today: Optional[date] = None) -> dict:
+    """Ringkas raw log hari-hari yang sudah selesai ke rollup, lalu hapus raw log lama.
+    
+    Setiap raw row ditandai rolled_up saat dihitung, jadi event yang datang
+    terlambat untuk hari yang sudah diringkas tetap masuk di run berikutnya dan
+    tidak ada row yang dihitung dua kali. Retention hanya menghapus row yang
+    sudah rolled_up.
+    """
+    today = today or datetime.utcnow().date()
+    rolled_up = 0
+    
+    for (user_id,) in db.query(User.id):
+        while True:
+            chunk = db.query(
+                ActivityLog.id, ActivityLog.timestamp, ActivityLog.action, ActivityLog.password_id
+            ).filter(
+                ActivityLog.user_id == user_id,
+                ActivityLog.rolled_up == 0,
+                ActivityLog.timestamp < start_of_day(today)
+            ).order_by(ActivityLog.id).limit(ACTIVITY_COMPACT_CHUNK).all()
+            if not chunk:
+                break
+            ids = [row.id for row in chunk]
+            flipped = db.query(ActivityLog).filter(
+                ActivityLog.id.in_(ids),
+                ActivityLog.rolled_up == 0
+            ).update({ActivityLog.rolled_up: 1}, synchronize_session=False)
+            if flipped != len(ids):
+                # Proses lain sedang compaction; biarkan dia yang menghitung row ini
+                db.rollback()
+                return {"rolled_up": rolled_up, "deleted": 0}
+            counts = {}
+            for row in chunk:
+                key = (as_date(row.timestamp), row.action, row.password_id or 0)
+                counts[key] = counts.get(key, 0) + 1
+            _add_to_rollups(db, user_id, counts)
+            db.commit()
+            rolled_up += len(ids)
+    
+    deleted = 0
+    if retention_days > 0:
+        cutoff = start_of_day(today - timedelta(days=retention_days))
+        deleted = db.query(ActivityLog).filter(
+            ActivityLog.timestamp < cutoff,
+            ActivityLog.rolled_up == 1
+        ).delete(synchronize_session=False)
+        if deleted:
+            bump_versions(db, [user_id for (user_id,) in db.query(User.id)], vault=False, activity=True)
+    
+    db.commit()
+    return {"rolled_up": rolled_up, "deleted": deleted}
+
+class AuditLogWriter:
+    """Queue ActivityLog di memory dan flush dalam bulk insert"""
+    
+    def __init__(self, flush_size: int = AUDIT_FLUSH_SIZE, flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 write_behind: bool = AUDIT_WRITE_BEHIND):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.write_behind = write_behind
+        self._pending = []
+        self._retry = []  # [(rows, jumlah percobaan gagal)] batch yang menunggu dicoba ulang
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_compact = 0.0
+        self.flushes = 0
+        self.written = 0
+        self.errors = 0
+        self.dropped = 0
+    
+    @property
+    def pending(self) -> int:
+        return len(self._pending) + sum(len(rows) for rows, _ in self._retry)
+    
+    def record(self, user_id: int, action: str, description: str, password_id: Optional[int] = None) -> None:
+        """Queue satu event. Timestamp diambil sekarang, bukan saat flush."""
+        self.record_many([{
+            "user_id": user_id,
+            "password_id": password_id,
+            "action": action,
+            "description": description,
+        }])
+    
+    def record_many(self, events: list) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            for event in events:
+                self._pending.append(dict(event, timestamp=now))
+            size = len(self._pending)
+        if not self.write_behind:
+            self.flush()
+            return
+        self._ensure_started()
+        if size >= self.flush_size:
+            self._wakeup.set()
+    
+    def flush(self) -> int:
+        """Tulis batch yang menunggu retry lalu event baru, return jumlah row yang tertulis"""
+        with self._flush_lock:
+            retry, self._retry = self._retry, []
+            with self._lock:
+                rows, self._pending = self._pending, []
+            written = 0
+            for batch, attempts in retry:
+                written += self._write(batch, attempts)
+            if rows:
+                written += self._write(rows, 0)
+            return written
+    
+    def _write(self, rows: list, attempts: int) -> int:
+        if self._insert(rows):
+            return len(rows)
+        attempts += 1
+        if attempts < AUDIT_MAX_RETRIES:
+            # Dicoba lagi di flush berikutnya, tidak dicampur event baru
+            self._retry.append((rows, attempts))
+            return 0
+        return self._write_split(rows)
+    
+    def _write_split(self, rows: list) -> int:
+        """Pecah batch yang terus gagal sampai row yang tidak bisa ditulis terisolasi"""
+        if len(rows) == 1:
+            self.dropped += 1
+            self.errors += 1
+            print(f"❌ Dropped audit log row after {AUDIT_MAX_RETRIES} attempts: {rows[0]}")
+            return 0
+        mid = len(rows) // 2
+        written = 0
+        for part in (rows[:mid], rows[mid:]):
+            written += len(part) if self._insert(part) else self._write_split(part)
+        return written
+    
+    def _insert(self, rows: list) -> bool:
+        """Satu transaksi bulk insert, False kalau gagal"""
+        db = SessionLocal()
+        try:
+            # Password bisa saja sudah dihapus sebelum flush, jangan langgar foreign key
+            password_ids = {row["password_id"] for row in rows if row["password_id"] is not None}
+            if password_ids:
+                existing = {pid for (pid,) in db.query(Password.id).filter(Password.id.in_(password_ids))}
+                for row in rows:
+                    if row["password_id"] is not None and row["password_id"] not in existing:
+                        row["password_id"] = None
+            db.execute(insert(ActivityLog), rows)
+            # Bulk insert tidak lewat ORM flush, jadi counter ETag history dinaikkan manual
+            bump_versions(db, {row["user_id"] for row in rows}, vault=False, activity=True)
+            db.commit()
+            self.flushes += 1
+            self.written += len(rows)
+            return True
+        except Exception as e:
+            db.rollback()
+            self.errors += 1
+            print(f"❌ Audit log flush failed ({len(rows)} rows): {e}")
+            return False
+        finally:
+            db.close()
+    
+    def compact(self) -> dict:
+        """Flush antrian lalu jalankan compaction activity log dan pruning tombstone"""
+        self.flush()
+        db = SessionLocal()
+        try:
+            result = compact_activity_logs(db)
+            result["tombstones_pruned"] = prune_tombstones(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self._next_compact = time.monotonic() + ACTIVITY_COMPACT_INTERVAL
+        return result
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            if ACTIVITY_COMPACT_INTERVAL > 0 and time.monotonic() >= self._next_compact:
+                try:
+                    self.compact()
+                except Exception as e:
+                    self._next_compact = time.monotonic() + ACTIVITY_COMPACT_INTERVAL
+                    print(f"❌ Activity log compaction failed: {e}")
+    
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self._thread.start()
+    
+    def start(self) -> None:
+        if self.write_behind:
+            self._ensure_started()
+    
+    def stop(self) -> None:
+        """Hentikan thread dan flush sisa antrian (dipanggil saat shutdown)"""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            self._wakeup.set()
+            thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+    
+    def stats(self) -> dict:
+        return {
+            "write_behind": self.write_behind,
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "written": self.written,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+
+audit_writer = AuditLogWriter()
+
+# Jaga-jaga kalau process berhenti tanpa lifespan shutdown (misal WSGI worker)
+atexit.register(audit_writer.stop)
@@ -0,0 +1,389 @@
+"""Benchmark & load test API terhadap SQLite lokal (in-process, tanpa server).
+
+Untuk tiap ukuran vault (default 100, 10k, 100k) sebuah process baru dibuat
+dengan database SQLite sementara, vault sintetis di-seed langsung ke DB, lalu
+endpoint diukur lewat httpx + ASGI transport:
+
+- login              POST /auth/login (bcrypt + PBKDF2)
+- list_page          GET /passwords?limit=50
+- list_all           GET /passwords (tanpa limit, hanya untuk vault <= --list-all-max)
+- search             GET /passwords?search=<kata>
+- create             POST /passwords
+- decrypt            POST /passwords/{id}/decrypt
+- history            GET /history?limit=50
+
+Setelah itu mixed workload dijalankan dengan --concurrency client paralel
+selama --duration detik. Hasil berisi throughput dan p50 / p95 / p99 (ms).
+
+    python benchmarks/api_bench.py --sizes 100,10000 --save benchmarks/baseline.json
+    python benchmarks/api_bench.py --sizes 100,10000 --compare benchmarks/baseline.json
+    python benchmarks/api_bench.py --url http://localhost:8000   # server yang sudah jalan
+
+--compare keluar dengan exit code 1 kalau p95 naik atau throughput turun lebih
+dari --tolerance (default 25%) dibanding baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MASTER_PASSWORD = "benchmark-master-password"
+WORDS = [
+    "github", "gitlab", "google", "gmail", "amazon", "netflix", "spotify", "twitter",
+    "facebook", "instagram", "linkedin", "slack", "discord", "dropbox", "paypal", "stripe",
+    "azure", "heroku", "vercel", "supabase", "notion", "figma", "steam", "reddit",
+]
+MIXED_WEIGHTS = {"list_page": 40, "search": 20, "decrypt": 25, "create": 10, "history": 5}
+SEED_CHUNK = 5000
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def summarize(latencies_ms: list, elapsed: float, errors: int = 0) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+    }
+
+# ---------------------------------------------------------------------------
+# Worker: satu ukuran vault dalam process sendiri
+# ---------------------------------------------------------------------------
+
+def seed_vault(size: int, history_size: int) -> list:
+    """Insert password + activity log sintetis langsung ke DB (bulk), return list id password"""
+    from sqlalchemy import insert
+    from database import SessionLocal
+    from models import User, Category, Password, ActivityLog
+    from security import SecurityManager
+    from vault_keys import load_key_params, build_keyring
+    
+    db = SessionLocal()
+    try:
+        user = db.query(User).first()
+        categories = [c.id for c in db.query(Category).filter(Category.user_id == user.id)]
+        keyring = build_keyring(MASTER_PASSWORD, load_key_params(user.id))
+        encrypted = SecurityManager.encrypt_with_key("benchmark-secret", keyring)
+        start = datetime.utcnow() - timedelta(days=30)
+        rng = random.Random(size)
+        for offset in range(0, size, SEED_CHUNK):
+            rows = []
+            for i in range(offset, min(size, offset + SEED_CHUNK)):
+                word = rng.choice(WORDS)
+                created = start + timedelta(seconds=i)
+                rows.append({
+                    "user_id": user.id,
+                    "category_id": rng.choice(categories),
+                    "title": f"{word.title()} account {i}",
+                    "username": f"user{i}",
+                    "email": f"user{i}@{word}.com",
+                    "encrypted_password": "",
+                    "ciphertext": encrypted,
+                    "website": f"https://{word}.com",
+                    "notes": None,
+                    "created_at": created,
+                    "updated_at": created,
+                })
+            db.execute(insert(Password), rows)
+        db.commit()
+        ids = [pid for (pid,) in db.query(Password.id)]
+        for offset in range(0, history_size, SEED_CHUNK):
+            rows = [{
+                "user_id": user.id,
+                "password_id": rng.choice(ids) if ids else None,
+                "action": rng.choice(["viewed", "copied", "updated"]),
+                "description": "seeded",
+                "timestamp": start + timedelta(seconds=i),
+            } for i in range(offset, min(history_size, offset + SEED_CHUNK))]
+            db.execute(insert(ActivityLog), rows)
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+class Operations:
+    """Request per operasi benchmark, dipakai oleh pengukuran serial dan mixed workload"""
+    
+    def __init__(self, client, token: str, ids: list, seed: int = 0):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.ids = ids
+        self.rng = random.Random(seed)
+        self.created = 0
+    
+    async def login(self):
+        return await self.client.post("/auth/login", json={"master_password": MASTER_PASSWORD})
+    
+    async def list_page(self):
+        return await self.client.get("/passwords", params={"limit": 50}, headers=self.headers)
+    
+    async def list_all(self):
+        return await self.client.get("/passwords", headers=self.headers)
+    
+    async def search(self):
+        return await self.client.get("/passwords", params={"search": self.rng.choice(WORDS)[:5]}, headers=self.headers)
+    
+    async def create(self):
+        self.created += 1
+        return await self.client.post("/passwords", headers=self.headers, json={
+            "title": f"Bench {self.created}",
+            "username": "bench",
+            "password": "benchmark-secret",
+            "website": "https://bench.example",
+        })
+    
+    async def decrypt(self):
+        return await self.client.post(f"/passwords/{self.rng.choice(self.ids)}/decrypt", headers=self.headers)
+    
+    async def history(self):
+        return await self.client.get("/history", params={"limit": 50}, headers=self.headers)
+
+async def measure(operation, count: int) -> dict:
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        response = await operation()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+async def mixed_workload(client, token: str, ids: list, concurrency: int, duration: float) -> dict:
+    names = list(MIXED_WEIGHTS)
+    weights = [MIXED_WEIGHTS[n] for n in names]
+    per_op = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+    
+    async def worker(worker_id: int):
+        ops = Operations(client, token, ids, seed=worker_id)
+        rng = random.Random(1000 + worker_id)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            response = await getattr(ops, name)()
+            per_op[name].append((time.perf_counter() - t0) * 1000)
+            if response.status_code >= 400:
+                errors[name] += 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    all_latencies = [v for values in per_op.values() for v in values]
+    result = {"concurrency": concurrency, "overall": summarize(all_latencies, elapsed, sum(errors.values()))}
+    result["operations"] = {name: summarize(per_op[name], elapsed, errors[name]) for name in names if per_op[name]}
+    return result
+
+async def run_benchmarks(client, ids: list, args, size: int) -> dict:
+    setup = await client.post("/auth/login", json={"master_password": MASTER_PASSWORD})
+    setup.raise_for_status()
+    token = setup.json()["token"]
+    ops = Operations(client, token, ids)
+    results = {"size": size, "operations": {}}
+    plan = [
+        ("login", args.login_requests),
+        ("list_page", args.requests),
+        ("list_all", args.requests if size <= args.list_all_max else 0),
+        ("search", args.requests),
+        ("create", args.requests),
+        ("decrypt", args.requests),
+        ("history", args.requests),
+    ]
+    for name, count in plan:
+        if count <= 0:
+            continue
+        operation = getattr(ops, name)
+        for _ in range(args.warmup):
+            await operation()
+        results["operations"][name] = await measure(operation, count)
+    if args.duration > 0:
+        results["mixed"] = await mixed_workload(client, token, ids, args.concurrency, args.duration)
+    return results
+
+async def run_worker(args) -> dict:
+    import httpx
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            response = await client.post("/auth/setup", json={"master_password": MASTER_PASSWORD})
+            response.raise_for_status()
+            t0 = time.perf_counter()
+            ids = seed_vault(args.size, min(args.size, args.history_max))
+            seed_seconds = time.perf_counter() - t0
+            results = await run_benchmarks(client, ids, args, args.size)
+            results["seed_seconds"] = round(seed_seconds, 2)
+            return results
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def run_size(size: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmpdir}/bench.db",
+            DEBUG_QUERY_COUNT="0",
+            QUERY_COUNT_LIMIT="0",
+        )
+        command = [
+            sys.executable, os.path.abspath(__file__), "--worker", "--size", str(size),
+            "--requests", str(args.requests), "--login-requests", str(args.login_requests),
+            "--warmup", str(args.warmup), "--concurrency", str(args.concurrency),
+            "--duration", str(args.duration), "--list-all-max", str(args.list_all_max),
+            "--history-max", str(args.history_max),
+        ]
+        result = subprocess.run(command, env=env, cwd=BACKEND_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Benchmark size {size} failed:\n{result.stderr.strip()}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+async def run_remote(args) -> dict:
+    """Benchmark server yang sudah jalan (--url). Vault dipakai apa adanya, tanpa seed."""
+    import httpx
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        login = await client.post("/auth/login", json={"master_password": args.master_password})
+        login.raise_for_status()
+        token = login.json()["token"]
+        listing = await client.get("/passwords", headers={"Authorization": f"Bearer {token}"})
+        ids = [p["id"] for p in listing.json()]
+        if not ids:
+            raise RuntimeError("Vault kosong, tambahkan beberapa password dulu")
+        global MASTER_PASSWORD
+        MASTER_PASSWORD = args.master_password
+        return await run_benchmarks(client, ids, args, len(ids))
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Return daftar regresi (string) antara hasil sekarang dan baseline"""
+    regressions = []
+    for size, current in results["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if base is None:
+            continue
+        pairs = [(f"{size}/{name}", stats, base["operations"].get(name))
+                 for name, stats in current["operations"].items()]
+        if "mixed" in current and "mixed" in base:
+            pairs.append((f"{size}/mixed", current["mixed"]["overall"], base["mixed"]["overall"]))
+        for label, stats, base_stats in pairs:
+            if not base_stats:
+                continue
+            p95, base_p95 = stats["p95_ms"], base_stats["p95_ms"]
+            if p95 > base_p95 * (1 + tolerance) and p95 - base_p95 > min_delta_ms:
+                regressions.append(f"{label}: p95 {base_p95} ms -> {p95} ms")
+            rps, base_rps = stats["throughput_rps"], base_stats["throughput_rps"]
+            if base_rps and rps < base_rps * (1 - tolerance) and (1000 / max(rps, 1e-9)) - (1000 / base_rps) > min_delta_ms:
+                regressions.append(f"{label}: throughput {base_rps} -> {rps} req/s")
+            if stats["errors"] > base_stats["errors"]:
+                regressions.append(f"{label}: errors {base_stats['errors']} -> {stats['errors']}")
+    return regressions
+
+def print_report(results: dict) -> None:
+    header = f"{'operation':<12} {'req':>6} {'err':>4} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    for size, result in results["sizes"].items():
+        print(f"\n== vault size {size} (seed {result.get('seed_seconds', '-')} s) ==")
+        print(header)
+        rows = list(result["operations"].items())
+        if "mixed" in result:
+            rows.append((f"mixed x{result['mixed']['concurrency']}", result["mixed"]["overall"]))
+            rows.extend((f"  {name}", stats) for name, stats in result["mixed"]["operations"].items())
+        for name, s in rows:
+            print(f"{name:<12} {s['requests']:>6} {s['errors']:>4} {s['throughput_rps']:>9} "
+                  f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="API benchmark / load test")
+    parser.add_argument("--sizes", default="100,10000,100000", help="ukuran vault, dipisah koma")
+    parser.add_argument("--requests", type=int, default=50, help="request per operasi")
+    parser.add_argument("--login-requests", type=int, default=5, help="login mahal (bcrypt), jadi lebih sedikit")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8, help="client paralel untuk mixed workload")
+    parser.add_argument("--duration", type=float, default=10, help="detik mixed workload, 0 = skip")
+    parser.add_argument("--list-all-max", type=int, default=10000, help="GET /passwords tanpa limit hanya sampai ukuran ini")
+    parser.add_argument("--history-max", type=int, default=100000, help="jumlah activity log yang di-seed (maks)")
+    parser.add_argument("--save", help="simpan hasil sebagai baseline JSON")
+    parser.add_argument("--compare", help="bandingkan dengan baseline JSON, exit 1 kalau regresi")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="abaikan selisih p95 di bawah ini (noise)")
+    parser.add_argument("--url", help="benchmark server yang sudah jalan, bukan in-process")
+    parser.add_argument("--master-password", default=MASTER_PASSWORD, help="untuk --url")
+    parser.add_argument("--json", action="store_true", help="print hasil sebagai JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        print(json.dumps(asyncio.run(run_worker(args))))
+        return
+    
+    results = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        },
+        "sizes": {},
+    }
+    if args.url:
+        remote = asyncio.run(run_remote(args))
+        results["meta"]["url"] = args.url
+        results["sizes"][str(remote["size"])] = remote
+    else:
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            print(f"⏱️ Benchmarking vault size {size}...", file=sys.stderr)
+            results["sizes"][str(size)] = run_size(size, args)
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.save}", file=sys.stderr)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {args.compare}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  - {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\n✅ No regressions vs {args.compare} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
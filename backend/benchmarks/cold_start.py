@@ -0,0 +1,127 @@
+"""Benchmark cold start: waktu import app dan waktu sampai response pertama.
+
+Setiap run memakai process Python baru (seperti cold start serverless):
+import `main`, jalankan lifespan startup, lalu satu request GET ke app lewat
+ASGI langsung (tanpa server / network).
+
+    python benchmarks/cold_start.py                  # 5 run, FAST_START=0 dan 1
+    python benchmarks/cold_start.py --runs 10 --path /passwords
+    python benchmarks/cold_start.py --json > cold_start.json
+
+DATABASE_URL dari environment dipakai kalau ada, kalau tidak SQLite sementara.
+Run pertama per mode membuat schema, jadi run berikutnya mengukur jalur
+"schema sudah up to date".
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import main
+t_import = time.perf_counter()
+
+async def first_response(app, path):
+    startup = asyncio.Queue()
+    await startup.put({"type": "lifespan.startup"})
+    started = asyncio.Event()
+    
+    async def lifespan_send(message):
+        if message["type"].startswith("lifespan.startup"):
+            started.set()
+    
+    lifespan = asyncio.ensure_future(app({"type": "lifespan", "asgi": {"version": "3.0"}}, startup.get, lifespan_send))
+    await started.wait()
+    t_startup = time.perf_counter()
+    
+    status = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    await app(scope, receive, send)
+    t_response = time.perf_counter()
+    
+    await startup.put({"type": "lifespan.shutdown"})
+    await lifespan
+    return t_startup, t_response, status[0] if status else None
+
+t_startup, t_response, status = asyncio.run(first_response(main.app, sys.argv[2]))
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "startup_ms": (t_startup - t_import) * 1000,
+    "first_response_ms": (t_response - t0) * 1000,
+    "status": status,
+}))
+"""
+
+def run_once(path: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, BACKEND_DIR, path],
+        env=env, cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    # stdout juga berisi print() dari lifespan, hasil ada di baris terakhir
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarize(samples: list) -> dict:
+    summary = {}
+    for field in ("import_ms", "startup_ms", "first_response_ms"):
+        values = [s[field] for s in samples]
+        summary[field] = {
+            "min": round(min(values), 1),
+            "median": round(statistics.median(values), 1),
+            "max": round(max(values), 1),
+        }
+    summary["status"] = samples[-1]["status"]
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/health", help="request pertama setelah startup")
+    parser.add_argument("--mode", choices=["both", "fast", "default"], default="both")
+    parser.add_argument("--json", action="store_true", help="output JSON (untuk dibandingkan antar commit)")
+    args = parser.parse_args()
+    
+    tmpdir = tempfile.TemporaryDirectory()
+    modes = {"default": "0", "fast": "1"} if args.mode == "both" else {args.mode: "1" if args.mode == "fast" else "0"}
+    results = {}
+    for name, flag in modes.items():
+        env = dict(os.environ, FAST_START=flag)
+        if "DATABASE_URL" not in os.environ:
+            env["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/cold_start_{name}.db"
+        samples = [run_once(args.path, env) for _ in range(args.runs)]
+        results[name] = {"first_run": samples[0], "warm_schema": summarize(samples[1:] or samples)}
+    tmpdir.cleanup()
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        first = result["first_run"]
+        print(f"[{name}] first run (schema create): import {first['import_ms']:.1f} ms, "
+              f"first response {first['first_response_ms']:.1f} ms")
+        for field, stats in result["warm_schema"].items():
+            if field != "status":
+                print(f"[{name}]   {field:<18} median {stats['median']:>7} ms  (min {stats['min']}, max {stats['max']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Cek password terhadap breach corpus lokal (tanpa network).
+
+Format corpus: file biner berisi SHA-1 digest 20 byte yang diurutkan naik,
+tanpa header (ukuran file = jumlah hash x 20). File di-mmap read-only dan
+dicari dengan interpolation search (SHA-1 terdistribusi rata, jadi cukup
+beberapa probe per lookup), fallback ke binary search. Hanya halaman yang
+disentuh yang masuk memory, jadi corpus ratusan juta hash tidak menambah RSS.
+
+Audit vault tidak menyimpan map digest -> entry: pasangan (digest, id) di-sort
+secara eksternal (DigestSpool, run terurut di-spill ke temp file lalu di-merge),
+lalu stream terurut itu dicocokkan ke corpus sekali jalan (merge join, batas
+bawah pencarian ikut maju) sekaligus mengelompokkan password yang dipakai ulang.
+
+Konversi dari daftar HIBP ("SHA1HEX:count" per baris, ordered by hash):
+
+    python breach.py convert pwned-passwords-sha1-ordered-by-hash-v8.txt breach.bin
+    python breach.py convert --plain --sort wordlist.txt breach.bin   # daftar password plaintext
+    python breach.py check breach.bin password123
+"""
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Tuple
+import argparse
+import hashlib
+import heapq
+import mmap
+import os
+import sys
+import tempfile
+import threading
+
+RECORD_SIZE = 20
+MAX_INTERPOLATION_STEPS = 32
+BREACH_AUDIT_BATCH_SIZE = 500  # row per fetch saat audit vault
+BREACH_SPOOL_RUN_SIZE = int(os.getenv("BREACH_SPOOL_RUN_SIZE", "10000"))  # entry per run sort di memory
+SPOOL_RECORD_SIZE = RECORD_SIZE + 8  # digest + id big-endian: urutan bytes = urutan (digest, id)
+BREACH_CORPUS_PATH = os.getenv("BREACH_CORPUS_PATH")
+
+def sha1_digest(password: str) -> bytes:
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+class BreachCorpus:
+    """Sorted SHA-1 file yang di-mmap"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size % RECORD_SIZE:
+            self._file.close()
+            raise ValueError(f"{path}: size is not a multiple of {RECORD_SIZE} bytes")
+        self.count = size // RECORD_SIZE
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if self._mm is not None and hasattr(mmap, "MADV_RANDOM"):
+            self._mm.madvise(mmap.MADV_RANDOM)  # akses acak, jangan read-ahead
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _record(self, index: int) -> bytes:
+        offset = index * RECORD_SIZE
+        return self._mm[offset:offset + RECORD_SIZE]
+    
+    def _prefix(self, index: int) -> int:
+        offset = index * RECORD_SIZE
+        return int.from_bytes(self._mm[offset:offset + 8], "big")
+    
+    def __contains__(self, digest: bytes) -> bool:
+        return self.contains(digest)
+    
+    def contains(self, digest: bytes) -> bool:
+        return self.locate(digest)[0]
+    
+    def locate(self, digest: bytes, lo: int = 0) -> Tuple[bool, int]:
+        """(ketemu, index) dengan pencarian mulai dari `lo`; index = posisi record
+        atau titik sisip, jadi bisa dipakai sebagai `lo` untuk digest berikutnya yang lebih besar
+        """
+        if lo >= self.count:
+            return False, lo
+        key = int.from_bytes(digest[:8], "big")
+        hi = self.count - 1
+        for _ in range(MAX_INTERPOLATION_STEPS):
+            if lo > hi:
+                return False, lo
+            lo_key, hi_key = self._prefix(lo), self._prefix(hi)
+            if key < lo_key:
+                return False, lo
+            if key > hi_key:
+                return False, hi + 1
+            if hi_key == lo_key:
+                mid = lo
+            else:
+                mid = lo + (key - lo_key) * (hi - lo) // (hi_key - lo_key)
+            record = self._record(mid)
+            if record == digest:
+                return True, mid
+            if record < digest:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        # Distribusi tidak rata (file kecil / buatan sendiri): lanjut binary search
+        return self._bisect(digest, lo, hi)
+    
+    def _bisect(self, digest: bytes, lo: int, hi: int) -> Tuple[bool, int]:
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            record = self._record(mid)
+            if record == digest:
+                return True, mid
+            if record < digest:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return False, lo
+    
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+class DigestSpool:
+    """External sort pasangan (digest, id) dengan memory terbatas.
+    
+    Setiap BREACH_SPOOL_RUN_SIZE entry, run di memory di-sort dan ditulis ke
+    temp file; sorted_items() melakukan k-way merge dari run-run itu lewat mmap.
+    Vault kecil (satu run) tidak pernah menyentuh disk.
+    """
+    
+    def __init__(self, run_size: int = BREACH_SPOOL_RUN_SIZE):
+        self.run_size = run_size
+        self._run: List[bytes] = []
+        self._runs: List[Tuple[int, int]] = []  # (offset, jumlah record) di temp file
+        self._file = None
+        self._mm = None
+    
+    def add(self, digest: bytes, item_id: int) -> None:
+        self._run.append(digest + item_id.to_bytes(8, "big"))
+        if len(self._run) >= self.run_size:
+            self._spill()
+    
+    def _spill(self) -> None:
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        self._run.sort()
+        self._runs.append((self._file.tell(), len(self._run)))
+        self._file.write(b"".join(self._run))
+        self._run = []
+    
+    def _iter_run(self, offset: int, count: int) -> Iterator[bytes]:
+        end = offset + count * SPOOL_RECORD_SIZE
+        for start in range(offset, end, SPOOL_RECORD_SIZE):
+            yield self._mm[start:start + SPOOL_RECORD_SIZE]
+    
+    def sorted_items(self) -> Iterator[Tuple[bytes, int]]:
+        """(digest, id) urut naik; dipanggil sekali setelah semua add()"""
+        if self._file is None:
+            self._run.sort()
+            records = iter(self._run)
+        else:
+            if self._run:
+                self._spill()
+            self._file.flush()
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            records = heapq.merge(*(self._iter_run(offset, count) for offset, count in self._runs))
+        for record in records:
+            yield record[:RECORD_SIZE], int.from_bytes(record[RECORD_SIZE:], "big")
+    
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+        self._run = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def audit_sorted(corpus: BreachCorpus, items: Iterable[Tuple[bytes, int]]) -> Iterator[Tuple[bool, List[int]]]:
+    """(breached, ids) per digest unik dari stream (digest, id) yang sudah urut.
+    
+    Corpus dicari maju sekali jalan: batas bawah pencarian digest berikutnya
+    adalah posisi digest sebelumnya.
+    """
+    lo = 0
+    for digest, group in groupby(items, key=itemgetter(0)):
+        found, lo = corpus.locate(digest, lo)
+        yield found, [item_id for _, item_id in group]
+
+_corpus: Optional[BreachCorpus] = None
+_corpus_lock = threading.Lock()
+
+def get_breach_corpus() -> Optional[BreachCorpus]:
+    """Corpus dari BREACH_CORPUS_PATH (dibuka sekali per process), None kalau tidak dikonfigurasi"""
+    global _corpus
+    if _corpus is None and BREACH_CORPUS_PATH:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = BreachCorpus(BREACH_CORPUS_PATH)
+    return _corpus
+
+def iter_hibp_digests(lines: Iterable[str]) -> Iterator[bytes]:
+    """Baris "SHA1HEX" atau "SHA1HEX:count" -> digest"""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield bytes.fromhex(line.split(":", 1)[0])
+
+def iter_plain_digests(lines: Iterable[str]) -> Iterator[bytes]:
+    for line in lines:
+        password = line.rstrip("\r\n")
+        if password:
+            yield sha1_digest(password)
+
+def write_corpus(digests: Iterable[bytes], output: str, sort: bool = False) -> int:
+    """Tulis corpus biner. Input harus sudah urut kecuali `sort=True` (dimuat ke memory)."""
+    if sort:
+        digests = sorted(set(digests))
+    count = 0
+    previous = b""
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as out:
+        for digest in digests:
+            if len(digest) != RECORD_SIZE:
+                raise ValueError(f"Invalid SHA-1 digest: {digest.hex()}")
+            if digest < previous:
+                raise ValueError("Input is not sorted by hash, use --sort")
+            if digest == previous:
+                continue
+            out.write(digest)
+            previous = digest
+            count += 1
+    os.replace(tmp_path, output)
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Breach corpus tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="HIBP text / plaintext list -> sorted binary corpus")
+    convert.add_argument("input")
+    convert.add_argument("output")
+    convert.add_argument("--plain", action="store_true", help="input berisi password plaintext, bukan hash")
+    convert.add_argument("--sort", action="store_true", help="urutkan di memory (untuk input yang belum urut)")
+    check = sub.add_parser("check", help="cek satu password terhadap corpus")
+    check.add_argument("corpus")
+    check.add_argument("password")
+    args = parser.parse_args(argv)
+    
+    if args.command == "convert":
+        with open(args.input, encoding="utf-8", errors="replace") as f:
+            digests = iter_plain_digests(f) if args.plain else iter_hibp_digests(f)
+            count = write_corpus(digests, args.output, sort=args.sort or args.plain)
+        print(f"✅ Wrote {count} hashes to {args.output}")
+    elif args.command == "check":
+        corpus = BreachCorpus(args.corpus)
+        found = corpus.contains(sha1_digest(args.password))
+        print("❌ Found in breach corpus" if found else "✅ Not found")
+        corpus.close()
+        sys.exit(1 if found else 0)
+
+if __name__ == "__main__":
+    main()
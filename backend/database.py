@@ -1,9 +1,16 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text, exc, Table, Column, String
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+import hashlib
+import threading
 import os
 from dotenv import load_dotenv
+from pooling import resolve_profile, engine_options, instrument_engine
+from metrics import instrument_queries
 
 # Load .env dari folder yang sama dengan file ini
 env_path = Path(__file__).parent / '.env'
@@ -21,17 +28,118 @@ if DATABASE_URL:
     # Hapus parameter pgbouncer yang bisa bikin pg8000 error
     DATABASE_URL = DATABASE_URL.replace("?pgbouncer=true", "")
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=False
-)
+# Fast start (default di Vercel): tanpa create_all kalau schema tidak berubah,
+# tanpa compaction saat startup dan tanpa endpoint debug
+FAST_START = os.getenv("FAST_START", "1" if os.getenv("VERCEL") else "0") == "1"
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """Engine dibuat saat pertama dipakai: create_engine meng-import driver DB (pg8000)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                profile = resolve_profile(DATABASE_URL)
+                engine = create_engine(DATABASE_URL, echo=False, **engine_options(DATABASE_URL, profile))
+                event.listen(engine, "before_cursor_execute", _count_query)
+                instrument_engine(engine, profile)
+                instrument_queries(engine)
+                _engine = engine
+    return _engine
+
+def __getattr__(name):
+    # `from database import engine` tetap jalan, tapi engine baru dibuat saat diakses
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class LazyEngineSession(Session):
+    def get_bind(self, mapper=None, **kw):
+        return get_engine()
+
+SessionLocal = sessionmaker(class_=LazyEngineSession, autocommit=False, autoflush=False)
+
+# Optional async mode (ASYNC_DB=1): butuh driver async, misal aiosqlite / asyncpg
+ASYNC_DB = os.getenv("ASYNC_DB", "0") == "1"
+
+def _async_url(url: str) -> str:
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql+pg8000://"):
+        return url.replace("postgresql+pg8000://", "postgresql+asyncpg://", 1)
+    return url
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    _async_db_url = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+    async_engine = create_async_engine(
+        _async_db_url,
+        echo=False,
+        **engine_options(_async_db_url, instrumented=False)
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+class QueryCounter:
+    """Hitung jumlah SQL statement yang dieksekusi"""
+    
+    def __init__(self):
+        self.count = 0
+
+# Counter per request (di-set oleh middleware di main.py)
+_request_counter: ContextVar = ContextVar("request_query_counter", default=None)
+# Counter global dari count_queries(), menghitung query dari semua thread
+_active_counters = []
+_counters_lock = threading.Lock()
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _request_counter.get()
+    if counter is not None:
+        counter.count += 1
+    if _active_counters:
+        with _counters_lock:
+            for active in _active_counters:
+                active.count += 1
+
+if async_engine is not None:
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _count_query)
+    instrument_queries(async_engine.sync_engine)
+
+def start_request_counter() -> QueryCounter:
+    """Mulai hitung query untuk request yang sedang berjalan"""
+    counter = QueryCounter()
+    _request_counter.set(counter)
+    return counter
+
+@contextmanager
+def count_queries():
+    """Context manager untuk test / debugging:
+    
+        with count_queries() as counter:
+            client.get("/passwords")
+        assert counter.count <= 3
+    """
+    counter = QueryCounter()
+    with _counters_lock:
+        _active_counters.append(counter)
+    try:
+        yield counter
+    finally:
+        with _counters_lock:
+            _active_counters.remove(counter)
 
 Base = declarative_base()
 
+# Fingerprint schema terakhir yang di-apply, supaya startup tidak perlu create_all / reflection
+schema_meta = Table(
+    "schema_meta", Base.metadata,
+    Column("key", String(50), primary_key=True),
+    Column("value", String(64), nullable=False)
+)
+
 def get_db():
     """Dependency untuk mendapatkan database session"""
     db = SessionLocal()
@@ -40,6 +148,82 @@ def get_db():
     finally:
         db.close()
 
+async def get_read_db():
+    """Dependency untuk route async read-only: AsyncSession kalau ASYNC_DB=1, Session biasa kalau tidak"""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+async def fetch_scalars(db, stmt) -> list:
+    """Eksekusi select() tanpa memblokir event loop (Session sync dijalankan di threadpool)"""
+    if AsyncSessionLocal is not None:
+        return list((await db.execute(stmt)).scalars().all())
+    return await run_in_threadpool(lambda: list(db.execute(stmt).scalars().all()))
+
+def _add_missing_columns(engine):
+    """create_all tidak menambah kolom baru ke tabel lama, jadi ALTER TABLE manual.
+    
+    Kolom baru harus nullable atau punya default scalar (misal change_seq = 0).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"
+                if column.default is not None and column.default.is_scalar:
+                    ddl += f" DEFAULT {column.default.arg!r}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(text(ddl))
+                print(f"🔧 Added column {table.name}.{column.name}")
+
+def schema_fingerprint() -> str:
+    """Hash dari definisi tabel, kolom dan index di models (berubah otomatis saat model berubah)"""
+    parts = []
+    for table in sorted(Base.metadata.sorted_tables, key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f"{c.name}:{c.type}:{c.nullable}" for c in table.columns)
+        parts.extend(sorted(f"ix:{ix.name}" for ix in table.indexes))
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+def _stored_schema_version(engine):
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                schema_meta.select().with_only_columns(schema_meta.c.value).where(schema_meta.c.key == "schema_version")
+            ).scalar()
+    except exc.DBAPIError:
+        return None  # tabel schema_meta belum ada (database baru / sebelum fitur ini)
+
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables.
+    
+    Kalau fingerprint schema sama dengan yang tersimpan di schema_meta, cukup satu
+    SELECT. Kalau tidak, create_all + kolom / index baru lalu simpan fingerprint.
+    """
+    import models  # noqa: F401 - pastikan semua tabel terdaftar di metadata
+    engine = get_engine()
+    fingerprint = schema_fingerprint()
+    if _stored_schema_version(engine) == fingerprint:
+        return False
+    
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    # create_all tidak menambah index baru ke tabel yang sudah ada
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(schema_meta.delete().where(schema_meta.c.key == "schema_version"))
+        conn.execute(schema_meta.insert().values(key="schema_version", value=fingerprint))
+    return True
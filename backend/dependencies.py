@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi import Depends, HTTPException, Header
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import threading
+import time
+import os
+from database import SessionLocal
+from models import User
+from security import SecurityManager, VaultKeyring, key_cache, run_crypto
+from sessions import SessionInfo, session_store
+from vault_keys import derive_keyring
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))  # detik, 0 = tanpa cache
+PRINCIPAL_CACHE_MAX_ENTRIES = 256
+
+@dataclass(frozen=True)
+class Principal:
+    """Snapshot user yang sedang memanggil API (bukan object ORM, aman di-cache lintas request).
+    
+    Hash master password sengaja tidak ikut: cache per process bisa basi setelah
+    rotasi / rehash di worker lain, jadi verifikasi selalu lewat verify_master_password.
+    """
+    id: int
+    biometric_enabled: bool
+    created_at: Optional[datetime]
+    
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            biometric_enabled=bool(user.biometric_enabled),
+            created_at=user.created_at
+        )
+
+class PrincipalCache:
+    """Cache Principal per session (TTL pendek), dibuang saat row User berubah"""
+    
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # session_id (atau None) -> (principal, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Optional[str]) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: Optional[str], principal: Principal) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in [k for k, (p, _) in self._entries.items() if p.id == user_id]:
+                del self._entries[key]
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+principal_cache = PrincipalCache()
+
+_CHANGED_USERS_KEY = "principal_changed_users"
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    # Master password / biometric berubah (atau user baru / dihapus): cache harus dibuang
+    changed = session.info.setdefault(_CHANGED_USERS_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop(_CHANGED_USERS_KEY, ()):
+        principal_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_user_changes(session, previous_transaction):
+    session.info.pop(_CHANGED_USERS_KEY, None)
+
+def get_session_token(authorization: Optional[str] = Header(None)) -> Optional[str]:
+    """Ambil session token dari header Authorization: Bearer <token>"""
+    if authorization and authorization.startswith("Bearer "):
+        return authorization[len("Bearer "):].strip() or None
+    return None
+
+def get_session(token: Optional[str] = Depends(get_session_token)) -> Optional[SessionInfo]:
+    """Session yang valid, atau None kalau token tidak ada / expired / revoked"""
+    if not token:
+        return None
+    return session_store.validate(token)
+
+def load_principal(user_id: Optional[int] = None) -> Optional[Principal]:
+    """Query User (by id, atau user pertama untuk mode single-user tanpa session)"""
+    db = SessionLocal()
+    try:
+        query = db.query(User)
+        user = query.filter(User.id == user_id).first() if user_id is not None else query.first()
+        return Principal.from_user(user) if user else None
+    finally:
+        db.close()
+
+def load_master_password_hash(user_id: int) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        return db.query(User.master_password_hash).filter(User.id == user_id).scalar()
+    finally:
+        db.close()
+
+async def verify_master_password(user_id: int, master_password: str) -> Optional[str]:
+    """Verifikasi terhadap hash terbaru di database, return hash itu kalau cocok (None kalau tidak)"""
+    hashed = await run_in_threadpool(load_master_password_hash, user_id)
+    if hashed is None or not await run_crypto(SecurityManager.verify_master_password, master_password, hashed):
+        return None
+    return hashed
+
+async def get_optional_principal(session: Optional[SessionInfo] = Depends(get_session)) -> Optional[Principal]:
+    """Principal untuk request ini, None kalau belum ada user (belum setup).
+    
+    Cache hit tidak menyentuh database sama sekali.
+    """
+    cache_key = session.session_id if session else None
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        return principal
+    principal = await run_in_threadpool(load_principal, session.user_id if session else None)
+    if principal is not None:
+        principal_cache.put(cache_key, principal)
+    return principal
+
+async def get_current_user(principal: Optional[Principal] = Depends(get_optional_principal)) -> Principal:
+    """Dependency user yang sedang login, dipakai semua router"""
+    if principal is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return principal
+
+async def get_vault_key(
+    master_password: Optional[str] = Header(None, alias="X-Master-Password"),
+    session: Optional[SessionInfo] = Depends(get_session),
+    user: Principal = Depends(get_current_user)
+) -> VaultKeyring:
+    """Keyring vault untuk request ini.
+    
+    Session yang valid dan masih punya keyring di cache cukup lookup token saja.
+    Kalau tidak, master password diverifikasi dengan bcrypt lalu key di-derive
+    (dan di-cache ke session kalau ada). Keduanya jalan di crypto executor.
+    """
+    if session:
+        key = key_cache.get(session.session_id)
+        if key is not None:
+            return key
+    
+    if not master_password:
+        raise HTTPException(status_code=401, detail="Session locked, master password required")
+    
+    if not await verify_master_password(user.id, master_password):
+        raise HTTPException(status_code=401, detail="Invalid master password")
+    
+    key = await derive_keyring(master_password, user.id)
+    if session:
+        key_cache.put(session.session_id, key)
+    return key
@@ -0,0 +1,211 @@
+"""Password generator untuk POST /passwords/generate.
+
+Random byte diambil dari os.urandom dalam blok besar (SecureRandomBuffer) lalu
+dipetakan ke karakter dengan bytes.translate: byte di luar kelipatan ukuran
+charset dibuang (rejection sampling, tanpa modulo bias), sisanya di-mod ke
+index charset. Semua berjalan di C, jadi batch ratusan password tetap murah.
+"""
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+import math
+import os
+import string
+import threading
+
+RANDOM_BUFFER_SIZE = 8192
+MAX_GENERATE_BATCH = 1000
+
+AMBIGUOUS = set("Il1O0o|`'\"")
+SYMBOLS = "!@#$%^&*()-_=+[]{};:,.<>?/~"
+
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+# Suku kata CV dan CVC untuk mode pronounceable / passphrase
+SYLLABLES = [c + v for c in CONSONANTS for v in VOWELS] + [c + v + "n" for c in "bdgklmprst" for v in VOWELS]
+# Tanpa l / o untuk exclude_ambiguous (huruf kapital dipilih terpisah, lihat generate_pronounceable)
+CLEAR_SYLLABLES = [s for s in SYLLABLES if AMBIGUOUS.isdisjoint(s)]
+
+class SecureRandomBuffer:
+    """Buffer os.urandom supaya tidak ada syscall per karakter"""
+    
+    def __init__(self, size: int = RANDOM_BUFFER_SIZE):
+        self.size = size
+        self._buffer = b""
+        self._pos = 0
+        self._lock = threading.Lock()
+    
+    def take(self, n: int) -> bytes:
+        with self._lock:
+            if self._pos + n > len(self._buffer):
+                self._buffer = self._buffer[self._pos:] + os.urandom(max(self.size, n))
+                self._pos = 0
+            chunk = self._buffer[self._pos:self._pos + n]
+            self._pos += n
+            return chunk
+
+random_buffer = SecureRandomBuffer()
+
+@lru_cache(maxsize=64)
+def _translate_table(symbols: bytes) -> Tuple[bytes, bytes]:
+    """Tabel translate: byte -> symbols[byte % n], plus byte yang ditolak (sumber bias)"""
+    n = len(symbols)
+    if not 0 < n <= 256:
+        raise ValueError("Alphabet size must be between 1 and 256")
+    limit = 256 - (256 % n)
+    table = bytes(symbols[b % n] if b < limit else 0 for b in range(256))
+    return table, bytes(range(limit, 256))
+
+def _random_bytes_over(count: int, symbols: bytes) -> bytes:
+    table, rejected = _translate_table(symbols)
+    out = b""
+    while len(out) < count:
+        missing = count - len(out)
+        # Minta sedikit lebih banyak supaya jarang perlu putaran kedua
+        raw = random_buffer.take(missing + missing // 4 + 8)
+        out += raw.translate(table, rejected)
+    return out[:count]
+
+def random_indices(count: int, n: int) -> bytes:
+    """`count` index uniform dalam [0, n) dari CSPRNG"""
+    return _random_bytes_over(count, bytes(range(n)))
+
+def random_string(length: int, alphabet: str) -> str:
+    """String acak dari alphabet ASCII, langsung hasil translate tanpa loop per karakter"""
+    return _random_bytes_over(length, alphabet.encode("ascii")).decode("ascii")
+
+def build_charset(lowercase: bool = True, uppercase: bool = True, digits: bool = True,
+                  symbols: bool = True, exclude_ambiguous: bool = False) -> List[str]:
+    """List kelas karakter yang dipilih (masing-masing string)"""
+    classes = []
+    for enabled, chars in (
+        (lowercase, string.ascii_lowercase),
+        (uppercase, string.ascii_uppercase),
+        (digits, string.digits),
+        (symbols, SYMBOLS),
+    ):
+        if enabled:
+            if exclude_ambiguous:
+                chars = "".join(c for c in chars if c not in AMBIGUOUS)
+            classes.append(chars)
+    if not classes:
+        raise ValueError("At least one character class must be enabled")
+    return classes
+
+def generate_random(length: int, classes: Sequence[str]) -> str:
+    """Password acak; setiap kelas karakter yang dipilih muncul minimal sekali"""
+    if length < len(classes):
+        raise ValueError(f"Length must be at least {len(classes)} for the selected character classes")
+    alphabet = "".join(classes)
+    class_sets = [set(chars) for chars in classes]
+    while True:
+        candidate = random_string(length, alphabet)
+        # Rejection: tetap uniform di antara password yang memenuhi semua kelas
+        if all(not chars.isdisjoint(candidate) for chars in class_sets):
+            return candidate
+
+def _syllables(count: int, table: Sequence[str] = SYLLABLES) -> List[str]:
+    return [table[i] for i in random_indices(count, len(table))]
+
+def _clear(chars: str, exclude_ambiguous: bool) -> str:
+    return "".join(c for c in chars if c not in AMBIGUOUS) if exclude_ambiguous else chars
+
+def generate_pronounceable(length: int, uppercase: bool = True, digits: bool = True, symbols: bool = False,
+                           exclude_ambiguous: bool = False) -> str:
+    """Rangkaian suku kata, lalu satu huruf kapital / angka / simbol disisipkan sesuai opsi"""
+    extras = int(digits) + int(symbols)
+    if length < extras + 2:
+        raise ValueError(f"Length must be at least {extras + 2} for pronounceable passwords")
+    table = CLEAR_SYLLABLES if exclude_ambiguous else SYLLABLES
+    body = ""
+    while len(body) < length - extras:
+        body += "".join(_syllables(4, table))
+    body = body[:length - extras]
+    if uppercase:
+        # exclude_ambiguous: i tidak dijadikan I
+        positions = [i for i, c in enumerate(body) if not exclude_ambiguous or c.upper() not in AMBIGUOUS]
+        pos = positions[random_indices(1, len(positions))[0]]
+        body = body[:pos] + body[pos].upper() + body[pos + 1:]
+    if digits:
+        body += random_string(1, _clear(string.digits, exclude_ambiguous))
+    if symbols:
+        body += random_string(1, _clear(SYMBOLS, exclude_ambiguous))
+    return body
+
+def generate_passphrase(words: int, separator: str = "-", capitalize: bool = True, digits: bool = True,
+                        symbols: bool = False, exclude_ambiguous: bool = False) -> str:
+    """Kata dari 2-3 suku kata, dipisah separator (mudah diketik / diingat)"""
+    table = CLEAR_SYLLABLES if exclude_ambiguous else SYLLABLES
+    lengths = [2 + i for i in random_indices(words, 2)]
+    syllables = _syllables(sum(lengths), table)
+    parts, pos = [], 0
+    for size in lengths:
+        word = "".join(syllables[pos:pos + size])
+        pos += size
+        parts.append(word.capitalize() if capitalize else word)
+    # Angka / simbol ditempel di akhir kata acak
+    for enabled, chars in ((digits, string.digits), (symbols, SYMBOLS)):
+        if enabled:
+            index = random_indices(1, words)[0]
+            parts[index] += random_string(1, _clear(chars, exclude_ambiguous))
+    return separator.join(parts)
+
+def random_entropy(length: int, classes: Sequence[str]) -> float:
+    return length * math.log2(sum(len(chars) for chars in classes))
+
+def pronounceable_entropy(length: int, uppercase: bool, digits: bool, symbols: bool,
+                          exclude_ambiguous: bool = False) -> float:
+    # Perkiraan: rata-rata bit per huruf dari tabel suku kata
+    table = CLEAR_SYLLABLES if exclude_ambiguous else SYLLABLES
+    avg_len = sum(len(s) for s in table) / len(table)
+    letters = length - int(digits) - int(symbols)
+    bits = letters / avg_len * math.log2(len(table))
+    if uppercase:
+        bits += math.log2(max(letters, 1))
+    if digits:
+        bits += math.log2(len(_clear(string.digits, exclude_ambiguous)))
+    if symbols:
+        bits += math.log2(len(_clear(SYMBOLS, exclude_ambiguous)))
+    return bits
+
+def passphrase_entropy(words: int, digits: bool, symbols: bool = False, exclude_ambiguous: bool = False) -> float:
+    # Setiap kata: 1 bit panjang (2 / 3 suku kata) + bit suku kata (rata-rata 2.5 suku kata)
+    table = CLEAR_SYLLABLES if exclude_ambiguous else SYLLABLES
+    bits = words * (1 + 2.5 * math.log2(len(table)))
+    if digits:
+        bits += math.log2(words) + math.log2(len(_clear(string.digits, exclude_ambiguous)))
+    if symbols:
+        bits += math.log2(words) + math.log2(len(_clear(SYMBOLS, exclude_ambiguous)))
+    return bits
+
+STRENGTH_LEVELS = ((28, "very_weak"), (36, "weak"), (60, "fair"), (128, "strong"))
+
+def strength_label(entropy_bits: float) -> Tuple[int, str]:
+    """(score 0-4, label) dari entropy"""
+    for score, (limit, label) in enumerate(STRENGTH_LEVELS):
+        if entropy_bits < limit:
+            return score, label
+    return len(STRENGTH_LEVELS), "very_strong"
+
+def generate_batch(mode: str, count: int, length: int = 16, words: int = 5, separator: str = "-",
+                   lowercase: bool = True, uppercase: bool = True, digits: bool = True,
+                   symbols: bool = True, exclude_ambiguous: bool = False) -> Tuple[List[str], float]:
+    """Generate `count` password, return (passwords, entropy_bits per password).
+    
+    lowercase hanya dipakai mode random; suku kata selalu huruf kecil.
+    """
+    if not 1 <= count <= MAX_GENERATE_BATCH:
+        raise ValueError(f"count must be between 1 and {MAX_GENERATE_BATCH}")
+    if mode == "random":
+        classes = build_charset(lowercase, uppercase, digits, symbols, exclude_ambiguous)
+        return [generate_random(length, classes) for _ in range(count)], random_entropy(length, classes)
+    if mode == "pronounceable":
+        return (
+            [generate_pronounceable(length, uppercase, digits, symbols, exclude_ambiguous) for _ in range(count)],
+            pronounceable_entropy(length, uppercase, digits, symbols, exclude_ambiguous)
+        )
+    if mode == "passphrase":
+        return (
+            [generate_passphrase(words, separator, uppercase, digits, symbols, exclude_ambiguous) for _ in range(count)],
+            passphrase_entropy(words, digits, symbols, exclude_ambiguous)
+        )
+    raise ValueError(f"Unknown mode: {mode}")
@@ -0,0 +1,103 @@
+"""Kalibrasi cost KDF untuk mesin tempat backend berjalan.
+
+Benchmark bcrypt (hash master password) dan PBKDF2-SHA256 (key vault) lalu
+pilih cost tertinggi yang masih masuk target latency per operasi:
+
+    python kdf_calibrate.py --target-ms 250
+    python kdf_calibrate.py --target-ms 250 --bcrypt-target-ms 300 --write-env .env
+
+Hasilnya BCRYPT_ROUNDS dan KDF_ITERATIONS. Cost disimpan per record (cost
+bcrypt di dalam hash, iterasi PBKDF2 di key_salts dan header envelope), jadi
+menaikkan nilai ini tidak merusak data lama: login berikutnya rehash master
+password dan membuat salt baru, entry vault di-upgrade lazy saat dibuka.
+Menurunkan nilai hanya berlaku untuk record baru.
+"""
+import argparse
+import os
+import time
+from security import BCRYPT_ROUNDS, KDF_ITERATIONS, _pbkdf2
+
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+MIN_KDF_ITERATIONS = 100000  # tidak turun di bawah default lama
+KDF_ITERATIONS_STEP = 10000
+SAMPLE_PASSWORD = "calibration-sample-password"
+
+def _best_of(func, repeat: int) -> float:
+    """Waktu tercepat (ms) dari `repeat` kali percobaan, mengurangi noise scheduler"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_bcrypt(rounds: int, repeat: int = 3) -> float:
+    import bcrypt
+    salt = bcrypt.gensalt(rounds=rounds)
+    return _best_of(lambda: bcrypt.hashpw(SAMPLE_PASSWORD.encode(), salt), repeat)
+
+def bench_pbkdf2(iterations: int, repeat: int = 3) -> float:
+    salt = os.urandom(16)
+    return _best_of(lambda: _pbkdf2(SAMPLE_PASSWORD, salt, iterations), repeat)
+
+def calibrate_bcrypt(target_ms: float, repeat: int = 3) -> tuple:
+    """(rounds, ms) tertinggi yang masih <= target; cost bcrypt naik 1 = waktu x2"""
+    rounds = MIN_BCRYPT_ROUNDS
+    elapsed = bench_bcrypt(rounds, repeat)
+    while rounds < MAX_BCRYPT_ROUNDS and elapsed * 2 <= target_ms:
+        rounds += 1
+        elapsed = bench_bcrypt(rounds, repeat)
+    return rounds, elapsed
+
+def calibrate_pbkdf2(target_ms: float, repeat: int = 3) -> tuple:
+    """(iterations, ms) untuk target; PBKDF2 linear terhadap jumlah iterasi"""
+    per_iteration = bench_pbkdf2(MIN_KDF_ITERATIONS, repeat) / MIN_KDF_ITERATIONS
+    iterations = int(target_ms / per_iteration) // KDF_ITERATIONS_STEP * KDF_ITERATIONS_STEP
+    iterations = max(MIN_KDF_ITERATIONS, iterations)
+    return iterations, bench_pbkdf2(iterations, repeat)
+
+def write_env(path: str, values: dict) -> None:
+    """Update / tambah baris KEY=value di file .env, baris lain tidak diubah"""
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    pending = dict(values)
+    for i, line in enumerate(lines):
+        name = line.split("=", 1)[0].strip()
+        if name in pending:
+            lines[i] = f"{name}={pending.pop(name)}"
+    lines.extend(f"{name}={value}" for name, value in pending.items())
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate bcrypt / PBKDF2 cost for this machine")
+    parser.add_argument("--target-ms", type=float, default=250, help="target latency per operasi KDF (ms)")
+    parser.add_argument("--bcrypt-target-ms", type=float, help="target khusus bcrypt (default: --target-ms)")
+    parser.add_argument("--pbkdf2-target-ms", type=float, help="target khusus PBKDF2 (default: --target-ms)")
+    parser.add_argument("--repeat", type=int, default=3, help="percobaan per pengukuran")
+    parser.add_argument("--write-env", metavar="PATH", help="tulis hasil ke file .env")
+    args = parser.parse_args(argv)
+    
+    print(f"🔧 Calibrating KDF cost on {os.cpu_count()} CPU(s)...")
+    rounds, bcrypt_ms = calibrate_bcrypt(args.bcrypt_target_ms or args.target_ms, args.repeat)
+    iterations, pbkdf2_ms = calibrate_pbkdf2(args.pbkdf2_target_ms or args.target_ms, args.repeat)
+    print(f"   bcrypt : rounds={rounds} ({bcrypt_ms:.0f} ms, current {BCRYPT_ROUNDS})")
+    print(f"   PBKDF2 : iterations={iterations} ({pbkdf2_ms:.0f} ms, current {KDF_ITERATIONS})")
+    print(f"   login  : ~{bcrypt_ms + pbkdf2_ms:.0f} ms (verify + derive, tanpa rehash)")
+    
+    values = {"BCRYPT_ROUNDS": rounds, "KDF_ITERATIONS": iterations}
+    if args.write_env:
+        write_env(args.write_env, values)
+        print(f"✅ Wrote {', '.join(values)} to {args.write_env}")
+    else:
+        for name, value in values.items():
+            print(f"{name}={value}")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,79 @@
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
-from database import init_db
-from routes import auth, passwords, categories, history
+from database import init_db, start_request_counter, FAST_START
+from pooling import pool_metrics  # sudah di-import database
+from metrics import registry, start_request_timings, observe_request
+from serialization import FastJSONResponse
+import importlib
+import importlib.util
+import time
+
+# security, dependencies dan rotation baru di-import router (request pertama di fast start),
+# audit saat startup. Komponen yang belum di-import tidak dilaporkan di /health dan /metrics.
+def _loaded(module: str, name: str):
+    loaded = sys.modules.get(module)
+    return getattr(loaded, name) if loaded is not None else None
+
+def _loaded_stats(module: str, name: str):
+    def stats() -> dict:
+        component = _loaded(module, name)
+        return component.stats() if component is not None else {}
+    return stats
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Initialize database
     print("🚀 Initializing database...")
     try:
-        init_db()
-        print("✅ Database initialized!")
+        if init_db():
+            print("✅ Database initialized!")
+        else:
+            print("✅ Database schema up to date")
     except Exception as e:
         print(f"❌ Database init failed: {e}")
+    from audit import audit_writer
+    audit_writer.start()
+    if not FAST_START:
+        # Fast start: compaction dijalankan thread audit writer / POST /history/compact
+        try:
+            audit_writer.compact()
+        except Exception as e:
+            print(f"❌ Activity log compaction failed: {e}")
     yield
     # Shutdown
     print("👋 Shutting down...")
+    rotation = _loaded("rotation", "rotation_manager")
+    if rotation is not None:
+        rotation.stop()  # job berhenti di batas chunk, lanjut dari checkpoint setelah restart
+    audit_writer.stop()  # flush activity log yang masih di antrian
+    kdf = _loaded("security", "kdf_service")
+    if kdf is not None:
+        kdf.shutdown()
 
 app = FastAPI(
     title="Password Manager API",
     description="Secure password manager with AES-256 encryption",
     version="1.0.0",
     lifespan=lifespan,
-    root_path="/api" if os.getenv("VERCEL") else ""
+    root_path="/api" if os.getenv("VERCEL") else "",
+    default_response_class=FastJSONResponse
 )
 
+# Kompresi response besar (list / export / NDJSON). Brotli kalau brotli-asgi
+# ter-install (fallback gzip untuk client tanpa br), selain itu gzip.
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_SIZE, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -35,13 +81,71 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Query-Count", "ETag"],
 )
 
-# Include routers
-app.include_router(auth.router)
-app.include_router(passwords.router)
-app.include_router(categories.router)
-app.include_router(history.router)
+# Debug: header X-Query-Count per request, warning kalau melewati QUERY_COUNT_LIMIT (deteksi N+1)
+DEBUG_QUERY_COUNT = os.getenv("DEBUG_QUERY_COUNT", "0") == "1"
+QUERY_COUNT_LIMIT = int(os.getenv("QUERY_COUNT_LIMIT", "0"))
+
+@app.middleware("http")
+async def query_count_middleware(request: Request, call_next):
+    counter = start_request_counter()
+    response = await call_next(request)
+    if DEBUG_QUERY_COUNT:
+        response.headers["X-Query-Count"] = str(counter.count)
+    if QUERY_COUNT_LIMIT and counter.count > QUERY_COUNT_LIMIT:
+        print(f"⚠️ {request.method} {request.url.path} ran {counter.count} queries (limit {QUERY_COUNT_LIMIT})")
+    return response
+
+# Metrics Prometheus di /metrics (METRICS_TOKEN: wajib header X-Metrics-Token kalau diisi)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    timings = start_request_timings()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Template path (/passwords/{password_id}), bukan path asli, supaya label tidak meledak
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        observe_request(request.method, route_path, status, time.perf_counter() - start, timings)
+
+registry.add_gauges("key_cache", "Derived key cache", _loaded_stats("security", "key_cache"))
+registry.add_gauges("principal_cache", "Principal cache", _loaded_stats("dependencies", "principal_cache"))
+registry.add_gauges("kdf", "KDF executor", _loaded_stats("security", "kdf_service"))
+registry.add_gauges("db_pool", "DB connection pool", pool_metrics.stats)
+registry.add_gauges("audit", "Audit log writer", _loaded_stats("audit", "audit_writer"))
+registry.add_gauges("rotation", "Master password rotation", _loaded_stats("rotation", "rotation_manager"))
+
+# Include routers. Di fast start modul router (dan dependensinya: search,
+# vault_io, breach, ...) baru di-import saat request pertama, bukan saat cold start.
+ROUTERS = ("auth", "passwords", "categories", "history", "dashboard")
+_routers_loaded = False
+
+def include_routers():
+    global _routers_loaded
+    if _routers_loaded:
+        return
+    for name in ROUTERS:
+        app.include_router(importlib.import_module(f"routes.{name}").router)
+    _routers_loaded = True
+
+if FAST_START:
+    @app.middleware("http")
+    async def lazy_router_middleware(request: Request, call_next):
+        include_routers()  # sync, tanpa await: aman dari request paralel di event loop
+        return await call_next(request)
+else:
+    include_routers()
 
 @app.get("/")
 def read_root():
@@ -53,20 +157,34 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "key_cache": _loaded_stats("security", "key_cache")(),
+        "principal_cache": _loaded_stats("dependencies", "principal_cache")(),
+        "kdf": _loaded_stats("security", "kdf_service")(),
+        "audit": _loaded_stats("audit", "audit_writer")(),
+        "rotation": _loaded_stats("rotation", "rotation_manager")(),
+        "db_pool": pool_metrics.stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if not METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    if METRICS_TOKEN and request.headers.get("X-Metrics-Token") != METRICS_TOKEN:
+        return JSONResponse(status_code=401, content={"detail": "Invalid metrics token"})
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
-@app.get("/debug_env")
 def debug_env():
     import os
     status = {"status": "debug"}
     
     # Cek Library
-    try:
-        import pg8000
+    if importlib.util.find_spec("pg8000") is not None:
         status["pg8000"] = "installed ✅"
-    except ImportError as e:
-        status["pg8000"] = f"MISSING ❌: {e}"
-
+    else:
+        status["pg8000"] = "MISSING ❌"
+    
     # Cek ENV
     db_url = os.getenv("DATABASE_URL", "NOT_SET")
     if db_url == "NOT_SET":
@@ -77,6 +195,10 @@ def debug_env():
         
     return status
 
+# Endpoint debug tidak didaftarkan di fast start (serverless / production)
+if not FAST_START:
+    app.get("/debug_env")(debug_env)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
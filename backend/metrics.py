@@ -0,0 +1,226 @@
+"""Metrics in-process dalam format text Prometheus (tanpa dependency tambahan).
+
+Yang dicatat:
+- per route: jumlah request (per status), histogram latency, dan berapa bagian
+  dari latency itu dipakai untuk DB dan crypto (sisanya serialisasi / framework)
+- SecurityManager: durasi bcrypt, PBKDF2, encrypt / decrypt vault
+- database: jumlah query, durasi query, commit dan rollback
+- gauge dari komponen lain (key cache, KDF pool, DB pool, audit writer) lewat collector
+"""
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CRYPTO_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(total)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+    
+    def observe(self, *label_values, value: float) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = _format_labels(self.labels, values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Tuple[str, str, Callable[[], dict]]] = []
+    
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+    
+    def add_gauges(self, prefix: str, help_text: str, stats: Callable[[], dict]) -> None:
+        """Expose field numerik dari fungsi stats() (misal key_cache.stats) sebagai gauge"""
+        self._collectors.append((prefix, help_text, stats))
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, help_text, stats in self._collectors:
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"❌ Metrics collector {prefix} failed: {e}")
+                continue
+            for field, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{field}"
+                lines.append(f"# HELP {name} {help_text} ({field})")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests per route dan status", ("method", "route", "status")
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Latency request per route", ("method", "route")
+)
+http_db_time = registry.histogram(
+    "http_request_db_seconds", "Waktu query DB per request", ("method", "route")
+)
+http_crypto_time = registry.histogram(
+    "http_request_crypto_seconds", "Waktu operasi crypto per request", ("method", "route")
+)
+crypto_latency = registry.histogram(
+    "crypto_operation_duration_seconds", "Durasi operasi SecurityManager", ("operation",), CRYPTO_BUCKETS
+)
+db_queries = registry.counter("db_queries_total", "Jumlah SQL statement")
+db_query_latency = registry.histogram("db_query_duration_seconds", "Durasi SQL statement", buckets=QUERY_BUCKETS)
+db_commits = registry.counter("db_commits_total", "Jumlah commit transaksi")
+db_rollbacks = registry.counter("db_rollbacks_total", "Jumlah rollback transaksi (termasuk penutupan session read-only)")
+
+class RequestTimings:
+    """Akumulasi waktu DB / crypto dalam satu request"""
+    
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.crypto_seconds = 0.0
+
+_request_timings: ContextVar = ContextVar("request_timings", default=None)
+
+def start_request_timings() -> RequestTimings:
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    return timings
+
+def add_request_crypto_time(seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.crypto_seconds += seconds
+
+def observe_crypto(operation: str, seconds: float) -> None:
+    crypto_latency.observe(operation, value=seconds)
+    add_request_crypto_time(seconds)
+
+def timed_crypto(operation: str):
+    """Decorator untuk method SecurityManager, durasinya masuk crypto_operation_duration_seconds"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe_crypto(operation, time.perf_counter() - start)
+        wrapper.metric_operation = operation
+        return wrapper
+    return decorator
+
+def observe_request(method: str, route: str, status: int, seconds: float, timings: Optional[RequestTimings]) -> None:
+    http_requests.inc(method, route, str(status))
+    http_latency.observe(method, route, value=seconds)
+    if timings is not None:
+        http_db_time.observe(method, route, value=timings.db_seconds)
+        http_crypto_time.observe(method, route, value=timings.crypto_seconds)
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    db_queries.inc()
+    db_query_latency.observe(value=elapsed)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.db_seconds += elapsed
+
+def _on_error(exception_context):
+    # Statement gagal tidak memanggil after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("metrics_query_start"):
+        conn.info["metrics_query_start"].pop()
+
+def _on_commit(conn):
+    db_commits.inc()
+
+def _on_rollback(conn):
+    db_rollbacks.inc()
+
+def instrument_queries(engine) -> None:
+    """Pasang listener query / commit ke engine sync (atau async_engine.sync_engine)"""
+    from sqlalchemy import event
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+    event.listen(engine, "handle_error", _on_error)
+    event.listen(engine, "commit", _on_commit)
+    event.listen(engine, "rollback", _on_rollback)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Index, UniqueConstraint, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -9,6 +9,7 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     master_password_hash = Column(String(255), nullable=False)
     biometric_enabled = Column(Integer, default=0)  # 0 = False, 1 = True
+    key_salt_id = Column(Integer, nullable=True)  # salt aktif untuk key vault (KeySalt), dibuat saat pertama kali dipakai
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -26,9 +27,14 @@ class Category(Base):
     icon = Column(String(50), nullable=True)
     is_default = Column(Integer, default=0)  # 0 = custom, 1 = default
     created_at = Column(DateTime, default=datetime.utcnow)
+    change_seq = Column(Integer, nullable=False, default=0)  # vault version saat terakhir berubah (delta sync)
     
     user = relationship("User", back_populates="categories")
     passwords = relationship("Password", back_populates="category")
+    
+    __table_args__ = (
+        Index("ix_categories_user_change_seq", "user_id", "change_seq"),
+    )
 
 class Password(Base):
     __tablename__ = "passwords"
@@ -39,15 +45,34 @@ class Password(Base):
     title = Column(String(200), nullable=False)
     username = Column(String(200), nullable=True)
     email = Column(String(200), nullable=True)
-    encrypted_password = Column(Text, nullable=False)  # AES-256 encrypted
+    encrypted_password = Column(Text, nullable=False, default="")  # format lama: token Fernet base64, kosong setelah di-upgrade
+    ciphertext = Column(LargeBinary, nullable=True)  # envelope biner (security.py), NULL = row format lama
     website = Column(String(500), nullable=True)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = Column(Integer, nullable=False, default=0)  # vault version saat terakhir berubah (delta sync)
     
     user = relationship("User", back_populates="passwords")
     category = relationship("Category", back_populates="passwords")
     activity_logs = relationship("ActivityLog", back_populates="password", cascade="all, delete-orphan")
+    
+    @property
+    def stored_secret(self):
+        """Envelope biner, atau token Fernet untuk row yang belum di-upgrade"""
+        return self.ciphertext if self.ciphertext is not None else self.encrypted_password
+    
+    @stored_secret.setter
+    def stored_secret(self, envelope: bytes):
+        self.ciphertext = envelope
+        self.encrypted_password = ""
+    
+    __table_args__ = (
+        # Keyset pagination GET /passwords
+        Index("ix_passwords_user_created", "user_id", "created_at", "id"),
+        # Delta sync GET /passwords/changes
+        Index("ix_passwords_user_change_seq", "user_id", "change_seq"),
+    )
 
 class ActivityLog(Base):
     __tablename__ = "activity_logs"
@@ -58,6 +83,85 @@ class ActivityLog(Base):
     action = Column(String(50), nullable=False)  # created, updated, deleted, copied, viewed
     description = Column(String(500), nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    rolled_up = Column(Integer, nullable=False, default=0)  # 1 = sudah dihitung di ActivityRollup
     
     user = relationship("User", back_populates="activity_logs")
     password = relationship("Password", back_populates="activity_logs")
+    
+    __table_args__ = (
+        # Keyset pagination GET /history
+        Index("ix_activity_logs_user_timestamp", "user_id", "timestamp", "id"),
+    )
+
+class ActivityRollup(Base):
+    """Ringkasan harian activity log (per action, per password) hasil compaction"""
+    __tablename__ = "activity_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    password_id = Column(Integer, nullable=False, default=0)  # 0 = tidak terkait password, tanpa FK supaya tetap ada setelah password dihapus
+    day = Column(Date, nullable=False)
+    action = Column(String(50), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "action", "password_id", name="uq_activity_rollups_key"),
+    )
+
+class VaultVersion(Base):
+    """Counter per user untuk ETag / conditional GET"""
+    __tablename__ = "vault_versions"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)  # naik setiap perubahan password / category
+    activity_version = Column(Integer, nullable=False, default=0)  # naik setiap activity log berubah
+    tombstone_horizon = Column(Integer, nullable=False, default=0)  # tombstone dengan seq <= ini sudah di-prune
+
+class Tombstone(Base):
+    """Jejak password / category yang dihapus, untuk delta sync client offline"""
+    __tablename__ = "tombstones"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String(20), nullable=False)  # password, category
+    entity_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_tombstones_user_change_seq", "user_id", "change_seq"),
+    )
+
+class KeySalt(Base):
+    """Salt + parameter KDF per user; envelope menyimpan id salt yang dipakai"""
+    __tablename__ = "key_salts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    salt = Column(LargeBinary, nullable=False)
+    kdf = Column(String(20), nullable=False, default="pbkdf2-sha256")
+    iterations = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RotationJob(Base):
+    """Checkpoint job rotasi master password (re-encrypt seluruh vault)"""
+    __tablename__ = "rotation_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(20), nullable=False, default="running")  # running, interrupted, failed, completed
+    new_master_password_hash = Column(String(255), nullable=False)  # dipasang ke users saat job selesai
+    new_key_salt_id = Column(Integer, nullable=True)  # salt untuk key baru, jadi users.key_salt_id saat job selesai
+    last_password_id = Column(Integer, nullable=False, default=0)  # checkpoint: semua id <= ini sudah dirotasi
+    total = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)  # row yang tidak bisa di-decrypt dengan key lama / baru
+    failed_ids = Column(Text, nullable=True)  # id row yang gagal, dipisah koma
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_rotation_jobs_user_status", "user_id", "status"),
+    )
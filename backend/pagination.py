@@ -0,0 +1,51 @@
+"""Keyset (cursor) pagination untuk list yang diurutkan (timestamp DESC, id DESC)"""
+from datetime import datetime
+from sqlalchemy import and_, or_
+from typing import Optional, Tuple
+import base64
+import json
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Cursor opaque untuk client: base64 dari (timestamp, id) row terakhir"""
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Kebalikan encode_cursor, ValueError kalau cursor tidak valid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def page_query(query, timestamp_col, id_col, limit: int, cursor: Optional[str] = None):
+    """Tambahkan filter cursor + order + limit ke Query / select() (newest first).
+    
+    Filter memakai (timestamp, id) < cursor sehingga cost halaman ke-N sama
+    dengan halaman pertama selama ada index (user_id, timestamp, id).
+    """
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            timestamp_col < cursor_ts,
+            and_(timestamp_col == cursor_ts, id_col < cursor_id)
+        ))
+    return query.order_by(timestamp_col.desc(), id_col.desc()).limit(limit + 1)
+
+def split_page(rows: list, timestamp_col, id_col, limit: int):
+    """Potong hasil page_query jadi (rows, next_cursor)"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+def paginate(query, timestamp_col, id_col, limit: int, cursor: Optional[str] = None):
+    """Ambil satu halaman dari Query sync, return (rows, next_cursor)"""
+    rows = page_query(query, timestamp_col, id_col, limit, cursor).all()
+    return split_page(rows, timestamp_col, id_col, limit)
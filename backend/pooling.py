@@ -0,0 +1,210 @@
+"""Profil connection pool per deployment dan metrics pool.
+
+DB_POOL_PROFILE:
+- serverless: NullPool, koneksi dibuka / ditutup per checkout. Aman di belakang
+  pgbouncer / Supabase transaction pooler dan untuk function yang berumur pendek.
+- queue: QueuePool dengan ukuran dari DB_POOL_SIZE / DB_MAX_OVERFLOW, untuk
+  worker yang hidup lama (PythonAnywhere, uvicorn).
+- sqlite: WAL + busy_timeout supaya reader tidak diblok satu writer.
+- auto (default): serverless di Vercel, sqlite untuk URL sqlite, selain itu queue.
+"""
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
+from typing import Optional
+import threading
+import time
+import os
+
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "auto")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # detik menunggu koneksi bebas
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))  # detik menunggu lock writer
+POOL_WAIT_WARN_MS = float(os.getenv("POOL_WAIT_WARN_MS", "0"))  # 0 = tanpa warning
+
+# Batas atas bucket histogram wait time (ms)
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+class PoolMetrics:
+    """Counter checkout / wait time / overflow / pre-ping failure untuk satu engine"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        self.profile = None
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.peak_overflow = 0
+        self.pool = None
+    
+    def record_wait(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total_ms += elapsed_ms
+            if elapsed_ms > self.wait_max_ms:
+                self.wait_max_ms = elapsed_ms
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+        if POOL_WAIT_WARN_MS and elapsed_ms > POOL_WAIT_WARN_MS:
+            print(f"⚠️ Waited {elapsed_ms:.1f} ms for a DB connection (limit {POOL_WAIT_WARN_MS} ms)")
+    
+    def stats(self) -> dict:
+        pool = self.pool
+        stats = {
+            "profile": self.profile,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "ping_failures": self.ping_failures,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else 0.0,
+            "wait_max_ms": round(self.wait_max_ms, 3),
+            "wait_buckets_ms": dict(zip([str(b) for b in WAIT_BUCKETS_MS] + ["inf"], self.wait_buckets)),
+            "peak_overflow": self.peak_overflow,
+        }
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+pool_metrics = PoolMetrics()
+
+class _TimedGetMixin:
+    """Ukur waktu _do_get: menunggu koneksi bebas (QueuePool) atau connect baru (NullPool)"""
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.record_wait((time.perf_counter() - start) * 1000)
+
+class InstrumentedQueuePool(_TimedGetMixin, QueuePool):
+    pass
+
+class InstrumentedNullPool(_TimedGetMixin, NullPool):
+    pass
+
+def resolve_profile(url: str, profile: str = DB_POOL_PROFILE) -> str:
+    if profile != "auto":
+        return profile
+    if url.startswith("sqlite"):
+        return "sqlite"
+    if os.getenv("VERCEL"):
+        return "serverless"
+    return "queue"
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def engine_options(url: str, profile: Optional[str] = None, instrumented: bool = True) -> dict:
+    """kwargs create_engine untuk profil yang dipilih.
+    
+    `instrumented=False` untuk async engine (butuh pool class async bawaan SQLAlchemy).
+    """
+    profile = resolve_profile(url, profile or DB_POOL_PROFILE)
+    if profile == "serverless":
+        # Tanpa pool: tidak ada koneksi basi, jadi pre-ping dan recycle tidak perlu
+        return {"poolclass": InstrumentedNullPool if instrumented else NullPool}
+    if profile == "sqlite":
+        if _is_memory_sqlite(url):
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        options = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT},
+        }
+        if instrumented:
+            options["poolclass"] = InstrumentedQueuePool
+            options["connect_args"]["check_same_thread"] = False
+        else:
+            # Default aiosqlite adalah NullPool yang menolak pool_size / max_overflow
+            options["poolclass"] = AsyncAdaptedQueuePool
+        return options
+    if profile == "queue":
+        options = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+        if instrumented:
+            options["poolclass"] = InstrumentedQueuePool
+        return options
+    raise ValueError(f"Unknown DB_POOL_PROFILE: {profile}")
+
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+    cursor.close()
+
+def instrument_engine(engine, profile: str) -> None:
+    """Pasang listener metrics (dan pragma SQLite) ke engine sync"""
+    pool_metrics.profile = profile
+    pool_metrics.pool = engine.pool
+    
+    if profile == "sqlite" and not _is_memory_sqlite(str(engine.url)):
+        event.listen(engine, "connect", _enable_sqlite_wal)
+    
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_metrics.connects += 1
+    
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.checkouts += 1
+        pool = pool_metrics.pool
+        if isinstance(pool, QueuePool):
+            overflow = pool.overflow()
+            if overflow > pool_metrics.peak_overflow:
+                pool_metrics.peak_overflow = overflow
+    
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_metrics.checkins += 1
+    
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.invalidations += 1
+    
+    @event.listens_for(engine, "engine_disposed")
+    def _on_dispose(engine):
+        pool_metrics.pool = engine.pool
+    
+    # Pre-ping dijalankan lewat dialect.do_ping, hitung yang gagal
+    dialect = engine.dialect
+    original_ping = dialect.do_ping
+    
+    def do_ping(dbapi_connection):
+        try:
+            alive = original_ping(dbapi_connection)
+        except Exception:
+            pool_metrics.ping_failures += 1
+            raise
+        if not alive:
+            pool_metrics.ping_failures += 1
+        return alive
+    
+    dialect.do_ping = do_ping
@@ -0,0 +1,394 @@
+"""Rotasi master password sebagai background job.
+
+Setiap Password.encrypted_password terikat ke key dari master password, jadi
+ganti master password berarti decrypt + encrypt ulang seluruh vault. Job ini:
+- memakai key lama dan baru yang di-derive sekali oleh route (lewat kdf_service)
+- membaca vault per chunk (keyset by id), re-encrypt di thread pool ke
+  envelope dengan salt baru (row format lama ikut di-upgrade), lalu menulis chunk + checkpoint dalam satu transaksi
+  pendek, sehingga tabel passwords tidak terkunci selama rotasi berjalan
+- selama job belum selesai (status di DB) semua worker menolak menulis secret
+  baru (409), karena key yang mereka pegang tidak berlaku lagi setelah job selesai;
+  UPDATE job memakai compare-and-set pada ciphertext lama, dan sebelum selesai job
+  menyapu ulang row yang masih memakai salt lama (tulisan yang lolos tepat saat job mulai)
+- checkpoint disimpan di rotation_jobs; setelah crash / restart, POST ulang
+  dengan master password lama dan baru yang sama melanjutkan dari checkpoint
+  (sampai dilanjutkan, entry yang sudah dirotasi hanya terbuka dengan key baru)
+
+Kalau ada row yang gagal di-decrypt, job berakhir "failed": hash master password
+dan salt lama tetap dipakai (row itu masih terbuka dengan key lama) dan id-nya
+dilaporkan di failed_ids. Setelah row itu diperbaiki / dihapus, POST ulang
+memindai vault dari awal; row yang sudah dirotasi cukup dilewati.
+
+Job berjalan di background thread process yang menerima request, jadi butuh
+server yang hidup terus (uvicorn / gunicorn). Di serverless (VERCEL) thread
+dibekukan di antara invocation, sehingga endpoint rotasi dimatikan
+(ROTATION_ENABLED). Dengan beberapa worker, job yang masih berdetak
+(updated_at < ROTATION_STALE_SECONDS) tidak bisa dilanjutkan worker lain.
+
+Selama job berjalan security.register_key_rotation membuat vault tetap bisa
+dibaca lewat session lama di process ini. Setelah selesai hash master password diganti, semua session user
+di-revoke (derived key ikut dibuang) dan principal cache di-invalidate oleh
+event commit User.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, or_, update
+from typing import Optional
+import struct
+import threading
+import time
+import os
+from database import SessionLocal
+from models import User, Password, RotationJob
+from security import (
+    SecurityManager, VaultKeyring, ENVELOPE_SALT_ID_OFFSET, envelope_salt_id,
+    register_key_rotation, unregister_key_rotation
+)
+from sessions import session_store
+from audit import audit_writer
+
+ROTATION_CHUNK_SIZE = int(os.getenv("ROTATION_CHUNK_SIZE", "500"))
+ROTATION_WORKERS = int(os.getenv("ROTATION_WORKERS", str(min(4, os.cpu_count() or 1))))
+ROTATION_ENABLED = os.getenv("ROTATION_ENABLED", "0" if os.getenv("VERCEL") else "1") == "1"
+ROTATION_STALE_SECONDS = int(os.getenv("ROTATION_STALE_SECONDS", "60"))  # job "running" tanpa checkpoint baru dianggap mati
+
+UNFINISHED_STATUSES = ("running", "interrupted", "failed")
+
+_passwords = Password.__table__
+# Compare-and-set: hanya tulis kalau ciphertext belum diubah request lain.
+# updated_at dipertahankan, rotasi bukan perubahan dari user.
+_update_token = update(_passwords).where(
+    _passwords.c.id == bindparam("row_id"),
+    _passwords.c.encrypted_password == bindparam("old_token"),
+    func.coalesce(_passwords.c.ciphertext, b"") == bindparam("old_ciphertext")
+).values(ciphertext=bindparam("new_ciphertext"), encrypted_password="", updated_at=_passwords.c.updated_at)
+
+def _parse_ids(value: Optional[str]) -> list:
+    return [int(part) for part in value.split(",")] if value else []
+
+class RotationConflict(Exception):
+    """Job rotasi lain untuk user ini sedang berjalan / memakai master password baru yang berbeda"""
+
+def _rotate_slice(old: VaultKeyring, new: VaultKeyring, rows) -> tuple:
+    """Re-encrypt [(id, ciphertext, token)] ke keyring baru, return (params UPDATE, jumlah sudah baru, id gagal)"""
+    params, current, failed = [], 0, []
+    for row_id, ciphertext, token in rows:
+        try:
+            if ciphertext is not None and envelope_salt_id(bytes(ciphertext)) == new.salt_id:
+                current += 1  # sudah ditulis ulang dengan key baru oleh request lain
+                continue
+            plain = SecurityManager.decrypt_with_key(ciphertext if ciphertext is not None else token, old)
+        except ValueError:  # envelope rusak / key salah
+            failed.append(row_id)
+            continue
+        params.append({
+            "row_id": row_id,
+            "old_token": token,
+            "old_ciphertext": bytes(ciphertext) if ciphertext is not None else b"",
+            "new_ciphertext": SecurityManager.encrypt_with_key(plain, new),
+        })
+    return params, current, failed
+
+class RotationManager:
+    """Jalankan dan pantau job rotasi (satu thread per job, re-encrypt di pool bersama)"""
+    
+    def __init__(self, chunk_size: int = ROTATION_CHUNK_SIZE, workers: int = ROTATION_WORKERS):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._live = {}  # job_id -> progress in-memory (throughput run ini)
+        self.rows_rotated = 0
+        self.chunks_committed = 0
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rotation")
+        return self._executor
+    
+    def is_active(self, job_id: int) -> bool:
+        return job_id in self._live
+    
+    def find_unfinished(self, user_id: int) -> Optional[RotationJob]:
+        db = SessionLocal()
+        try:
+            return db.query(RotationJob).filter(
+                RotationJob.user_id == user_id,
+                RotationJob.status.in_(UNFINISHED_STATUSES)
+            ).order_by(RotationJob.id.desc()).first()
+        finally:
+            db.close()
+    
+    def has_unfinished(self, user_id: int) -> bool:
+        """Ada job yang belum selesai: lazy upgrade per row ditunda, row diserahkan ke job"""
+        db = SessionLocal()
+        try:
+            return db.query(db.query(RotationJob.id).filter(
+                RotationJob.user_id == user_id,
+                RotationJob.status.in_(UNFINISHED_STATUSES)
+            ).exists()).scalar()
+        finally:
+            db.close()
+    
+    def start(self, user_id: int, old: VaultKeyring, new: VaultKeyring,
+              new_master_password_hash: Optional[str] = None, resume_job_id: Optional[int] = None) -> dict:
+        """Buat job baru (atau lanjutkan `resume_job_id`) dan jalankan di background thread"""
+        with self._lock:
+            db = SessionLocal()
+            try:
+                unfinished = db.query(RotationJob).filter(
+                    RotationJob.user_id == user_id,
+                    RotationJob.status.in_(UNFINISHED_STATUSES)
+                ).order_by(RotationJob.id.desc()).first()
+                if unfinished is not None and (unfinished.id in self._live or unfinished.id != resume_job_id):
+                    raise RotationConflict("Another master password rotation is in progress")
+                if unfinished is not None and unfinished.status == "running" and \
+                        unfinished.updated_at > datetime.utcnow() - timedelta(seconds=ROTATION_STALE_SECONDS):
+                    # Masih berdetak di worker / process lain
+                    raise RotationConflict("Master password rotation is running in another worker")
+                if unfinished is None:
+                    if resume_job_id is not None or new_master_password_hash is None:
+                        raise RotationConflict("Rotation job to resume was not found")
+                    job = RotationJob(
+                        user_id=user_id,
+                        new_master_password_hash=new_master_password_hash,
+                        last_password_id=0,
+                        processed=0,
+                        failed=0
+                    )
+                    db.add(job)
+                else:
+                    job = unfinished
+                    job.error = None
+                    if job.failed:
+                        # Run sebelumnya gagal di beberapa row: pindai ulang semua, row yang sudah baru dilewati
+                        job.last_password_id = 0
+                        job.processed = 0
+                        job.failed = 0
+                        job.failed_ids = None
+                job.new_key_salt_id = new.salt_id
+                job.status = "running"
+                # Total dihitung ulang saat resume: entry bisa bertambah / terhapus sejak run sebelumnya
+                remaining = db.query(func.count(Password.id)).filter(
+                    Password.user_id == user_id,
+                    Password.id > job.last_password_id
+                ).scalar()
+                job.total = job.processed + job.failed + remaining
+                db.commit()
+                job_id = job.id
+                self._live[job_id] = {"started": time.monotonic(), "processed": 0}
+                progress = self._progress(job)
+            finally:
+                db.close()
+    
+        register_key_rotation(old, new)
+        thread = threading.Thread(
+            target=self._run, args=(job_id, user_id, old, new),
+            name=f"rotation-{job_id}", daemon=True
+        )
+        thread.start()
+        return progress
+    
+    def _run(self, job_id: int, user_id: int, old: VaultKeyring, new: VaultKeyring) -> None:
+        executor = self._get_executor()
+        live = self._live[job_id]
+        status = "failed"
+        try:
+            while True:
+                if self._stop.is_set():
+                    status = "interrupted"
+                    return
+                if not self._rotate_chunk(job_id, user_id, old, new, executor, live):
+                    break
+            self._sweep(job_id, user_id, old, new)
+            failed_ids = self._failed_ids(job_id)
+            if failed_ids:
+                # Jangan ganti master password: row ini hanya bisa dibuka dengan key lama
+                self._mark(job_id, "failed", f"{len(failed_ids)} entries could not be decrypted, fix or delete them and retry")
+                print(f"❌ Master password rotation {job_id} failed: undecryptable entries {failed_ids[:20]}")
+                return
+            self._finish(job_id, user_id)
+            status = "completed"
+            unregister_key_rotation(old)
+            audit_writer.record(user_id, "rotated", "Changed master password and re-encrypted vault")
+            print(f"✅ Master password rotation {job_id} completed ({live['processed']} rows)")
+        except Exception as e:
+            self._mark(job_id, "failed", str(e))
+            print(f"❌ Master password rotation {job_id} failed: {e}")
+        finally:
+            if status == "interrupted":
+                self._mark(job_id, "interrupted")
+            self._live.pop(job_id, None)
+    
+    def _rotate_chunk(self, job_id: int, user_id: int, old: VaultKeyring, new: VaultKeyring, executor, live: dict) -> bool:
+        """Rotasi satu chunk setelah checkpoint, return False kalau vault sudah habis"""
+        db = SessionLocal()
+        try:
+            job = db.get(RotationJob, job_id)
+            rows = db.query(Password.id, Password.ciphertext, Password.encrypted_password).filter(
+                Password.user_id == user_id,
+                Password.id > job.last_password_id
+            ).order_by(Password.id).limit(self.chunk_size).all()
+            if not rows:
+                return False
+    
+            # Bagi chunk ke worker; AES-GCM / Fernet di OpenSSL jalan paralel
+            step = max(1, -(-len(rows) // self.workers))
+            slices = [rows[i:i + step] for i in range(0, len(rows), step)]
+            params, current, failed = [], 0, []
+            for slice_params, slice_current, slice_failed in executor.map(lambda part: _rotate_slice(old, new, part), slices):
+                params.extend(slice_params)
+                current += slice_current
+                failed.extend(slice_failed)
+    
+            # Chunk + checkpoint dalam satu transaksi pendek
+            if params:
+                db.connection().execute(_update_token, params)
+            job.last_password_id = rows[-1][0]
+            job.processed += len(params) + current
+            job.failed += len(failed)
+            if failed:
+                job.failed_ids = ",".join(filter(None, [job.failed_ids, ",".join(map(str, failed))]))
+            db.commit()
+        finally:
+            db.close()
+    
+        live["processed"] += len(params) + current
+        self.rows_rotated += len(params)
+        self.chunks_committed += 1
+        return True
+    
+    def _sweep(self, job_id: int, user_id: int, old: VaultKeyring, new: VaultKeyring) -> None:
+        """Rotasi row di belakang checkpoint yang masih memakai key lama.
+        
+        Worker lain menolak menulis secret selama job belum selesai, tapi tulisan
+        yang lolos cek tepat saat job dibuat bisa mendarat di row yang sudah dilewati.
+        """
+        salt_bytes = func.substr(Password.ciphertext, ENVELOPE_SALT_ID_OFFSET + 1, 4)
+        new_salt = struct.pack(">I", new.salt_id)
+        known_failed = set(self._failed_ids(job_id))
+        after = 0
+        while True:
+            db = SessionLocal()
+            try:
+                rows = db.query(Password.id, Password.ciphertext, Password.encrypted_password).filter(
+                    Password.user_id == user_id,
+                    Password.id > after,
+                    or_(Password.ciphertext.is_(None), salt_bytes != new_salt)
+                ).order_by(Password.id).limit(self.chunk_size).all()
+                if not rows:
+                    return
+                after = rows[-1][0]
+                params, _, failed = _rotate_slice(old, new, [row for row in rows if row[0] not in known_failed])
+                if params:
+                    db.connection().execute(_update_token, params)
+                if failed:
+                    job = db.get(RotationJob, job_id)
+                    job.failed += len(failed)
+                    job.failed_ids = ",".join(filter(None, [job.failed_ids, ",".join(map(str, failed))]))
+                db.commit()
+            finally:
+                db.close()
+            self.rows_rotated += len(params)
+    
+    def _failed_ids(self, job_id: int) -> list:
+        db = SessionLocal()
+        try:
+            return _parse_ids(db.query(RotationJob.failed_ids).filter(RotationJob.id == job_id).scalar())
+        finally:
+            db.close()
+    
+    def _finish(self, job_id: int, user_id: int) -> None:
+        db = SessionLocal()
+        try:
+            job = db.get(RotationJob, job_id)
+            user = db.get(User, user_id)
+            # Lewat ORM supaya event commit ikut membuang principal cache user ini
+            user.master_password_hash = job.new_master_password_hash
+            user.key_salt_id = job.new_key_salt_id
+            job.status = "completed"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+        # Key lama tidak berlaku lagi: semua session harus login ulang dengan master password baru
+        session_store.revoke_user(user_id)
+    
+    def _mark(self, job_id: int, status: str, error: Optional[str] = None) -> None:
+        db = SessionLocal()
+        try:
+            job = db.get(RotationJob, job_id)
+            if job is not None:
+                job.status = status
+                job.error = error
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Failed to update rotation job {job_id}: {e}")
+        finally:
+            db.close()
+    
+    def latest(self, user_id: int) -> Optional[dict]:
+        """Progress job terakhir milik user"""
+        db = SessionLocal()
+        try:
+            job = db.query(RotationJob).filter(
+                RotationJob.user_id == user_id
+            ).order_by(RotationJob.id.desc()).first()
+            return self._progress(job) if job else None
+        finally:
+            db.close()
+    
+    def _progress(self, job: RotationJob) -> dict:
+        status = job.status
+        live = self._live.get(job.id)
+        if status == "running" and live is None:
+            status = "interrupted"  # process berhenti di tengah job
+        rate = 0.0
+        eta = None
+        if live is not None:
+            elapsed = time.monotonic() - live["started"]
+            rate = live["processed"] / elapsed if elapsed > 0 else 0.0
+            remaining = max(0, job.total - job.processed - job.failed)
+            eta = round(remaining / rate, 1) if rate > 0 else None
+        return {
+            "job_id": job.id,
+            "status": status,
+            "total": job.total,
+            "processed": job.processed,
+            "failed": job.failed,
+            "failed_ids": _parse_ids(job.failed_ids),
+            "checkpoint": job.last_password_id,
+            "rows_per_second": round(rate, 1),
+            "eta_seconds": eta,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "error": job.error,
+        }
+    
+    def stop(self, timeout: float = 10) -> None:
+        """Hentikan job setelah chunk yang sedang jalan (checkpoint tetap konsisten)"""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        while self._live and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if not self._live:
+            self._stop.clear()
+    
+    def stats(self) -> dict:
+        return {
+            "active_jobs": len(self._live),
+            "workers": self.workers,
+            "chunk_size": self.chunk_size,
+            "rows_rotated": self.rows_rotated,
+            "chunks_committed": self.chunks_committed,
+        }
+
+rotation_manager = RotationManager()
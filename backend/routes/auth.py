@@ -1,77 +1,127 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal
 from models import User, Category
-from schemas import UserSetup, UserLogin, AuthResponse
-from security import SecurityManager
+from schemas import UserSetup, UserLogin, AuthResponse, MasterPasswordRotate, RotationJobResponse
+from security import SecurityManager, key_cache, run_crypto
+from sessions import session_store
+from dependencies import get_session_token, get_optional_principal, get_current_user, verify_master_password, Principal
+from rotation import rotation_manager, RotationConflict, ROTATION_ENABLED
+from vault_keys import create_key_salt, get_key_params, new_key_params, derive_keyring
+from typing import Optional
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+def _user_exists() -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(User.id).first() is not None
+    finally:
+        db.close()
+
+def _create_user(hashed_password: str, biometric_enabled: bool) -> tuple:
+    """Buat user, kategori default dan salt vault; return (user_id, key_salt_id)"""
+    db = SessionLocal()
+    try:
+        # Cek ulang di transaksi ini: setup paralel hanya boleh membuat satu user
+        if db.query(User.id).first() is not None:
+            raise HTTPException(status_code=400, detail="Master password already set")
+        new_user = User(
+            master_password_hash=hashed_password,
+            biometric_enabled=1 if biometric_enabled else 0
+        )
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        
+        # Create default categories
+        default_categories = [
+            {"name": "Personal", "color": "#D5B3E0", "icon": "person", "is_default": 1},
+            {"name": "Work", "color": "#B4C7E7", "icon": "briefcase", "is_default": 1},
+            {"name": "Social", "color": "#F4C2C2", "icon": "users", "is_default": 1},
+            {"name": "Banking", "color": "#FBBF24", "icon": "bank", "is_default": 1},
+        ]
+        
+        for cat_data in default_categories:
+            category = Category(
+                user_id=new_user.id,
+                name=cat_data["name"],
+                color=cat_data["color"],
+                icon=cat_data["icon"],
+                is_default=cat_data["is_default"]
+            )
+            db.add(category)
+        
+        # Salt vault per user
+        key_salt = create_key_salt(db, new_user.id)
+        new_user.key_salt_id = key_salt.id
+        db.commit()
+        return new_user.id, key_salt.id
+    finally:
+        db.close()
+
 @router.post("/setup", response_model=AuthResponse)
-def setup_master_password(user_data: UserSetup, db: Session = Depends(get_db)):
+async def setup_master_password(user_data: UserSetup):
     """Setup master password untuk first-time user"""
     
     # Check if user already exists
-    existing_user = db.query(User).first()
-    if existing_user:
+    if await run_in_threadpool(_user_exists):
         raise HTTPException(status_code=400, detail="Master password already set")
     
-    # Hash master password
-    hashed_password = SecurityManager.hash_master_password(user_data.master_password)
+    # Hash master password (bcrypt di kdf_service, ikut antrian dan 503 saat penuh)
+    hashed_password = await run_crypto(SecurityManager.hash_master_password, user_data.master_password)
+    user_id, key_salt_id = await run_in_threadpool(_create_user, hashed_password, user_data.biometric_enabled)
     
-    # Create user
-    new_user = User(
-        master_password_hash=hashed_password,
-        biometric_enabled=1 if user_data.biometric_enabled else 0
+    # Generate session token + simpan derived key untuk session ini (PBKDF2 juga lewat kdf_service)
+    params = await run_in_threadpool(get_key_params, key_salt_id)
+    token = session_store.create(user_id)
+    key_cache.put(
+        session_store.hash_token(token),
+        await derive_keyring(user_data.master_password, user_id, params)
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    # Create default categories
-    default_categories = [
-        {"name": "Personal", "color": "#D5B3E0", "icon": "person", "is_default": 1},
-        {"name": "Work", "color": "#B4C7E7", "icon": "briefcase", "is_default": 1},
-        {"name": "Social", "color": "#F4C2C2", "icon": "users", "is_default": 1},
-        {"name": "Banking", "color": "#FBBF24", "icon": "bank", "is_default": 1},
-    ]
-    
-    for cat_data in default_categories:
-        category = Category(
-            user_id=new_user.id,
-            name=cat_data["name"],
-            color=cat_data["color"],
-            icon=cat_data["icon"],
-            is_default=cat_data["is_default"]
-        )
-        db.add(category)
-    
-    db.commit()
-    
-    # Generate session token
-    token = SecurityManager.generate_session_token(new_user.id)
     
     return AuthResponse(
-        user_id=new_user.id,
+        user_id=user_id,
         token=token,
         message="Master password setup successful"
     )
 
+def _store_rehash(user_id: int, old_hash: str, new_hash: str) -> None:
+    """Simpan hash dengan cost baru, kecuali hash sudah diganti request lain"""
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if user is not None and user.master_password_hash == old_hash:
+            user.master_password_hash = new_hash  # lewat ORM: principal cache ikut di-invalidate
+            db.commit()
+    finally:
+        db.close()
+
 @router.post("/login", response_model=AuthResponse)
-def login(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login(login_data: UserLogin, user: Optional[Principal] = Depends(get_optional_principal)):
     """Login dengan master password"""
     
     # Get user
-    user = db.query(User).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found. Please setup first.")
     
-    # Verify password
-    if not SecurityManager.verify_master_password(login_data.master_password, user.master_password_hash):
+    # Verify password terhadap hash terbaru di DB (bcrypt di crypto executor, event loop tetap jalan)
+    hashed = await verify_master_password(user.id, login_data.master_password)
+    if hashed is None:
         raise HTTPException(status_code=401, detail="Invalid master password")
     
-    # Generate token
-    token = SecurityManager.generate_session_token(user.id)
+    # Hash dengan cost lama (BCRYPT_ROUNDS sudah dinaikkan): rehash selagi password plaintext ada
+    if SecurityManager.needs_rehash(hashed):
+        new_hash = await run_crypto(SecurityManager.hash_master_password, login_data.master_password)
+        await run_in_threadpool(_store_rehash, user.id, hashed, new_hash)
+    
+    # Generate token, key di-derive sekali di sini supaya request berikutnya cukup pakai token
+    # (upgrade=True: salt dengan iterasi KDF lama diganti salt baru)
+    token = session_store.create(user.id)
+    key_cache.put(
+        session_store.hash_token(token),
+        await derive_keyring(login_data.master_password, user.id, upgrade=True)
+    )
     
     return AuthResponse(
         user_id=user.id,
@@ -80,28 +130,83 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
     )
 
 @router.get("/check")
-def check_setup(db: Session = Depends(get_db)):
+def check_setup(user: Optional[Principal] = Depends(get_optional_principal)):
     """Check apakah user sudah setup master password"""
-    user = db.query(User).first()
     return {
         "setup_complete": user is not None,
         "biometric_enabled": user.biometric_enabled if user else False
     }
 
 @router.post("/verify-biometric")
-def verify_biometric(db: Session = Depends(get_db)):
+def verify_biometric(user: Optional[Principal] = Depends(get_optional_principal)):
     """Verify biometric authentication (client-side handled, server just generates token)"""
-    user = db.query(User).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     if not user.biometric_enabled:
         raise HTTPException(status_code=400, detail="Biometric not enabled")
     
-    token = SecurityManager.generate_session_token(user.id)
+    token = session_store.create(user.id)
     
     return AuthResponse(
         user_id=user.id,
         token=token,
         message="Biometric authentication successful"
     )
+
+@router.post("/logout")
+def logout(token: Optional[str] = Depends(get_session_token)):
+    """Logout / auto-lock: revoke session dan hapus derived key-nya dari memory"""
+    if token:
+        session_store.revoke(token)
+    return {"message": "Logged out"}
+
+@router.post("/master-password/rotate", response_model=RotationJobResponse, status_code=202)
+async def rotate_master_password(data: MasterPasswordRotate, user: Principal = Depends(get_current_user)):
+    """Ganti master password: vault di-encrypt ulang oleh background job.
+    
+    Kalau job sebelumnya terhenti (crash / restart), request yang sama
+    melanjutkan dari checkpoint. Setelah selesai semua session di-revoke,
+    login ulang dengan master password baru. Progress: GET /auth/master-password/rotation.
+    Tidak tersedia di serverless (ROTATION_ENABLED), job butuh process yang hidup terus.
+    """
+    if not ROTATION_ENABLED:
+        raise HTTPException(status_code=503, detail="Master password rotation needs a long-running server")
+    if await verify_master_password(user.id, data.current_master_password) is None:
+        raise HTTPException(status_code=401, detail="Invalid master password")
+    if data.new_master_password == data.current_master_password:
+        raise HTTPException(status_code=400, detail="New master password must be different")
+    
+    unfinished = await run_in_threadpool(rotation_manager.find_unfinished, user.id)
+    new_hash = None
+    if unfinished is not None:
+        if rotation_manager.is_active(unfinished.id):
+            raise HTTPException(status_code=409, detail="Master password rotation already running")
+        if not await run_crypto(SecurityManager.verify_master_password, data.new_master_password, unfinished.new_master_password_hash):
+            raise HTTPException(status_code=409, detail="Unfinished rotation uses a different new master password")
+    else:
+        new_hash = await run_crypto(SecurityManager.hash_master_password, data.new_master_password)
+    
+    # Key lama dan baru di-derive sekali untuk seluruh job; key baru memakai salt baru
+    # (salt yang sama saat melanjutkan job)
+    if unfinished is not None and unfinished.new_key_salt_id is not None:
+        new_params = await run_in_threadpool(get_key_params, unfinished.new_key_salt_id)
+    else:
+        new_params = await run_in_threadpool(new_key_params, user.id)
+    old_keyring = await derive_keyring(data.current_master_password, user.id)
+    new_keyring = await derive_keyring(data.new_master_password, user.id, new_params)
+    try:
+        return await run_in_threadpool(
+            rotation_manager.start, user.id, old_keyring, new_keyring, new_hash,
+            unfinished.id if unfinished is not None else None
+        )
+    except RotationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/master-password/rotation", response_model=RotationJobResponse)
+def get_rotation_progress(user: Principal = Depends(get_current_user)):
+    """Progress job rotasi master password terakhir (throughput, ETA, checkpoint)"""
+    progress = rotation_manager.latest(user.id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="No master password rotation found")
+    return progress
@@ -1,33 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
-from database import get_db
-from models import User, Category
+from database import get_db, get_read_db, fetch_scalars
+from models import Category, VaultVersion
+from dependencies import Principal, get_current_user
 from schemas import CategoryCreate, CategoryUpdate, CategoryResponse
+from versioning import version_query, make_etag, etag_matches, not_modified, set_etag
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
-def get_current_user(db: Session = Depends(get_db)) -> User:
-    """Get current user"""
-    user = db.query(User).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
 @router.get("", response_model=List[CategoryResponse])
-def get_categories(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+async def get_categories(
+    request: Request,
+    response: Response,
+    db = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
 ):
-    """Get all categories"""
-    categories = db.query(Category).filter(Category.user_id == user.id).order_by(Category.is_default.desc(), Category.name).all()
+    """Get all categories (mendukung If-None-Match)"""
+    version = await fetch_scalars(db, version_query(user.id, VaultVersion.version))
+    etag = make_etag("c", version[0] if version else 0, request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    stmt = select(Category).where(Category.user_id == user.id).order_by(Category.is_default.desc(), Category.name)
+    categories = await fetch_scalars(db, stmt)
     return categories
 
 @router.post("", response_model=CategoryResponse)
 def create_category(
     category_data: CategoryCreate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """Create custom category"""
     new_category = Category(
@@ -49,7 +54,7 @@ def update_category(
     category_id: int,
     category_data: CategoryUpdate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """Update category"""
     category = db.query(Category).filter(
@@ -80,7 +85,7 @@ def update_category(
 def delete_category(
     category_id: int,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """Delete custom category"""
     category = db.query(Category).filter(
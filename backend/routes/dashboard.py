@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, noload
+from database import get_db
+from models import Password, Category, ActivityLog, VaultVersion
+from dependencies import Principal, get_current_user
+from schemas import DashboardSummaryResponse, CategoryCount
+from audit import audit_writer
+from versioning import make_etag, etag_matches, not_modified, set_etag
+from pagination import page_query, split_page, MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+@router.get("/summary", response_model=DashboardSummaryResponse)
+def get_dashboard_summary(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    history_limit: int = Query(10, ge=0, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Data awal dashboard dalam satu request: category + jumlah password,
+    halaman pertama password dan history terbaru.
+    
+    Satu session: version, GROUP BY jumlah per category, category, halaman
+    password dan history. Mendukung If-None-Match (304) dari vault dan activity version.
+    """
+    if audit_writer.pending:
+        audit_writer.flush()
+    
+    versions = db.execute(
+        select(VaultVersion.version, VaultVersion.activity_version).where(VaultVersion.user_id == user.id)
+    ).first()
+    vault_version, activity_version = versions if versions else (0, 0)
+    etag = make_etag(f"d-{vault_version}", activity_version, request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    # Jumlah per category_id (NULL = tanpa category) dari satu GROUP BY
+    counts = dict(db.execute(
+        select(Password.category_id, func.count(Password.id))
+        .where(Password.user_id == user.id)
+        .group_by(Password.category_id)
+    ).all())
+    categories = db.execute(
+        select(Category).where(Category.user_id == user.id).order_by(Category.is_default.desc(), Category.name)
+    ).scalars().all()
+    
+    # Category sudah ada di `categories`, jadi password tidak perlu load relasinya
+    passwords_stmt = page_query(
+        select(Password).options(noload(Password.category)).where(Password.user_id == user.id),
+        Password.created_at, Password.id, limit
+    )
+    passwords, next_cursor = split_page(db.execute(passwords_stmt).scalars().all(), Password.created_at, Password.id, limit)
+    
+    history, history_next_cursor = [], None
+    if history_limit:
+        history_stmt = page_query(
+            select(ActivityLog).where(ActivityLog.user_id == user.id),
+            ActivityLog.timestamp, ActivityLog.id, history_limit
+        )
+        history, history_next_cursor = split_page(
+            db.execute(history_stmt).scalars().all(), ActivityLog.timestamp, ActivityLog.id, history_limit
+        )
+    
+    return {
+        "total_passwords": sum(counts.values()),
+        "uncategorized": counts.get(None, 0),
+        "categories": [
+            CategoryCount(
+                id=category.id,
+                name=category.name,
+                color=category.color,
+                icon=category.icon,
+                is_default=category.is_default,
+                created_at=category.created_at,
+                password_count=counts.get(category.id, 0)
+            )
+            for category in categories
+        ],
+        "passwords": passwords,
+        "next_cursor": next_cursor,
+        "history": history,
+        "history_next_cursor": history_next_cursor,
+    }
@@ -1,28 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, func
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import User, ActivityLog
-from schemas import ActivityLogResponse
+from typing import List, Optional
+from database import get_db, get_read_db, fetch_scalars
+from models import Password, ActivityLog, ActivityRollup, VaultVersion
+from dependencies import Principal, get_current_user
+from schemas import ActivityLogResponse, ActivityStatsResponse, ActivityDayCount, ActivityTopEntry
+from audit import audit_writer, as_date, start_of_day
+from starlette.concurrency import run_in_threadpool
+from versioning import version_query, make_etag, etag_matches, not_modified, set_etag
+from pagination import page_query, split_page, NEXT_CURSOR_HEADER, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/history", tags=["Activity History"])
 
-def get_current_user(db: Session = Depends(get_db)) -> User:
-    """Get current user"""
-    user = db.query(User).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
 @router.get("", response_model=List[ActivityLogResponse])
-def get_activity_history(
-    limit: int = 50,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+async def get_activity_history(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db = Depends(get_read_db),
+    user: Principal = Depends(get_current_user)
 ):
-    """Get activity history timeline"""
-    activities = db.query(ActivityLog).filter(
-        ActivityLog.user_id == user.id
-    ).order_by(ActivityLog.timestamp.desc()).limit(limit).all()
+    """Get activity history timeline (cursor halaman berikutnya di header X-Next-Cursor)"""
+    # Event write-behind yang belum di-flush ikut ditulis dulu supaya timeline lengkap
+    if audit_writer.pending:
+        await run_in_threadpool(audit_writer.flush)
+    
+    version = await fetch_scalars(db, version_query(user.id, VaultVersion.activity_version))
+    etag = make_etag("h", version[0] if version else 0, request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    stmt = select(ActivityLog).where(ActivityLog.user_id == user.id)
+    
+    try:
+        stmt = page_query(stmt, ActivityLog.timestamp, ActivityLog.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = await fetch_scalars(db, stmt)
+    activities, next_cursor = split_page(rows, ActivityLog.timestamp, ActivityLog.id, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return activities
+
+USAGE_ACTIONS = ("copied", "viewed")
+
+@router.get("/stats", response_model=ActivityStatsResponse)
+def get_activity_stats(
+    days: int = Query(30, ge=1, le=3650),
+    top: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Statistik aktivitas (per hari, total per action, entry paling sering dipakai).
+    
+    Dijawab dari ActivityRollup; raw log hanya dibaca untuk row yang belum
+    rolled_up (biasanya cuma hari ini).
+    """
+    audit_writer.flush()
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    counts = {}  # (day, action, password_id) -> count
+    
+    rollups = db.query(
+        ActivityRollup.day, ActivityRollup.action, ActivityRollup.password_id, ActivityRollup.count
+    ).filter(
+        ActivityRollup.user_id == user.id,
+        ActivityRollup.day >= since
+    )
+    for day, action, password_id, count in rollups:
+        key = (as_date(day), action, password_id)
+        counts[key] = counts.get(key, 0) + count
+    
+    # Row yang belum di-compact masih dihitung dari raw log
+    day_col = func.date(ActivityLog.timestamp)
+    raw = db.query(day_col, ActivityLog.action, ActivityLog.password_id, func.count(ActivityLog.id)).filter(
+        ActivityLog.user_id == user.id,
+        ActivityLog.rolled_up == 0,
+        ActivityLog.timestamp >= start_of_day(since)
+    ).group_by(day_col, ActivityLog.action, ActivityLog.password_id)
+    for day, action, password_id, count in raw:
+        key = (as_date(day), action, password_id or 0)
+        counts[key] = counts.get(key, 0) + count
+    
+    per_day, totals, usage = {}, {}, {}
+    for (day, action, password_id), count in counts.items():
+        per_day[(day, action)] = per_day.get((day, action), 0) + count
+        totals[action] = totals.get(action, 0) + count
+        if action in USAGE_ACTIONS and password_id:
+            usage[password_id] = usage.get(password_id, 0) + count
+    
+    top_ids = sorted(usage, key=lambda pid: (-usage[pid], pid))[:top]
+    titles = dict(db.query(Password.id, Password.title).filter(
+        Password.user_id == user.id,
+        Password.id.in_(top_ids)
+    )) if top_ids else {}
+    
+    return ActivityStatsResponse(
+        since=since,
+        per_day=[
+            ActivityDayCount(day=day, action=action, count=count)
+            for (day, action), count in sorted(per_day.items())
+        ],
+        totals=totals,
+        top_entries=[
+            ActivityTopEntry(password_id=pid, title=titles.get(pid), count=usage[pid])
+            for pid in top_ids
+        ]
+    )
+
+@router.post("/compact")
+def compact_activity_history(user: Principal = Depends(get_current_user)):
+    """Jalankan compaction + retention sekarang (untuk cron di deployment serverless)"""
+    return audit_writer.compact()
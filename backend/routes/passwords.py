@@ -1,59 +1,297 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from database import get_db
-from models import User, Password, ActivityLog
-from schemas import PasswordCreate, PasswordUpdate, PasswordResponse, PasswordDecrypted
-from security import SecurityManager
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload, noload
+from typing import List, Optional, Literal
+import time
+import uuid
+from database import get_db, SessionLocal
+from models import Password, Category, Tombstone, VaultVersion
+from schemas import (
+    PasswordCreate, PasswordUpdate, PasswordResponse, PasswordDecrypted,
+    PasswordBatchDecryptRequest, PasswordDecryptedItem, PasswordBatchDecrypted,
+    VaultChangesResponse, PasswordGenerateRequest, PasswordGenerateResponse,
+    BreachAuditResponse
+)
+from security import SecurityManager, VaultKeyring
+from dependencies import get_vault_key, Principal, get_current_user
+from pagination import paginate, NEXT_CURSOR_HEADER, MAX_PAGE_SIZE
+from search import search_index
+from versioning import get_version, make_etag, etag_matches, not_modified, set_etag
+from audit import audit_writer, log_activity
+from generator import generate_batch, strength_label
+from breach import get_breach_corpus, sha1_digest, audit_sorted, DigestSpool, BREACH_AUDIT_BATCH_SIZE
+from vault_keys import upgrade_secret
+from rotation import rotation_manager
+from serialization import (
+    FastJSONResponse, NDJSON_MEDIA_TYPE, STREAM_BATCH_SIZE,
+    wants_ndjson, iter_ndjson, password_columns, password_row
+)
+from vault_io import (
+    IMPORT_CHUNK_SIZE, EXPORT_BATCH_SIZE, import_progress,
+    iter_records, normalize_entry, dedupe_key, detect_format, stream_export
+)
 
 router = APIRouter(prefix="/passwords", tags=["Passwords"])
 
-def get_current_user(db: Session = Depends(get_db)) -> User:
-    """Get current user (simplified, production should use JWT)"""
-    user = db.query(User).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+MAX_BATCH_DECRYPT = 500
+TYPEAHEAD_LIMIT = 10
+SEARCH_ID_CHUNK = MAX_PAGE_SIZE  # id hasil ranking per query IN (...)
+
+def _password_rows(db: Session, user_id: int, category_id: Optional[int], include_category: bool):
+    """Query row tuple untuk list password (tanpa ORM object), category lewat outer join"""
+    query = db.query(*password_columns(include_category)).filter(Password.user_id == user_id)
+    if include_category:
+        query = query.outerjoin(Category, Password.category_id == Category.id)
+    if category_id:
+        query = query.filter(Password.category_id == category_id)
+    return query
+
+def _reject_during_rotation(user_id: int) -> None:
+    """Secret baru tidak boleh ditulis selama rotasi master password belum selesai.
+    
+    Status job ada di DB, jadi berlaku untuk semua worker / instance: key yang
+    dipegang worker lain bisa sudah tidak berlaku saat job selesai.
+    """
+    if rotation_manager.has_unfinished(user_id):
+        raise HTTPException(
+            status_code=409,
+            detail="Master password rotation in progress, retry after it has completed"
+        )
+
+def _stream_passwords(user_id: int, category_id: Optional[int], include_category: bool):
+    # Session sendiri, karena stream berjalan setelah dependency get_db selesai
+    stream_db = SessionLocal()
+    try:
+        query = _password_rows(stream_db, user_id, category_id, include_category).order_by(
+            Password.created_at.desc(), Password.id.desc()
+        ).yield_per(STREAM_BATCH_SIZE)  # server-side cursor di PostgreSQL
+        yield from iter_ndjson(query, password_row)
+    finally:
+        stream_db.close()
 
 @router.get("", response_model=List[PasswordResponse])
 def get_passwords(
+    request: Request,
+    response: Response,
     search: Optional[str] = None,
     category_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    typeahead: bool = False,
+    include_category: bool = True,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
-    """Get all passwords dengan optional search dan filter"""
-    query = db.query(Password).filter(Password.user_id == user.id)
+    """Get all passwords dengan optional search dan filter.
+    
+    Kalau `limit` diisi, hasil dipaginasi; cursor halaman berikutnya ada di header X-Next-Cursor.
+    Hasil `search` diurutkan berdasarkan relevansi (tanpa cursor, maksimal `limit`
+    atau 500), `typeahead=true` membatasi ke prefix match dan 10 hasil teratas. `include_category=false`
+    tidak mengisi object category (cukup category_id). Mendukung If-None-Match (304).
+    
+    `Accept: application/x-ndjson` mengirim satu entry per baris sebagai stream;
+    tanpa `search` seluruh list dikirim dari server-side cursor (`limit` / `cursor` diabaikan).
+    """
+    # Conditional GET: cukup baca vault version, tanpa query list / serialisasi.
+    # JSON dan NDJSON punya ETag sendiri, Vary: Accept untuk cache di tengah jalan.
+    ndjson = wants_ndjson(request)
+    media_type = NDJSON_MEDIA_TYPE if ndjson else "application/json"
+    etag = make_etag("p", get_version(db, user.id), request, variant=media_type)
+    if etag_matches(request, etag):
+        return not_modified(etag, vary="Accept")
+    set_etag(response, etag, vary="Accept")
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
     
     if search:
-        query = query.filter(
-            (Password.title.contains(search)) |
-            (Password.username.contains(search)) |
-            (Password.email.contains(search)) |
-            (Password.website.contains(search))
+        if limit is None:
+            limit = TYPEAHEAD_LIMIT if typeahead else MAX_PAGE_SIZE
+        # Category filter diterapkan di DB, jadi ranking diambil penuh lalu dipotong
+        ranked = search_index.search(
+            db, user.id, search,
+            limit=None if category_id else limit,
+            typeahead=typeahead
         )
+        # Id dikirim per potongan (jumlah bind parameter terbatas), berhenti setelah `limit` row
+        rows = []
+        query = _password_rows(db, user.id, category_id, include_category)
+        for start in range(0, len(ranked), SEARCH_ID_CHUNK):
+            chunk = [password_id for password_id, _ in ranked[start:start + SEARCH_ID_CHUNK]]
+            found = {row.id: row for row in query.filter(Password.id.in_(chunk))}
+            rows.extend(found[password_id] for password_id in chunk if password_id in found)
+            if len(rows) >= limit:
+                break
+        rows = rows[:limit]
+        if ndjson:
+            return Response(b"".join(iter_ndjson(rows, password_row)), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+        return FastJSONResponse([password_row(row) for row in rows], headers=headers)
     
-    if category_id:
-        query = query.filter(Password.category_id == category_id)
+    if ndjson:
+        return StreamingResponse(
+            _stream_passwords(user.id, category_id, include_category),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers
+        )
+    
+    # Row tuple diserialisasi langsung (orjson), tanpa ORM object + validasi per item
+    query = _password_rows(db, user.id, category_id, include_category)
+    if limit is None:
+        rows = query.order_by(Password.created_at.desc(), Password.id.desc()).all()
+    else:
+        try:
+            rows, next_cursor = paginate(query, Password.created_at, Password.id, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            headers[NEXT_CURSOR_HEADER] = next_cursor
+    return FastJSONResponse([password_row(row) for row in rows], headers=headers)
+
+@router.post("/generate", response_model=PasswordGenerateResponse)
+def generate_passwords(options: PasswordGenerateRequest):
+    """Generate password acak / pronounceable / passphrase.
+    
+    `count` > 1 mengembalikan banyak kandidat sekaligus di `candidates`
+    (misal untuk rotasi massal); `password` selalu kandidat pertama.
+    """
+    try:
+        passwords, entropy = generate_batch(
+            options.mode,
+            options.count,
+            length=options.length,
+            words=options.words,
+            separator=options.separator,
+            lowercase=options.include_lowercase,
+            uppercase=options.include_uppercase,
+            digits=options.include_digits,
+            symbols=options.include_symbols,
+            exclude_ambiguous=options.exclude_ambiguous
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    score, strength = strength_label(entropy)
+    entropy = round(entropy, 1)
+    candidates = [
+        {"password": password, "entropy_bits": entropy, "score": score, "strength": strength}
+        for password in passwords
+    ]
+    return {**candidates[0], "candidates": candidates}
+
+@router.get("/changes", response_model=VaultChangesResponse)
+def get_changes(
+    since: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Delta sync: password / category yang berubah setelah `since` plus tombstone.
     
-    passwords = query.order_by(Password.created_at.desc()).all()
-    return passwords
+    `since=0`, cursor dari database lain, atau cursor yang lebih tua dari tombstone
+    yang sudah di-prune mengembalikan snapshot penuh dengan `reset=true`. Client
+    menerapkan `deleted` dulu baru upsert, lalu menyimpan `cursor`.
+    """
+    # Baca cursor dulu: row yang commit setelah ini punya seq > cursor dan ikut sync berikutnya
+    cursor, horizon = db.query(VaultVersion.version, VaultVersion.tombstone_horizon).filter(
+        VaultVersion.user_id == user.id
+    ).first() or (0, 0)
+    reset = since == 0 or since > cursor or since < horizon
+    if reset:
+        since = -1  # row lama dari sebelum kolom change_seq ada bernilai 0
+    elif since == cursor:
+        return {"cursor": cursor, "passwords": [], "categories": [], "deleted": []}
+    
+    passwords = db.query(Password).options(noload(Password.category)).filter(
+        Password.user_id == user.id,
+        Password.change_seq > since
+    ).order_by(Password.change_seq, Password.id).all()
+    categories = db.query(Category).filter(
+        Category.user_id == user.id,
+        Category.change_seq > since
+    ).order_by(Category.change_seq, Category.id).all()
+    deleted = [] if reset else db.query(Tombstone).filter(
+        Tombstone.user_id == user.id,
+        Tombstone.change_seq > since
+    ).order_by(Tombstone.change_seq, Tombstone.id).all()
+    
+    return {
+        "cursor": cursor,
+        "reset": reset,
+        "passwords": passwords,
+        "categories": categories,
+        "deleted": deleted
+    }
+
+@router.get("/breach-audit", response_model=BreachAuditResponse)
+def breach_audit(
+    key: VaultKeyring = Depends(get_vault_key),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Cek semua password terhadap breach corpus lokal (BREACH_CORPUS_PATH).
+    
+    Vault di-decrypt satu kali pass dengan satu derived key. Digest di-sort
+    eksternal (DigestSpool) lalu dicocokkan ke corpus secara berurutan, jadi
+    memory per request dibatasi satu run sort, bukan ukuran vault.
+    """
+    try:
+        corpus = get_breach_corpus()
+    except (OSError, ValueError) as e:
+        print(f"❌ Failed to open breach corpus: {e}")
+        corpus = None
+    if corpus is None:
+        raise HTTPException(status_code=503, detail="Breach corpus not configured")
+    
+    start = time.perf_counter()
+    checked = 0
+    breached_ids, reused, failed = [], [], []
+    rows = db.query(Password.id, Password.ciphertext, Password.encrypted_password).filter(
+        Password.user_id == user.id
+    ).order_by(Password.id).yield_per(BREACH_AUDIT_BATCH_SIZE)
+    with DigestSpool() as spool:
+        for password_id, ciphertext, token in rows:
+            try:
+                plain = SecurityManager.decrypt_with_key(ciphertext if ciphertext is not None else token, key)
+            except ValueError:
+                failed.append(password_id)
+                continue
+            checked += 1
+            spool.add(sha1_digest(plain), password_id)
+        for found, ids in audit_sorted(corpus, spool.sorted_items()):
+            if found:
+                breached_ids.extend(ids)
+            if len(ids) > 1:
+                reused.append(ids)
+    
+    # Title hanya untuk entry yang breached, per batch (jumlah bind parameter terbatas)
+    breached_ids.sort()
+    breached = []
+    for offset in range(0, len(breached_ids), BREACH_AUDIT_BATCH_SIZE):
+        chunk = breached_ids[offset:offset + BREACH_AUDIT_BATCH_SIZE]
+        titles = dict(db.query(Password.id, Password.title).filter(
+            Password.user_id == user.id, Password.id.in_(chunk)
+        ))
+        breached.extend({"id": password_id, "title": titles[password_id]} for password_id in chunk if password_id in titles)
+    
+    audit_writer.record(user.id, "audited", f"Breach audit: {len(breached)} of {checked} passwords found in breaches")
+    return {
+        "checked": checked,
+        "breached": breached,
+        "reused": reused,
+        "failed": failed,
+        "corpus_size": len(corpus),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
 
 @router.post("", response_model=PasswordResponse)
 def create_password(
     password_data: PasswordCreate,
-    master_password: str = Header(..., alias="X-Master-Password"),
+    key: VaultKeyring = Depends(get_vault_key),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """Create new password entry"""
-    
-    # Verify master password
-    if not SecurityManager.verify_master_password(master_password, user.master_password_hash):
-        raise HTTPException(status_code=401, detail="Invalid master password")
+    _reject_during_rotation(user.id)
     
     # Encrypt password
-    encrypted_pwd = SecurityManager.encrypt_password(password_data.password, master_password)
+    encrypted_pwd = SecurityManager.encrypt_with_key(password_data.password, key)
     
     # Create password entry
     new_password = Password(
@@ -61,36 +299,236 @@ def create_password(
         title=password_data.title,
         username=password_data.username,
         email=password_data.email,
-        encrypted_password=encrypted_pwd,
+        stored_secret=encrypted_pwd,
         website=password_data.website,
         notes=password_data.notes,
         category_id=password_data.category_id
     )
     
     db.add(new_password)
-    db.commit()
-    db.refresh(new_password)
+    db.flush()  # dapatkan id untuk log, commit tetap satu kali
     
-    # Log activity
-    activity = ActivityLog(
-        user_id=user.id,
-        password_id=new_password.id,
-        action="created",
-        description=f"Created password for {password_data.title}"
-    )
-    db.add(activity)
+    # Log activity (satu transaksi dengan insert password)
+    log_activity(db, user.id, "created", f"Created password for {password_data.title}", new_password.id)
     db.commit()
+    db.refresh(new_password)
     
     return new_password
 
+@router.post("/decrypt-batch", response_model=PasswordBatchDecrypted)
+def decrypt_passwords_batch(
+    batch: PasswordBatchDecryptRequest,
+    key: VaultKeyring = Depends(get_vault_key),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Decrypt banyak password sekaligus (export / vault health) dalam satu request"""
+    ids = list(dict.fromkeys(batch.ids))  # dedupe, urutan tetap
+    if len(ids) > MAX_BATCH_DECRYPT:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_BATCH_DECRYPT} ids per batch")
+    
+    # Satu query IN untuk semua entry
+    rows = db.query(Password).filter(
+        Password.user_id == user.id,
+        Password.id.in_(ids)
+    ).all() if ids else []
+    by_id = {row.id: row for row in rows}
+    
+    result = PasswordBatchDecrypted(passwords=[])
+    events = []
+    for password_id in ids:
+        password = by_id.get(password_id)
+        if password is None:
+            result.missing.append(password_id)
+            continue
+        try:
+            decrypted = SecurityManager.decrypt_with_key(password.stored_secret, key)
+        except ValueError:
+            result.failed.append(password_id)
+            continue
+        result.passwords.append(PasswordDecryptedItem(id=password.id, password=decrypted))
+        events.append({
+            "user_id": user.id,
+            "password_id": password.id,
+            "action": batch.action,
+            "description": f"{batch.action.capitalize()} password for {password.title}",
+        })
+    
+    # Semua log masuk write-behind writer dan ditulis dalam satu bulk insert
+    if events:
+        audit_writer.record_many(events)
+    
+    return result
+
+@router.post("/import")
+def import_passwords(
+    file: UploadFile = File(...),
+    fmt: Optional[Literal["csv", "json", "ndjson"]] = Query(None, alias="format"),
+    import_id: Optional[str] = None,
+    key: VaultKeyring = Depends(get_vault_key),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Bulk import dari password manager lain (CSV / JSON / NDJSON).
+    
+    File di-parse secara streaming dan disimpan per chunk. Progress bisa di-poll
+    lewat GET /passwords/import/{import_id}.
+    """
+    _reject_during_rotation(user.id)
+    state = import_progress.start(user.id, import_id or uuid.uuid4().hex)
+    
+    # Entry yang sudah ada, untuk dedupe website+username
+    existing = {
+        dedupe_key(website, username)
+        for website, username in db.query(Password.website, Password.username).filter(Password.user_id == user.id)
+    }
+    categories = {
+        name.lower(): category_id
+        for category_id, name in db.query(Category.id, Category.name).filter(Category.user_id == user.id)
+    }
+    
+    chunk = []
+    
+    def flush(final: bool = False):
+        if chunk:
+            db.add_all(chunk)
+            state["imported"] += len(chunk)
+            chunk.clear()
+        if final and state["imported"]:
+            log_activity(db, user.id, "imported", f"Imported {state['imported']} passwords")
+        db.commit()
+        state["chunks_committed"] += 1
+    
+    try:
+        for raw in iter_records(file.file, detect_format(file.filename, fmt)):
+            state["processed"] += 1
+            entry = normalize_entry(raw) if isinstance(raw, dict) else None
+            if entry is None:
+                state["failed"] += 1
+                continue
+            
+            website, username = entry.get("website"), entry.get("username")
+            if website or username:
+                entry_key = dedupe_key(website, username)
+                if entry_key in existing:
+                    state["skipped_duplicates"] += 1
+                    continue
+                existing.add(entry_key)
+            
+            chunk.append(Password(
+                user_id=user.id,
+                title=entry["title"][:200],
+                username=username,
+                email=entry.get("email"),
+                stored_secret=SecurityManager.encrypt_with_key(entry["password"], key),
+                website=website,
+                notes=entry.get("notes"),
+                category_id=categories.get((entry.get("category") or "").lower())
+            ))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                flush()
+        flush(final=True)
+    except (ValueError, UnicodeDecodeError) as e:
+        db.rollback()
+        state["status"] = "failed"
+        state["error"] = str(e)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Import failed after {state['imported']} entries: {e}"
+        )
+    
+    state["status"] = "completed"
+    return import_progress.get(user.id, state["import_id"])
+
+@router.get("/import/{import_id}")
+def get_import_progress(import_id: str, user: Principal = Depends(get_current_user)):
+    """Progress import milik user yang sedang / sudah berjalan"""
+    state = import_progress.get(user.id, import_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return state
+
+EXPORT_ERROR_IDS = 20  # id yang disebut di pesan error export
+
+def _undecryptable_ids(db: Session, user_id: int, key: VaultKeyring) -> List[int]:
+    """Id password yang tidak bisa di-decrypt dengan key ini (plaintext langsung dibuang)"""
+    failed = []
+    query = db.query(Password.id, Password.ciphertext, Password.encrypted_password).filter(
+        Password.user_id == user_id
+    ).order_by(Password.id).yield_per(EXPORT_BATCH_SIZE)
+    for password_id, ciphertext, token in query:
+        try:
+            SecurityManager.decrypt_with_key(ciphertext if ciphertext is not None else token, key)
+        except ValueError:
+            failed.append(password_id)
+    return failed
+
+@router.get("/export")
+def export_passwords(
+    fmt: Literal["csv", "json", "ndjson"] = Query("csv", alias="format"),
+    key: VaultKeyring = Depends(get_vault_key),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Export seluruh vault (terdekripsi) sebagai stream.
+    
+    Semua row dicek dulu sebelum stream dimulai: kalau ada yang tidak bisa
+    di-decrypt, export ditolak (409) daripada menghasilkan backup yang
+    diam-diam kehilangan password.
+    """
+    user_id = user.id
+    failed = _undecryptable_ids(db, user_id, key)
+    if failed:
+        shown = ", ".join(str(password_id) for password_id in failed[:EXPORT_ERROR_IDS])
+        more = f" and {len(failed) - EXPORT_ERROR_IDS} more" if len(failed) > EXPORT_ERROR_IDS else ""
+        raise HTTPException(
+            status_code=409,
+            detail=f"{len(failed)} entries could not be decrypted (ids {shown}{more}), fix or delete them and retry"
+        )
+    
+    audit_writer.record(user_id, "exported", f"Exported vault as {fmt}")
+    
+    def rows():
+        # Session sendiri, karena stream berjalan setelah dependency get_db selesai
+        export_db = SessionLocal()
+        try:
+            query = export_db.query(
+                Password.title, Password.username, Password.email, Password.ciphertext, Password.encrypted_password,
+                Password.website, Password.notes, Category.name
+            ).outerjoin(Category, Password.category_id == Category.id).filter(
+                Password.user_id == user_id
+            ).order_by(Password.id).yield_per(EXPORT_BATCH_SIZE)
+            
+            for title, username, email, ciphertext, token, website, notes, category in query:
+                # Row yang berubah setelah pengecekan dan jadi rusak: putuskan stream, jangan export tanpa password
+                plain = SecurityManager.decrypt_with_key(ciphertext if ciphertext is not None else token, key)
+                yield {
+                    "title": title,
+                    "username": username,
+                    "email": email,
+                    "password": plain,
+                    "website": website,
+                    "notes": notes,
+                    "category": category,
+                }
+        finally:
+            export_db.close()
+    
+    media_types = {"csv": "text/csv", "json": "application/json", "ndjson": "application/x-ndjson"}
+    return StreamingResponse(
+        stream_export(rows(), fmt),
+        media_type=media_types[fmt],
+        headers={"Content-Disposition": f'attachment; filename="vault-export.{fmt}"'}
+    )
+
 @router.get("/{password_id}", response_model=PasswordResponse)
 def get_password(
     password_id: int,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """Get single password details"""
-    password = db.query(Password).filter(
+    password = db.query(Password).options(joinedload(Password.category)).filter(
         Password.id == password_id,
         Password.user_id == user.id
     ).first()
@@ -103,16 +541,12 @@ def get_password(
 @router.post("/{password_id}/decrypt", response_model=PasswordDecrypted)
 def decrypt_password(
     password_id: int,
-    master_password: str = Header(..., alias="X-Master-Password"),
+    key: VaultKeyring = Depends(get_vault_key),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """Decrypt password untuk copy ke clipboard"""
     
-    # Verify master password
-    if not SecurityManager.verify_master_password(master_password, user.master_password_hash):
-        raise HTTPException(status_code=401, detail="Invalid master password")
-    
     # Get password
     password = db.query(Password).filter(
         Password.id == password_id,
@@ -123,20 +557,19 @@ def decrypt_password(
         raise HTTPException(status_code=404, detail="Password not found")
     
     # Decrypt
+    stored = password.stored_secret
     try:
-        decrypted = SecurityManager.decrypt_password(password.encrypted_password, master_password)
+        decrypted = SecurityManager.decrypt_with_key(stored, key)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    # Log activity
-    activity = ActivityLog(
-        user_id=user.id,
-        password_id=password.id,
-        action="copied",
-        description=f"Copied password for {password.title}"
-    )
-    db.add(activity)
-    db.commit()
+    # Row format lama / salt lama: tulis ulang sebagai envelope dengan key aktif,
+    # kecuali selama rotasi master password (job yang menulis ulang row, compare-and-set)
+    if SecurityManager.needs_upgrade(stored, key) and not rotation_manager.has_unfinished(user.id):
+        upgrade_secret(db, password, stored, SecurityManager.encrypt_with_key(decrypted, key))
+    
+    # Log activity (write-behind, response tidak menunggu commit log)
+    audit_writer.record(user.id, "copied", f"Copied password for {password.title}", password.id)
     
     return PasswordDecrypted(password=decrypted)
 
@@ -144,16 +577,12 @@ def decrypt_password(
 def update_password(
     password_id: int,
     password_data: PasswordUpdate,
-    master_password: str = Header(..., alias="X-Master-Password"),
+    key: VaultKeyring = Depends(get_vault_key),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """Update password entry"""
     
-    # Verify master password
-    if not SecurityManager.verify_master_password(master_password, user.master_password_hash):
-        raise HTTPException(status_code=401, detail="Invalid master password")
-    
     # Get password
     password = db.query(Password).filter(
         Password.id == password_id,
@@ -171,7 +600,15 @@ def update_password(
     if password_data.email is not None:
         password.email = password_data.email
     if password_data.password is not None:
-        password.encrypted_password = SecurityManager.encrypt_password(password_data.password, master_password)
+        _reject_during_rotation(user.id)
+        password.stored_secret = SecurityManager.encrypt_with_key(password_data.password, key)
+    elif SecurityManager.needs_upgrade(password.stored_secret, key) and not rotation_manager.has_unfinished(user.id):
+        # Sekalian upgrade row format lama ke envelope
+        try:
+            plain = SecurityManager.decrypt_with_key(password.stored_secret, key)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        password.stored_secret = SecurityManager.encrypt_with_key(plain, key)
     if password_data.website is not None:
         password.website = password_data.website
     if password_data.notes is not None:
@@ -179,26 +616,18 @@ def update_password(
     if password_data.category_id is not None:
         password.category_id = password_data.category_id
     
+    # Log activity (satu transaksi dengan update)
+    log_activity(db, user.id, "updated", f"Updated password for {password.title}", password.id)
     db.commit()
     db.refresh(password)
     
-    # Log activity
-    activity = ActivityLog(
-        user_id=user.id,
-        password_id=password.id,
-        action="updated",
-        description=f"Updated password for {password.title}"
-    )
-    db.add(activity)
-    db.commit()
-    
     return password
 
 @router.delete("/{password_id}")
 def delete_password(
     password_id: int,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """Delete password entry"""
     password = db.query(Password).filter(
@@ -211,14 +640,8 @@ def delete_password(
     
     title = password.title
     
-    # Log activity before delete
-    activity = ActivityLog(
-        user_id=user.id,
-        password_id=None,  # Will be null after delete
-        action="deleted",
-        description=f"Deleted password for {title}"
-    )
-    db.add(activity)
+    # Log activity before delete (password_id null karena row akan dihapus)
+    log_activity(db, user.id, "deleted", f"Deleted password for {title}")
     
     db.delete(password)
     db.commit()
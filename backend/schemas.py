@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Optional, List, Dict, Literal
+from datetime import date, datetime
 
 # User Schemas
 class UserSetup(BaseModel):
@@ -77,6 +77,74 @@ class PasswordResponse(BaseModel):
 class PasswordDecrypted(BaseModel):
     password: str
 
+class PasswordBatchDecryptRequest(BaseModel):
+    ids: List[int]
+    action: Literal["copied", "viewed"] = "viewed"
+
+class PasswordDecryptedItem(BaseModel):
+    id: int
+    password: str
+
+class PasswordBatchDecrypted(BaseModel):
+    passwords: List[PasswordDecryptedItem]
+    missing: List[int] = []  # id tidak ditemukan
+    failed: List[int] = []  # id gagal di-decrypt
+
+class BreachedPassword(BaseModel):
+    id: int
+    title: str
+
+class BreachAuditResponse(BaseModel):
+    checked: int
+    breached: List[BreachedPassword]
+    reused: List[List[int]]  # grup id yang memakai password sama
+    failed: List[int]  # id gagal di-decrypt
+    corpus_size: int
+    elapsed_ms: float
+
+class PasswordGenerateRequest(BaseModel):
+    mode: Literal["random", "pronounceable", "passphrase"] = "random"
+    length: int = Field(16, ge=4, le=128)  # random / pronounceable
+    words: int = Field(5, ge=3, le=12)  # passphrase
+    separator: str = Field("-", max_length=3)
+    include_lowercase: bool = True
+    include_uppercase: bool = True
+    include_digits: bool = True
+    include_symbols: bool = True
+    exclude_ambiguous: bool = False
+    count: int = Field(1, ge=1, le=1000)
+    
+    @model_validator(mode="after")
+    def _check_mode_options(self):
+        # Suku kata selalu huruf kecil; mode selain random tidak bisa tanpa lowercase
+        if self.mode != "random" and not self.include_lowercase:
+            raise ValueError(f"include_lowercase cannot be disabled in {self.mode} mode")
+        return self
+
+class GeneratedPassword(BaseModel):
+    password: str
+    entropy_bits: float
+    score: int  # 0 (very_weak) - 4 (very_strong)
+    strength: str
+
+class PasswordGenerateResponse(GeneratedPassword):
+    candidates: List[GeneratedPassword]  # semua hasil (termasuk yang pertama)
+
+class TombstoneResponse(BaseModel):
+    entity: str  # password, category
+    entity_id: int
+    deleted_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class VaultChangesResponse(BaseModel):
+    cursor: int  # kirim sebagai `since` pada sync berikutnya
+    reset: bool = False  # True: ini snapshot penuh, buang cache lokal dulu
+    passwords: List[PasswordResponse]
+    categories: List[CategoryResponse]
+    deleted: List[TombstoneResponse]
+
 # Activity Log Schemas
 class ActivityLogCreate(BaseModel):
     password_id: Optional[int] = None
@@ -93,7 +161,54 @@ class ActivityLogResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ActivityDayCount(BaseModel):
+    day: date
+    action: str
+    count: int
+
+class ActivityTopEntry(BaseModel):
+    password_id: int
+    title: Optional[str]  # None kalau password sudah dihapus
+    count: int
+
+class ActivityStatsResponse(BaseModel):
+    since: date
+    per_day: List[ActivityDayCount]
+    totals: Dict[str, int]
+    top_entries: List[ActivityTopEntry]
+
+# Dashboard Schemas
+class CategoryCount(CategoryResponse):
+    password_count: int
+
+class DashboardSummaryResponse(BaseModel):
+    total_passwords: int
+    uncategorized: int
+    categories: List[CategoryCount]
+    passwords: List[PasswordResponse]  # halaman pertama, tanpa object category
+    next_cursor: Optional[str] = None  # lanjutkan dengan GET /passwords?cursor=...
+    history: List[ActivityLogResponse]
+    history_next_cursor: Optional[str] = None
+
 # Auth Response
+class MasterPasswordRotate(BaseModel):
+    current_master_password: str
+    new_master_password: str = Field(..., min_length=1)
+
+class RotationJobResponse(BaseModel):
+    job_id: int
+    status: str  # running, interrupted, failed, completed
+    total: int
+    processed: int
+    failed: int
+    failed_ids: List[int] = []  # entry yang tidak bisa di-decrypt; job gagal dan master password tidak diganti
+    checkpoint: int  # id password terakhir yang sudah dirotasi
+    rows_per_second: float
+    eta_seconds: Optional[float] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
 class AuthResponse(BaseModel):
     user_id: int
     token: str
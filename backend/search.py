@@ -0,0 +1,277 @@
+"""In-process inverted index untuk search GET /passwords.
+
+Menggantikan empat LIKE '%term%' per request. Index dibangun per user saat
+search pertama, lalu di-update setelah commit lewat session event sehingga
+tetap sinkron dengan create / update / delete. Mendukung exact, prefix,
+substring dan fuzzy (trigram + typo satu / dua huruf) match dengan ranking per field.
+Perubahan dari process lain dideteksi lewat VaultVersion (satu baca primary key).
+"""
+from bisect import bisect_left
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Set, Tuple
+import re
+import threading
+from models import Password
+from versioning import get_version, VERSION_RANGE_KEY
+
+SEARCH_FIELDS = ("title", "website", "username", "email")
+FIELD_WEIGHTS = {"title": 4.0, "website": 3.0, "username": 2.0, "email": 2.0}
+
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+SUBSTRING_SCORE = 1.5
+FUZZY_SCORE = 1.0
+FUZZY_MIN_SIMILARITY = 0.4
+TYPO_MIN_LENGTH = 4  # term lebih pendek tidak dicocokkan dengan edit distance
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_typos(term: str) -> int:
+    if len(term) < TYPO_MIN_LENGTH:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment), berhenti lebih awal di atas `limit`.
+    
+    Typo satu huruf ("githib") dan huruf tertukar ("stie") hanya berbagi sedikit
+    trigram dengan token aslinya, jadi dicek terpisah dari similarity trigram.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class UserSearchIndex:
+    """Index satu user: token -> {password_id: bobot field terbaik}"""
+    
+    def __init__(self):
+        self.docs: Dict[int, Dict[str, float]] = {}  # password_id -> token -> weight
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.trigram_map: Dict[str, Set[str]] = {}
+        self.gram_counts: Dict[str, int] = {}  # token -> jumlah trigram
+        self._sorted_tokens: Optional[List[str]] = None
+        self.fingerprint = None
+    
+    def add(self, password_id: int, fields: Dict[str, Optional[str]]) -> None:
+        self.remove(password_id)
+        tokens: Dict[str, float] = {}
+        for field in SEARCH_FIELDS:
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(fields.get(field)):
+                if weight > tokens.get(token, 0):
+                    tokens[token] = weight
+        self.docs[password_id] = tokens
+        for token, weight in tokens.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                grams = trigrams(token)
+                self.gram_counts[token] = len(grams)
+                for gram in grams:
+                    self.trigram_map.setdefault(gram, set()).add(token)
+                self._sorted_tokens = None
+            posting[password_id] = weight
+    
+    def remove(self, password_id: int) -> None:
+        tokens = self.docs.pop(password_id, None)
+        if not tokens:
+            return
+        for token in tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(password_id, None)
+            if not posting:
+                del self.postings[token]
+                del self.gram_counts[token]
+                for gram in trigrams(token):
+                    bucket = self.trigram_map.get(gram)
+                    if bucket is not None:
+                        bucket.discard(token)
+                        if not bucket:
+                            del self.trigram_map[gram]
+                self._sorted_tokens = None
+    
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        tokens = self._sorted_tokens
+        start = bisect_left(tokens, prefix)
+        matches = []
+        for i in range(start, len(tokens)):
+            if not tokens[i].startswith(prefix):
+                break
+            matches.append(tokens[i])
+        return matches
+    
+    def _term_candidates(self, term: str, prefix: bool, fuzzy: bool) -> Dict[str, float]:
+        """Token index yang cocok dengan satu term, beserta skornya"""
+        candidates: Dict[str, float] = {}
+        if term in self.postings:
+            candidates[term] = EXACT_SCORE
+        if prefix:
+            for token in self._prefix_tokens(term):
+                candidates.setdefault(token, PREFIX_SCORE)
+        if len(term) < 3 or not (prefix or fuzzy):
+            return candidates
+    
+        term_grams = trigrams(term)
+        shared: Dict[str, int] = {}
+        for gram in term_grams:
+            for token in self.trigram_map.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        term_gram_count = len(term_grams)
+        # Substring butuh semua trigram tengah term ada di token
+        min_substring_shared = term_gram_count - 3
+        for token, count in shared.items():
+            if token in candidates:
+                continue
+            if prefix and count >= min_substring_shared and term in token:
+                candidates[token] = SUBSTRING_SCORE
+                continue
+            if fuzzy:
+                similarity = count / (term_gram_count + self.gram_counts[token] - count)
+                typos = max_typos(term)
+                if typos:
+                    distance = edit_distance(term, token, typos)
+                    if distance <= typos:
+                        similarity = max(similarity, 1 - distance / max(len(term), len(token)))
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    candidates[token] = FUZZY_SCORE * similarity
+        return candidates
+    
+    def search(self, query: str, limit: Optional[int] = None, typeahead: bool = False) -> List[Tuple[int, float]]:
+        """Return [(password_id, score)] urut score tertinggi. Semua term harus match."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores: Optional[Dict[int, float]] = None
+        for i, term in enumerate(terms):
+            # Typeahead: term terakhir masih diketik, cukup prefix match (tanpa fuzzy)
+            is_last = i == len(terms) - 1
+            candidates = self._term_candidates(
+                term,
+                prefix=is_last or not typeahead,
+                fuzzy=not typeahead
+            )
+            term_scores: Dict[int, float] = {}
+            for token, match_score in candidates.items():
+                for password_id, weight in self.postings[token].items():
+                    score = match_score * weight
+                    if score > term_scores.get(password_id, 0):
+                        term_scores[password_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[:limit] if limit else ranked
+
+class SearchIndexRegistry:
+    """Index semua user dalam process ini, dibangun lazy saat search pertama"""
+    
+    def __init__(self):
+        self._indexes: Dict[int, UserSearchIndex] = {}
+        self._lock = threading.RLock()
+    
+    def get(self, db: Session, user_id: int) -> UserSearchIndex:
+        # Deteksi perubahan dari process lain (worker / serverless instance lain):
+        # setiap flush yang mengubah Password menaikkan vault version
+        fingerprint = get_version(db, user_id)
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.fingerprint == fingerprint:
+                return index
+            index = UserSearchIndex()
+            rows = db.query(Password.id, *[getattr(Password, f) for f in SEARCH_FIELDS]).filter(
+                Password.user_id == user_id
+            )
+            for row in rows:
+                index.add(row[0], dict(zip(SEARCH_FIELDS, row[1:])))
+            index.fingerprint = fingerprint
+            self._indexes[user_id] = index
+            return index
+    
+    def search(self, db: Session, user_id: int, query: str, limit: Optional[int] = None, typeahead: bool = False):
+        index = self.get(db, user_id)
+        with self._lock:
+            return index.search(query, limit=limit, typeahead=typeahead)
+    
+    def apply(self, changes: List[tuple], versions: Dict[int, Tuple[int, int]]) -> None:
+        """Terapkan perubahan yang sudah di-commit ke index yang sudah dibangun.
+        
+        `versions`: {user_id: (version sebelum, version setelah commit ini)}. Fingerprint
+        hanya dimajukan kalau index tepat di version sebelum commit; kalau process lain
+        sudah commit di antaranya, fingerprint dibiarkan supaya search berikutnya rebuild.
+        """
+        with self._lock:
+            touched = set()
+            for op, user_id, password_id, fields in changes:
+                index = self._indexes.get(user_id)
+                if index is None:
+                    continue
+                if op == "delete":
+                    index.remove(password_id)
+                else:
+                    index.add(password_id, fields)
+                touched.add(user_id)
+            for user_id in touched:
+                index = self._indexes[user_id]
+                before, after = versions.get(user_id, (None, None))
+                if before is not None and index.fingerprint == before:
+                    index.fingerprint = after
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+search_index = SearchIndexRegistry()
+
+_PENDING_KEY = "search_index_changes"
+_VERSIONS_KEY = "search_index_versions"
+
+@event.listens_for(Session, "after_flush")
+def _collect_password_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Password) and obj.id is not None:
+            fields = {f: getattr(obj, f) for f in SEARCH_FIELDS}
+            pending.append(("upsert", obj.user_id, obj.id, fields))
+    for obj in session.deleted:
+        if isinstance(obj, Password):
+            pending.append(("delete", obj.user_id, obj.id, None))
+    # Salin sekarang: range di versioning dibuang di after_commit miliknya sendiri
+    session.info[_VERSIONS_KEY] = dict(session.info.get(VERSION_RANGE_KEY, {}))
+
+@event.listens_for(Session, "after_commit")
+def _apply_password_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    versions = session.info.pop(_VERSIONS_KEY, {})
+    if changes:
+        search_index.apply(changes, versions)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_password_changes(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_VERSIONS_KEY, None)
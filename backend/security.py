@@ -1,59 +1,368 @@
-import bcrypt
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional, Tuple
+import asyncio
+import multiprocessing
+import threading
+import time
 import base64
+import struct
 import os
 from dotenv import load_dotenv
+from fastapi import HTTPException
+from metrics import timed_crypto, crypto_latency, add_request_crypto_time
 
 load_dotenv()
 
-SALT = os.getenv("MASTER_KEY_SALT", "default-salt-change-this").encode()
+SALT = os.getenv("MASTER_KEY_SALT", "default-salt-change-this").encode()  # hanya untuk row format lama
+LEGACY_KDF_ITERATIONS = 100000
+KDF_ITERATIONS = int(os.getenv("KDF_ITERATIONS", "100000"))  # untuk salt per user yang baru
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # cost hash master password baru (lihat kdf_calibrate.py)
+KEY_CACHE_TTL = int(os.getenv("KEY_CACHE_TTL", "300"))  # detik idle sebelum key dibuang
+KEY_CACHE_MAX_ENTRIES = int(os.getenv("KEY_CACHE_MAX_ENTRIES", "128"))
+# KDF execution service: bcrypt / PBKDF2 jalan di pool terpisah dengan antrian terbatas
+KDF_EXECUTOR = os.getenv("KDF_EXECUTOR", "thread" if os.getenv("VERCEL") else "process")
+KDF_WORKERS = int(os.getenv("KDF_WORKERS", str(os.cpu_count() or 1)))
+KDF_MAX_QUEUE = int(os.getenv("KDF_MAX_QUEUE", str(KDF_WORKERS * 4)))
+KDF_RETRY_AFTER = int(os.getenv("KDF_RETRY_AFTER", "1"))  # detik, untuk header Retry-After
+# Process pool dibuat lazy di process yang sudah punya thread (threadpool request, audit writer,
+# rotasi): fork bisa mewarisi lock yang sedang dipegang, jadi worker di-start lewat forkserver / spawn
+KDF_START_METHOD = os.getenv(
+    "KDF_START_METHOD", "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+class KeyCache:
+    """In-memory cache untuk VaultKeyring per session (TTL + LRU).
+    
+    Yang disimpan hanya hasil PBKDF2, master password tidak pernah disimpan.
+    """
+    
+    def __init__(self, ttl: int = KEY_CACHE_TTL, max_entries: int = KEY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # session_id -> (keyring, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, session_id: str) -> Optional["VaultKeyring"]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            key, expires_at = entry
+            if expires_at <= now:
+                del self._entries[session_id]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            # Sliding TTL: key tetap hidup selama session aktif
+            self._entries[session_id] = (key, now + self.ttl)
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return key
+    
+    def put(self, session_id: str, key: "VaultKeyring") -> None:
+        with self._lock:
+            self._entries[session_id] = (key, time.monotonic() + self.ttl)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, session_id: str) -> None:
+        """Hapus key milik satu session (logout / auto-lock)"""
+        with self._lock:
+            self._entries.pop(session_id, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+key_cache = KeyCache()
+
+class KDFOverloaded(HTTPException):
+    """Antrian KDF penuh, request ditolak cepat (503 + Retry-After, client retry)"""
+    
+    def __init__(self, retry_after: int = KDF_RETRY_AFTER):
+        super().__init__(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.retry_after = retry_after
+
+def _timed_call(func, args):
+    # Jalan di worker: catat kapan mulai supaya waktu tunggu di antrian bisa diukur.
+    # Di process pool `func` fungsi polos (tanpa timed_crypto), jadi tidak menyentuh lock metrics.
+    started = time.monotonic()
+    return started, func(*args)
+
+class KDFService:
+    """Pool khusus operasi KDF (bcrypt / PBKDF2) dengan admission control.
+    
+    Default memakai process pool seukuran jumlah core sehingga hashing tidak
+    berebut GIL dengan request lain. Kalau semua worker sibuk dan antrian
+    sudah KDF_MAX_QUEUE, request langsung ditolak dengan KDFOverloaded.
+    """
+    
+    def __init__(self, workers: int = KDF_WORKERS, max_queue: int = KDF_MAX_QUEUE, mode: str = KDF_EXECUTOR):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.mode = mode
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+    
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context(KDF_START_METHOD)
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kdf")
+        return self._executor
+    
+    async def run(self, func, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise KDFOverloaded()
+            self.in_flight += 1
+        submitted = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            target = getattr(func, "__wrapped__", func) if self.mode == "process" else func
+            started, result = await loop.run_in_executor(self._get_executor(), partial(_timed_call, target, args))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        finished = time.monotonic()
+        wait = max(0.0, started - submitted)
+        operation = getattr(func, "metric_operation", None)
+        if operation is not None:
+            if self.mode == "process":
+                # Worker process punya registry sendiri, jadi durasinya dicatat di sini
+                crypto_latency.observe(operation, value=finished - started)
+            add_request_crypto_time(finished - started)
+        with self._lock:
+            self.completed += 1
+            self.wait_time_total += wait
+            self.wait_time_max = max(self.wait_time_max, wait)
+            self.run_time_total += finished - started
+        return result
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_time_avg_ms": round(self.wait_time_total / self.completed * 1000, 3) if self.completed else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+                "run_time_avg_ms": round(self.run_time_total / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+    
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+kdf_service = KDFService()
+
+async def run_crypto(func, *args):
+    """Jalankan operasi crypto CPU-bound lewat kdf_service tanpa memblokir event loop"""
+    return await kdf_service.run(func, *args)
+
+# Envelope biner untuk Password.ciphertext:
+#   version (1) | algoritma (1) | KDF (1) | iterasi KDF (4) | salt id (4) | nonce (12) | ciphertext + tag GCM
+# Header ikut diautentikasi (AAD). Dibanding token Fernet base64 tidak ada
+# timestamp, padding CBC, HMAC terpisah maupun base64, jadi sekitar setengah ukurannya.
+ENVELOPE_VERSION = 1
+ALG_AES256_GCM = 1
+KDF_PBKDF2_SHA256 = 1
+ENVELOPE_HEADER = struct.Struct(">BBBII")
+ENVELOPE_SALT_ID_OFFSET = 7  # posisi salt id di header (dipakai query salt yang masih dipakai)
+NONCE_SIZE = 12
+GCM_TAG_SIZE = 16
+ENVELOPE_MIN_SIZE = ENVELOPE_HEADER.size + NONCE_SIZE + GCM_TAG_SIZE
+DECRYPT_ERROR = "Invalid master password or corrupted data"
+
+class VaultKeyring:
+    """Key vault satu user untuk satu master password (yang disimpan di key cache).
+    
+    `key` / `salt_id`: key AES-256 aktif untuk envelope. `previous`: key salt lama
+    (iterasi KDF sebelum dinaikkan) selama masih ada envelope yang memakainya.
+    `legacy_key`: key Fernet dari MASTER_KEY_SALT global, hanya di-derive selama
+    user masih punya row format lama.
+    """
+    __slots__ = ("salt_id", "key", "legacy_key", "iterations", "_cipher", "_previous")
+    
+    def __init__(self, salt_id: int, key: bytes, legacy_key: Optional[bytes] = None, iterations: int = 0,
+                 previous: Optional[Dict[int, bytes]] = None):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        self.salt_id = salt_id
+        self.key = key
+        self.legacy_key = legacy_key
+        self.iterations = iterations
+        self._cipher = AESGCM(key)
+        self._previous = {salt_id: AESGCM(old_key) for salt_id, old_key in (previous or {}).items()}
+    
+    def cipher_for(self, salt_id: int):
+        """AESGCM untuk salt id di envelope, None kalau bukan milik keyring ini"""
+        if salt_id == self.salt_id:
+            return self._cipher
+        return self._previous.get(salt_id)
+
+# Rotasi master password yang berjalan di process ini: key lama -> keyring baru,
+# supaya session lama tetap bisa membaca row yang sudah dirotasi. Hanya untuk decrypt:
+# selama rotasi secret baru ditolak di semua process (status job di DB, lihat rotation.py).
+_key_rotations: Dict[bytes, VaultKeyring] = {}
+
+def register_key_rotation(old: VaultKeyring, new: VaultKeyring) -> None:
+    _key_rotations[old.key] = new
+
+def unregister_key_rotation(old: VaultKeyring) -> None:
+    _key_rotations.pop(old.key, None)
+
+def parse_envelope_header(envelope: bytes) -> tuple:
+    """(version, algoritma, KDF, iterasi, salt id), ValueError kalau blob terpotong / versi tidak dikenal"""
+    if len(envelope) < ENVELOPE_MIN_SIZE or envelope[0] != ENVELOPE_VERSION:
+        raise ValueError(DECRYPT_ERROR)
+    return ENVELOPE_HEADER.unpack_from(envelope)
+
+def envelope_salt_id(envelope: bytes) -> int:
+    return parse_envelope_header(envelope)[4]
+
+def _pbkdf2(master_password: str, salt: bytes, iterations: int) -> bytes:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    )
+    return kdf.derive(master_password.encode())
+
+# Operasi KDF sebagai fungsi polos di level module: process pool KDF menjalankan
+# fungsi ini langsung (picklable, tanpa lock metrics), SecurityManager membungkusnya
+# dengan timed_crypto untuk pemanggilan di process ini.
+def _hash_master_password(password: str) -> str:
+    """Hash master password menggunakan bcrypt"""
+    import bcrypt  # lazy import: tidak dibayar saat cold start
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+    return hashed.decode('utf-8')
+
+def _verify_master_password(password: str, hashed: str) -> bool:
+    """Verify master password"""
+    import bcrypt
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def _derive_vault_keys(master_password: str, salt: bytes, iterations: int, legacy: bool = False,
+                       previous: Tuple[Tuple[int, bytes, int], ...] = ()) -> Tuple[bytes, Optional[bytes], Dict[int, bytes]]:
+    """(key envelope dari salt user, key Fernet format lama kalau `legacy`,
+    {salt id: key} untuk salt lama di `previous`). Dijalankan lewat run_crypto."""
+    key = _pbkdf2(master_password, salt, iterations)
+    legacy_key = base64.urlsafe_b64encode(_pbkdf2(master_password, SALT, LEGACY_KDF_ITERATIONS)) if legacy else None
+    previous_keys = {salt_id: _pbkdf2(master_password, old_salt, old_iterations)
+                     for salt_id, old_salt, old_iterations in previous}
+    return key, legacy_key, previous_keys
 
 class SecurityManager:
     """Manage encryption and hashing for password manager"""
     
-    @staticmethod
-    def hash_master_password(password: str) -> str:
-        """Hash master password menggunakan bcrypt"""
-        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        return hashed.decode('utf-8')
+    hash_master_password = staticmethod(timed_crypto("bcrypt_hash")(_hash_master_password))
+    verify_master_password = staticmethod(timed_crypto("bcrypt_verify")(_verify_master_password))
+    derive_vault_keys = staticmethod(timed_crypto("pbkdf2_derive")(_derive_vault_keys))
     
     @staticmethod
-    def verify_master_password(password: str, hashed: str) -> bool:
-        """Verify master password"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    def needs_rehash(hashed: str) -> bool:
+        """True kalau cost di hash ("$2b$<cost>$...") lebih rendah dari BCRYPT_ROUNDS"""
+        try:
+            return int(hashed.split("$")[2]) < BCRYPT_ROUNDS
+        except (IndexError, ValueError):
+            return False
     
     @staticmethod
-    def derive_key_from_password(master_password: str) -> bytes:
-        """Derive encryption key dari master password menggunakan PBKDF2"""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=SALT,
-            iterations=100000,
+    @timed_crypto("vault_encrypt")
+    def encrypt_with_key(plain_password: str, keyring: VaultKeyring) -> bytes:
+        """Encrypt ke envelope dengan key aktif keyring"""
+        header = ENVELOPE_HEADER.pack(
+            ENVELOPE_VERSION, ALG_AES256_GCM, KDF_PBKDF2_SHA256, keyring.iterations, keyring.salt_id
         )
-        key = base64.urlsafe_b64encode(kdf.derive(master_password.encode()))
-        return key
+        nonce = os.urandom(NONCE_SIZE)
+        return header + nonce + keyring._cipher.encrypt(nonce, plain_password.encode(), header)
     
     @staticmethod
-    def encrypt_password(plain_password: str, master_password: str) -> str:
-        """Encrypt password menggunakan AES-256 (Fernet)"""
-        key = SecurityManager.derive_key_from_password(master_password)
-        f = Fernet(key)
-        encrypted = f.encrypt(plain_password.encode())
-        return encrypted.decode()
+    @timed_crypto("vault_decrypt")
+    def decrypt_with_key(stored, keyring: VaultKeyring) -> str:
+        """Decrypt envelope (bytes) atau token Fernet format lama (str)"""
+        try:
+            if isinstance(stored, str):
+                from cryptography.fernet import Fernet
+                if keyring.legacy_key is None:
+                    raise ValueError("legacy key not derived")
+                return Fernet(keyring.legacy_key).decrypt(stored.encode()).decode()
+            
+            stored = bytes(stored)  # psycopg2 mengembalikan memoryview
+            _, algorithm, _, _, salt_id = parse_envelope_header(stored)
+            if algorithm != ALG_AES256_GCM:
+                raise ValueError("unsupported envelope")
+            cipher = keyring.cipher_for(salt_id)
+            if cipher is None:
+                target = _key_rotations.get(keyring.key)
+                cipher = target.cipher_for(salt_id) if target is not None else None
+                if cipher is None:
+                    raise ValueError("unknown salt id")
+            offset = ENVELOPE_HEADER.size
+            nonce = stored[offset:offset + NONCE_SIZE]
+            return cipher.decrypt(nonce, stored[offset + NONCE_SIZE:], stored[:offset]).decode()
+        except Exception:
+            raise ValueError(DECRYPT_ERROR)
     
     @staticmethod
-    def decrypt_password(encrypted_password: str, master_password: str) -> str:
-        """Decrypt password"""
+    def needs_upgrade(stored, keyring: VaultKeyring) -> bool:
+        """True untuk token Fernet lama atau envelope dengan salt / parameter lama.
+        
+        Envelope rusak tidak bisa di-upgrade (tidak bisa di-decrypt), jadi False.
+        """
+        if isinstance(stored, str):
+            return True
         try:
-            key = SecurityManager.derive_key_from_password(master_password)
-            f = Fernet(key)
-            decrypted = f.decrypt(encrypted_password.encode())
-            return decrypted.decode()
-        except Exception as e:
-            raise ValueError("Invalid master password or corrupted data")
+            version, algorithm, _, iterations, salt_id = parse_envelope_header(bytes(stored))
+        except ValueError:
+            return False
+        return (version, algorithm, salt_id, iterations) != (
+            ENVELOPE_VERSION, ALG_AES256_GCM, keyring.salt_id, keyring.iterations
+        )
     
     @staticmethod
     def generate_session_token(user_id: int) -> str:
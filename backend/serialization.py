@@ -0,0 +1,72 @@
+"""Serialisasi JSON cepat untuk response list besar.
+
+orjson dipakai kalau ter-install (fallback ke json stdlib). List password
+diserialisasi langsung dari row tuple, tanpa ORM object dan validasi
+PasswordResponse per item. Mode NDJSON (Accept: application/x-ndjson)
+mengirim row per batch dari server-side cursor, jadi memory tetap datar
+berapa pun ukuran vault.
+"""
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from typing import Iterable, Iterator
+import json
+import os
+from models import Password, Category
+
+try:
+    import orjson
+except ImportError:  # optional, json stdlib tetap jalan
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))  # row per fetch / chunk NDJSON
+
+def _default(obj):
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse lewat orjson; content boleh berisi datetime langsung"""
+    
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def iter_ndjson(rows: Iterable, to_dict) -> Iterator[bytes]:
+    """Satu object JSON per baris, dikirim per STREAM_BATCH_SIZE row"""
+    batch = []
+    for row in rows:
+        batch.append(dumps(to_dict(row)))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+# Kolom untuk list password (sama dengan PasswordResponse). Kolom category
+# diberi label supaya tidak bentrok dengan id / created_at password.
+PASSWORD_FIELDS = ("id", "title", "username", "email", "website", "notes", "category_id", "created_at", "updated_at")
+PASSWORD_COLUMNS = tuple(getattr(Password, field) for field in PASSWORD_FIELDS)
+CATEGORY_FIELDS = ("id", "name", "color", "icon", "is_default", "created_at")
+CATEGORY_COLUMNS = tuple(getattr(Category, field).label(f"category_{field}") for field in CATEGORY_FIELDS)
+
+def password_columns(include_category: bool = True) -> tuple:
+    return PASSWORD_COLUMNS + CATEGORY_COLUMNS if include_category else PASSWORD_COLUMNS
+
+def password_row(row) -> dict:
+    """Row dari password_columns() -> dict dengan bentuk PasswordResponse"""
+    data = dict(zip(PASSWORD_FIELDS, row))
+    category = None
+    if len(row) > len(PASSWORD_FIELDS) and row[len(PASSWORD_FIELDS)] is not None:
+        category = dict(zip(CATEGORY_FIELDS, row[len(PASSWORD_FIELDS):]))
+        category["is_default"] = bool(category["is_default"])
+    data["category"] = category
+    return data
@@ -0,0 +1,121 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Optional
+import hashlib
+import threading
+import time
+import os
+from security import SecurityManager, key_cache
+
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))  # detik
+
+@dataclass
+class SessionInfo:
+    session_id: str  # sha256 dari token, token asli tidak disimpan di server
+    user_id: int
+    created_at: float
+    expires_at: float
+
+class SessionBackend(ABC):
+    """Interface storage session. Implementasi lain (Redis, DB) wajib override semua method ini."""
+    
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[SessionInfo]:
+        ...
+    
+    @abstractmethod
+    def set(self, session: SessionInfo) -> None:
+        ...
+    
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+    
+    @abstractmethod
+    def delete_user(self, user_id: int) -> list:
+        """Hapus semua session milik user, return list session_id yang dihapus"""
+    
+    @abstractmethod
+    def purge_expired(self, now: float) -> list:
+        """Hapus session kadaluarsa, return list session_id yang dihapus"""
+
+class InMemorySessionBackend(SessionBackend):
+    """Default backend: dict in-process (cukup untuk single worker)"""
+    
+    def __init__(self):
+        self._sessions: Dict[str, SessionInfo] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, session_id: str) -> Optional[SessionInfo]:
+        return self._sessions.get(session_id)
+    
+    def set(self, session: SessionInfo) -> None:
+        with self._lock:
+            self._sessions[session.session_id] = session
+    
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+    
+    def delete_user(self, user_id: int) -> list:
+        with self._lock:
+            removed = [sid for sid, s in self._sessions.items() if s.user_id == user_id]
+            for sid in removed:
+                del self._sessions[sid]
+        return removed
+    
+    def purge_expired(self, now: float) -> list:
+        with self._lock:
+            removed = [sid for sid, s in self._sessions.items() if s.expires_at <= now]
+            for sid in removed:
+                del self._sessions[sid]
+        return removed
+
+class SessionStore:
+    """Server-side session dengan expiry dan revocation"""
+    
+    def __init__(self, backend: SessionBackend, ttl: int = SESSION_TTL):
+        self.backend = backend
+        self.ttl = ttl
+    
+    @staticmethod
+    def hash_token(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def create(self, user_id: int) -> str:
+        """Buat session baru, return token untuk client"""
+        now = time.time()
+        for sid in self.backend.purge_expired(now):
+            key_cache.invalidate(sid)
+        token = SecurityManager.generate_session_token(user_id)
+        self.backend.set(SessionInfo(
+            session_id=self.hash_token(token),
+            user_id=user_id,
+            created_at=now,
+            expires_at=now + self.ttl
+        ))
+        return token
+    
+    def validate(self, token: str) -> Optional[SessionInfo]:
+        """Lookup token, return None kalau tidak dikenal atau sudah expired"""
+        session = self.backend.get(self.hash_token(token))
+        if session is None:
+            return None
+        if session.expires_at <= time.time():
+            self.revoke_session(session.session_id)
+            return None
+        return session
+    
+    def revoke(self, token: str) -> None:
+        self.revoke_session(self.hash_token(token))
+    
+    def revoke_session(self, session_id: str) -> None:
+        self.backend.delete(session_id)
+        key_cache.invalidate(session_id)
+    
+    def revoke_user(self, user_id: int) -> None:
+        """Revoke semua session user (misal setelah ganti master password)"""
+        for sid in self.backend.delete_user(user_id):
+            key_cache.invalidate(sid)
+
+session_store = SessionStore(InMemorySessionBackend())
@@ -0,0 +1,76 @@
+"""Fixture bersama: app dengan database SQLite sementara dan cost KDF minimum.
+
+Environment di-set sebelum modul backend di-import, karena konfigurasi dibaca
+saat import. Setiap test mulai dari vault kosong (`client`) atau vault yang
+sudah di-setup (`auth_headers`).
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DB_DIR = tempfile.mkdtemp(prefix="pm-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB_DIR}/test.db"
+os.environ.setdefault("KDF_EXECUTOR", "thread")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("KDF_ITERATIONS", "1000")
+sys.path.insert(0, BACKEND_DIR)
+
+import pytest
+from fastapi.testclient import TestClient
+
+MASTER_PASSWORD = "correct horse battery staple"
+
+def run_script(script: str, tmp_path, **env) -> str:
+    """Jalankan `script` di process Python baru, untuk konfigurasi yang dibaca saat import.
+    
+    Default: SQLite di tmp_path dan KDF murah di thread; `env` menimpa (None = hapus).
+    Return stdout, gagal dengan stderr child kalau exit code bukan 0.
+    """
+    child_env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/app.db", KDF_EXECUTOR="thread", BCRYPT_ROUNDS="4")
+    child_env.update(env)
+    child_env = {key: value for key, value in child_env.items() if value is not None}
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=child_env,
+        capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+@pytest.fixture(scope="session")
+def app_client():
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture
+def client(app_client):
+    """Client dengan database dan cache in-process yang sudah dikosongkan"""
+    from database import SessionLocal
+    from models import Base
+    from audit import audit_writer
+    from dependencies import principal_cache
+    from security import key_cache
+    from search import search_index
+    
+    audit_writer.flush()
+    db = SessionLocal()
+    try:
+        for table in reversed(Base.metadata.sorted_tables):
+            if table.name != "schema_meta":
+                db.execute(table.delete())
+        db.commit()
+    finally:
+        db.close()
+    principal_cache.clear()
+    key_cache.clear()
+    search_index.clear()
+    return app_client
+
+@pytest.fixture
+def auth_headers(client):
+    """Setup master password, return header Authorization session baru"""
+    response = client.post("/auth/setup", json={"master_password": MASTER_PASSWORD})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['token']}"}
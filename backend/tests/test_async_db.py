@@ -0,0 +1,16 @@
+"""ASYNC_DB=1 dibaca saat import, jadi app di-import di process terpisah"""
+from conftest import run_script
+
+SCRIPT = """
+from fastapi.testclient import TestClient
+import database, main
+assert database.async_engine is not None
+with TestClient(main.app) as client:
+    assert client.post("/auth/setup", json={"master_password": "pw"}).status_code == 200
+    assert client.get("/categories").status_code == 200
+    assert client.get("/history").status_code == 200
+print("ok")
+"""
+
+def test_app_imports_and_serves_with_async_sqlite(tmp_path):
+    assert "ok" in run_script(SCRIPT, tmp_path, ASYNC_DB="1", ASYNC_DATABASE_URL=None)
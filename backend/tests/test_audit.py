@@ -0,0 +1,34 @@
+"""Write-behind audit writer: retry terbatas dan row rusak tidak memblokir antrian"""
+from datetime import datetime
+from audit import AuditLogWriter, AUDIT_MAX_RETRIES
+from database import SessionLocal
+from models import ActivityLog, User
+
+def _count_logs():
+    db = SessionLocal()
+    try:
+        return db.query(ActivityLog).count()
+    finally:
+        db.close()
+
+def test_unwritable_row_is_dropped_after_retries(client, auth_headers):
+    writer = AuditLogWriter(write_behind=False)
+    db = SessionLocal()
+    try:
+        user_id = db.query(User.id).scalar()
+    finally:
+        db.close()
+    before = _count_logs()
+    good = [{"user_id": user_id, "password_id": None, "action": "viewed", "description": f"e{i}"} for i in range(5)]
+    bad = {"user_id": user_id, "password_id": None, "action": None, "description": "NOT NULL action"}
+    writer._pending = [dict(row, timestamp=datetime.utcnow()) for row in good[:2] + [bad] + good[2:]]
+    
+    for _ in range(1, AUDIT_MAX_RETRIES):
+        assert writer.flush() == 0
+        assert writer.pending == 6  # batch menunggu retry
+    writer.record_many([{"user_id": user_id, "password_id": None, "action": "viewed", "description": "new"}])
+    
+    assert _count_logs() - before == 6  # 5 row baik + event baru, row rusak dibuang
+    assert writer.pending == 0
+    assert writer.stats()["dropped"] == 1
+    assert writer.flush() == 0
@@ -0,0 +1,16 @@
+"""Setup / login: bcrypt dan PBKDF2 lewat kdf_service (antrian terbatas, 503 saat penuh)"""
+from conftest import MASTER_PASSWORD
+from security import kdf_service
+
+def test_setup_runs_kdf_on_executor(client):
+    before = kdf_service.completed
+    response = client.post("/auth/setup", json={"master_password": MASTER_PASSWORD})
+    assert response.status_code == 200
+    assert kdf_service.completed - before == 2  # bcrypt hash + derive key vault
+    assert client.post("/auth/setup", json={"master_password": MASTER_PASSWORD}).status_code == 400
+
+def test_setup_rejected_when_kdf_queue_is_full(client, monkeypatch):
+    monkeypatch.setattr(kdf_service, "in_flight", kdf_service.workers + kdf_service.max_queue)
+    response = client.post("/auth/setup", json={"master_password": MASTER_PASSWORD})
+    assert response.status_code == 503
+    assert response.headers["retry-after"]
@@ -0,0 +1,53 @@
+"""Breach audit: external sort digest dan merge join ke corpus"""
+import os
+import pytest
+import routes.passwords
+from breach import BreachCorpus, DigestSpool, audit_sorted, sha1_digest, write_corpus
+
+BREACHED = ["password123", "letmein", "qwerty"]
+
+@pytest.fixture
+def corpus(tmp_path):
+    digests = [os.urandom(20) for _ in range(5000)] + [sha1_digest(p) for p in BREACHED]
+    path = str(tmp_path / "corpus.bin")
+    write_corpus(digests, path, sort=True)
+    corpus = BreachCorpus(path)
+    yield corpus
+    corpus.close()
+
+@pytest.mark.parametrize("run_size", [3, 10000])  # spill ke temp file vs satu run di memory
+def test_spool_groups_and_matches_like_a_full_map(corpus, run_size):
+    passwords = [f"unique-{i}" for i in range(40)] + BREACHED + ["letmein", "reused", "reused", "reused"]
+    expected_breached = sorted(i for i, p in enumerate(passwords) if p in BREACHED)
+    by_digest = {}
+    for i, p in enumerate(passwords):
+        by_digest.setdefault(sha1_digest(p), []).append(i)
+    
+    with DigestSpool(run_size=run_size) as spool:
+        for i, p in enumerate(reversed(passwords)):
+            spool.add(sha1_digest(p), len(passwords) - 1 - i)
+        results = list(audit_sorted(corpus, spool.sorted_items()))
+    
+    assert sorted(i for found, ids in results if found for i in ids) == expected_breached
+    assert sorted(ids for _, ids in results if len(ids) > 1) == sorted(
+        ids for ids in by_digest.values() if len(ids) > 1
+    )
+
+def test_locate_returns_insertion_point(corpus):
+    records = [corpus._record(i) for i in (0, 1, 2)]
+    assert corpus.locate(records[1]) == (True, 1)
+    assert corpus.locate(records[1], lo=2) == (False, 2)
+    assert corpus.locate(b"\x00" * 20) == (False, 0)
+    assert corpus.locate(b"\xff" * 20) == (False, len(corpus))
+
+def test_breach_audit_endpoint(client, auth_headers, corpus, monkeypatch):
+    monkeypatch.setattr(routes.passwords, "get_breach_corpus", lambda: corpus)
+    for i, password in enumerate(["letmein", "Zq9!unique", "letmein", "qwerty"]):
+        response = client.post("/passwords", json={"title": f"t{i}", "password": password}, headers=auth_headers)
+        assert response.status_code == 200
+    
+    result = client.get("/passwords/breach-audit", headers=auth_headers).json()
+    ids = [item["id"] for item in result["breached"]]
+    assert result["checked"] == 4
+    assert [item["title"] for item in result["breached"]] == ["t0", "t2", "t3"]
+    assert result["reused"] == [[ids[0], ids[1]]]
@@ -0,0 +1,75 @@
+"""Delta sync GET /passwords/changes: upsert, tombstone, reset dan pruning tombstone"""
+from datetime import datetime, timedelta
+from database import SessionLocal
+from models import Tombstone
+from versioning import prune_tombstones
+
+def _create(client, headers, title):
+    response = client.post("/passwords", headers=headers, json={"title": title, "password": "x"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def _changes(client, headers, since):
+    response = client.get("/passwords/changes", params={"since": since}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+def test_full_snapshot_when_since_is_zero(client, auth_headers):
+    first = _create(client, auth_headers, "Mail")
+    second = _create(client, auth_headers, "Bank")
+    client.delete(f"/passwords/{first}", headers=auth_headers)
+    
+    snapshot = _changes(client, auth_headers, 0)
+    assert snapshot["reset"] is True
+    assert [p["id"] for p in snapshot["passwords"]] == [second]
+    assert snapshot["deleted"] == []  # snapshot penuh tidak butuh tombstone
+    assert len(snapshot["categories"]) > 0
+
+def test_upserts_and_tombstones_after_cursor(client, auth_headers):
+    kept = _create(client, auth_headers, "Mail")
+    removed = _create(client, auth_headers, "Bank")
+    cursor = _changes(client, auth_headers, 0)["cursor"]
+    assert _changes(client, auth_headers, cursor) == {
+        "cursor": cursor, "reset": False, "passwords": [], "categories": [], "deleted": []
+    }
+    
+    added = _create(client, auth_headers, "Shop")
+    assert client.put(f"/passwords/{kept}", headers=auth_headers, json={"title": "Mail 2"}).status_code == 200
+    assert client.delete(f"/passwords/{removed}", headers=auth_headers).status_code == 200
+    
+    delta = _changes(client, auth_headers, cursor)
+    assert delta["reset"] is False
+    assert delta["cursor"] > cursor
+    assert [(p["id"], p["title"]) for p in delta["passwords"]] == [(added, "Shop"), (kept, "Mail 2")]
+    assert [(d["entity"], d["entity_id"]) for d in delta["deleted"]] == [("password", removed)]
+    
+    # Cursor dari database lain (lebih besar dari version server): snapshot penuh
+    assert _changes(client, auth_headers, delta["cursor"] + 100)["reset"] is True
+
+def test_pruned_tombstones_force_reset_for_old_cursors(client, auth_headers):
+    old = _create(client, auth_headers, "Old")
+    recent = _create(client, auth_headers, "Recent")
+    old_cursor = _changes(client, auth_headers, 0)["cursor"]
+    client.delete(f"/passwords/{old}", headers=auth_headers)
+    synced = _changes(client, auth_headers, old_cursor)["cursor"]
+    client.delete(f"/passwords/{recent}", headers=auth_headers)
+    
+    db = SessionLocal()
+    try:
+        db.query(Tombstone).filter(Tombstone.entity_id == old).update(
+            {Tombstone.deleted_at: datetime.utcnow() - timedelta(days=100)}
+        )
+        db.commit()
+        assert prune_tombstones(db, retention_days=90) == 1
+        assert db.query(Tombstone).filter(Tombstone.entity_id == recent).count() == 1
+    finally:
+        db.close()
+    
+    # Client yang belum melihat tombstone yang sudah di-prune harus mulai ulang
+    stale = _changes(client, auth_headers, old_cursor)
+    assert stale["reset"] is True
+    assert old not in [p["id"] for p in stale["passwords"]]
+    # Client yang sudah melewati horizon tetap mendapat delta biasa
+    delta = _changes(client, auth_headers, synced)
+    assert delta["reset"] is False
+    assert [d["entity_id"] for d in delta["deleted"]] == [recent]
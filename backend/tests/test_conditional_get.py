@@ -0,0 +1,21 @@
+"""Conditional GET /passwords: ETag per representasi (JSON / NDJSON)"""
+from serialization import NDJSON_MEDIA_TYPE
+
+def test_json_and_ndjson_have_distinct_etags(client, auth_headers):
+    json_response = client.get("/passwords", headers=auth_headers)
+    ndjson_response = client.get("/passwords", headers={**auth_headers, "Accept": NDJSON_MEDIA_TYPE})
+    assert json_response.headers["etag"] != ndjson_response.headers["etag"]
+    assert "Accept" in json_response.headers["vary"]
+    assert "Accept" in ndjson_response.headers["vary"]
+
+def test_etag_of_other_representation_does_not_match(client, auth_headers):
+    json_etag = client.get("/passwords", headers=auth_headers).headers["etag"]
+    
+    cached = client.get("/passwords", headers={**auth_headers, "If-None-Match": json_etag})
+    assert cached.status_code == 304
+    assert "Accept" in cached.headers["vary"]
+    
+    ndjson = client.get("/passwords", headers={
+        **auth_headers, "Accept": NDJSON_MEDIA_TYPE, "If-None-Match": json_etag
+    })
+    assert ndjson.status_code == 200
@@ -0,0 +1,47 @@
+"""POST /passwords/decrypt-batch: urutan, missing / failed, audit log dan batas ukuran"""
+from audit import audit_writer
+from database import SessionLocal
+from models import ActivityLog, Password
+import routes.passwords
+
+def _create(client, headers, title, password):
+    response = client.post("/passwords", headers=headers, json={"title": title, "password": password})
+    return response.json()["id"]
+
+def test_decrypt_batch_keeps_order_and_reports_missing_and_failed(client, auth_headers):
+    mail = _create(client, auth_headers, "Mail", "secret-mail")
+    bank = _create(client, auth_headers, "Bank", "secret-bank")
+    broken = _create(client, auth_headers, "Broken", "secret-broken")
+    db = SessionLocal()
+    try:
+        db.query(Password).filter(Password.id == broken).update({Password.ciphertext: b"\x00" * 40})
+        db.commit()
+    finally:
+        db.close()
+    
+    response = client.post("/passwords/decrypt-batch", headers=auth_headers, json={
+        "ids": [bank, 9999, mail, bank, broken], "action": "copied"
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["passwords"] == [
+        {"id": bank, "password": "secret-bank"},
+        {"id": mail, "password": "secret-mail"},
+    ]
+    assert body["missing"] == [9999]
+    assert body["failed"] == [broken]
+    
+    audit_writer.flush()
+    db = SessionLocal()
+    try:
+        logged = sorted(pid for (pid,) in db.query(ActivityLog.password_id).filter(ActivityLog.action == "copied"))
+    finally:
+        db.close()
+    assert logged == sorted([bank, mail])  # satu event per entry yang berhasil, tanpa duplikat
+
+def test_decrypt_batch_rejects_oversized_batches(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(routes.passwords, "MAX_BATCH_DECRYPT", 3)
+    response = client.post("/passwords/decrypt-batch", headers=auth_headers, json={"ids": [1, 2, 3, 4]})
+    assert response.status_code == 400
+    response = client.post("/passwords/decrypt-batch", headers=auth_headers, json={"ids": [1, 1, 1, 1]})
+    assert response.status_code == 200  # id duplikat dihitung sekali
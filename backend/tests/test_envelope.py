@@ -0,0 +1,114 @@
+"""Envelope AES-GCM, salt per user dan lazy upgrade dari token Fernet lama"""
+import pytest
+from cryptography.fernet import Fernet
+from conftest import MASTER_PASSWORD
+from database import SessionLocal
+from models import User, Password, KeySalt
+from security import (
+    SecurityManager, ENVELOPE_HEADER, ENVELOPE_VERSION, ALG_AES256_GCM, DECRYPT_ERROR, KDF_ITERATIONS
+)
+from vault_keys import KeyParams, build_keyring, upgrade_secret
+
+def _keyring(password=MASTER_PASSWORD, salt=b"s" * 16, salt_id=1, legacy=False):
+    return build_keyring(password, KeyParams(salt_id, salt, 1000, has_legacy_rows=legacy))
+
+def _row(password_id):
+    db = SessionLocal()
+    try:
+        return db.get(Password, password_id)
+    finally:
+        db.close()
+
+def test_round_trip_and_header():
+    keyring = _keyring()
+    envelope = SecurityManager.encrypt_with_key("hunter2 ü", keyring)
+    
+    assert ENVELOPE_HEADER.unpack_from(envelope) == (ENVELOPE_VERSION, ALG_AES256_GCM, 1, 1000, 1)
+    assert SecurityManager.decrypt_with_key(envelope, keyring) == "hunter2 ü"
+    assert SecurityManager.decrypt_with_key(memoryview(envelope), keyring) == "hunter2 ü"
+    assert not SecurityManager.needs_upgrade(envelope, keyring)
+    # Nonce acak: plaintext sama, envelope berbeda
+    assert SecurityManager.encrypt_with_key("hunter2 ü", keyring) != envelope
+
+@pytest.mark.parametrize("tamper", [
+    lambda blob: blob[:-1] + bytes([blob[-1] ^ 1]),          # tag / ciphertext
+    lambda blob: blob[:3] + b"\x00\x00\x00\x01" + blob[7:],  # iterasi di header (AAD)
+    lambda blob: bytes([2]) + blob[1:],                      # versi tidak dikenal
+    lambda blob: blob[:ENVELOPE_HEADER.size + 4],            # terpotong
+    lambda blob: blob[:3],                                   # lebih pendek dari header
+    lambda blob: b"",
+])
+def test_tampered_or_truncated_envelope_is_rejected(tamper):
+    keyring = _keyring()
+    envelope = SecurityManager.encrypt_with_key("secret", keyring)
+    with pytest.raises(ValueError, match=DECRYPT_ERROR):
+        SecurityManager.decrypt_with_key(tamper(envelope), keyring)
+
+def test_wrong_master_password_or_salt_is_rejected():
+    envelope = SecurityManager.encrypt_with_key("secret", _keyring())
+    with pytest.raises(ValueError, match=DECRYPT_ERROR):
+        SecurityManager.decrypt_with_key(envelope, _keyring(password="wrong"))
+    with pytest.raises(ValueError, match=DECRYPT_ERROR):
+        SecurityManager.decrypt_with_key(envelope, _keyring(salt=b"t" * 16))
+
+def test_malformed_blob_returns_400_not_500(client, auth_headers):
+    password_id = client.post("/passwords", headers=auth_headers, json={"title": "t", "password": "p"}).json()["id"]
+    db = SessionLocal()
+    db.query(Password).filter(Password.id == password_id).update({"ciphertext": b"\x01\x01"})
+    db.commit()
+    db.close()
+    
+    response = client.post(f"/passwords/{password_id}/decrypt", headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == DECRYPT_ERROR
+    # Metadata entry yang rusak tetap bisa diedit
+    assert client.put(f"/passwords/{password_id}", headers=auth_headers, json={"title": "renamed"}).status_code == 200
+
+def test_entries_use_per_user_salt(client, auth_headers):
+    password_id = client.post("/passwords", headers=auth_headers, json={"title": "t", "password": "p"}).json()["id"]
+    db = SessionLocal()
+    try:
+        user = db.query(User).one()
+        key_salt = db.get(KeySalt, user.key_salt_id)
+        row = db.get(Password, password_id)
+        assert key_salt.user_id == user.id and key_salt.iterations == KDF_ITERATIONS
+        assert row.encrypted_password == ""
+        header = ENVELOPE_HEADER.unpack_from(row.ciphertext)
+        assert header[3:] == (KDF_ITERATIONS, key_salt.id)
+    finally:
+        db.close()
+    response = client.post(f"/passwords/{password_id}/decrypt", headers=auth_headers)
+    assert response.json() == {"password": "p"}
+
+def test_legacy_fernet_row_is_upgraded_on_decrypt(client, auth_headers):
+    _, legacy_key, _ = SecurityManager.derive_vault_keys(MASTER_PASSWORD, b"unused", 1000, legacy=True)
+    token = Fernet(legacy_key).encrypt(b"old secret").decode()
+    db = SessionLocal()
+    user_id = db.query(User.id).scalar()
+    row = Password(user_id=user_id, title="legacy", encrypted_password=token)
+    db.add(row)
+    db.commit()
+    password_id = row.id
+    db.close()
+    
+    # Key di-derive saat login, legacy key ikut karena masih ada row format lama
+    session_token = client.post("/auth/login", json={"master_password": MASTER_PASSWORD}).json()["token"]
+    headers = {"Authorization": f"Bearer {session_token}"}
+    assert client.post(f"/passwords/{password_id}/decrypt", headers=headers).json() == {"password": "old secret"}
+    
+    upgraded = _row(password_id)
+    assert upgraded.encrypted_password == "" and upgraded.ciphertext is not None
+    assert ENVELOPE_HEADER.unpack_from(upgraded.ciphertext)[0] == ENVELOPE_VERSION
+    assert client.post(f"/passwords/{password_id}/decrypt", headers=headers).json() == {"password": "old secret"}
+
+def test_upgrade_secret_is_compare_and_set(client, auth_headers):
+    password_id = client.post("/passwords", headers=auth_headers, json={"title": "t", "password": "p"}).json()["id"]
+    keyring = _keyring()
+    db = SessionLocal()
+    try:
+        row = db.get(Password, password_id)
+        stale = SecurityManager.encrypt_with_key("stale", keyring)
+        assert not upgrade_secret(db, row, stale, SecurityManager.encrypt_with_key("x", keyring))
+        assert upgrade_secret(db, row, row.ciphertext, SecurityManager.encrypt_with_key("x", keyring))
+    finally:
+        db.close()
@@ -0,0 +1,30 @@
+"""Export: row yang tidak bisa di-decrypt menggagalkan export"""
+import csv
+import io
+from database import SessionLocal
+from models import Password
+
+def _create(client, headers, title, password):
+    response = client.post("/passwords", headers=headers, json={"title": title, "password": password})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_export_fails_when_an_entry_cannot_be_decrypted(client, auth_headers):
+    _create(client, auth_headers, "Mail", "secret-1")
+    broken = _create(client, auth_headers, "Bank", "secret-2")
+    db = SessionLocal()
+    try:
+        db.query(Password).filter(Password.id == broken).update({Password.ciphertext: b"\x00" * 40})
+        db.commit()
+    finally:
+        db.close()
+    
+    response = client.get("/passwords/export", params={"format": "json"}, headers=auth_headers)
+    assert response.status_code == 409
+    assert f"ids {broken}" in response.json()["detail"]
+    
+    assert client.delete(f"/passwords/{broken}", headers=auth_headers).status_code == 200
+    response = client.get("/passwords/export", params={"format": "csv"}, headers=auth_headers)
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["title"], row["password"]) for row in rows] == [("Mail", "secret-1")]
@@ -0,0 +1,20 @@
+"""FAST_START dibaca saat import, jadi app di-import di process terpisah"""
+from conftest import run_script
+
+SCRIPT = """
+import sys
+from fastapi.testclient import TestClient
+import main
+lazy = ("routes.passwords", "security", "dependencies", "rotation", "audit")
+assert not [name for name in lazy if name in sys.modules], [name for name in lazy if name in sys.modules]
+with TestClient(main.app) as client:
+    assert client.post("/auth/setup", json={"master_password": "pw"}).status_code == 200
+    assert "routes.passwords" in sys.modules
+    assert client.get("/passwords").status_code == 200
+    assert client.get("/debug_env").status_code == 404
+    assert client.get("/health").json()["kdf"]["completed"] >= 1
+print("ok")
+"""
+
+def test_fast_start_loads_routers_on_first_request(tmp_path):
+    assert "ok" in run_script(SCRIPT, tmp_path, FAST_START="1")
@@ -0,0 +1,34 @@
+"""Generator: exclude_ambiguous dan opsi karakter berlaku di semua mode"""
+import pytest
+from generator import AMBIGUOUS, SYMBOLS, generate_batch
+
+@pytest.mark.parametrize("mode", ["random", "pronounceable"])
+def test_exclude_ambiguous_removes_lookalike_characters(mode):
+    passwords, _ = generate_batch(mode, 500, length=24, symbols=True, exclude_ambiguous=True)
+    assert all(AMBIGUOUS.isdisjoint(password) for password in passwords)
+
+def test_generate_endpoint_honours_exclude_ambiguous_for_pronounceable(client):
+    response = client.post("/passwords/generate", json={
+        "mode": "pronounceable", "length": 32, "count": 200, "exclude_ambiguous": True
+    })
+    assert response.status_code == 200
+    assert all(AMBIGUOUS.isdisjoint(item["password"]) for item in response.json()["candidates"])
+
+def test_passphrase_honours_options():
+    passwords, _ = generate_batch("passphrase", 300, words=4, separator=" ", symbols=True, exclude_ambiguous=True)
+    for password in passwords:
+        assert AMBIGUOUS.isdisjoint(password)
+        assert len(password.split(" ")) == 4
+        assert any(c in SYMBOLS for c in password)
+        assert any(c.isdigit() for c in password)
+    
+    plain, _ = generate_batch("passphrase", 100, words=4, separator=" ", digits=False, symbols=False)
+    assert all(word.isalpha() for password in plain for word in password.split(" "))
+
+def test_generate_endpoint_rejects_lowercase_off_outside_random_mode(client):
+    for mode in ("pronounceable", "passphrase"):
+        response = client.post("/passwords/generate", json={"mode": mode, "include_lowercase": False})
+        assert response.status_code == 422
+    response = client.post("/passwords/generate", json={"mode": "random", "include_lowercase": False})
+    assert response.status_code == 200
+    assert not any(c.islower() for c in response.json()["password"])
@@ -0,0 +1,31 @@
+"""Import: progress per user dan error CSV rusak"""
+from vault_io import ImportProgress, import_progress
+
+CSV_HEADER = "title,username,password,website\n"
+
+def _upload(client, headers, content, **params):
+    files = {"file": ("vault.csv", content.encode(), "text/csv")}
+    return client.post("/passwords/import", files=files, params=params, headers=headers)
+
+def test_import_progress_requires_owner(client, auth_headers):
+    response = _upload(client, auth_headers, CSV_HEADER + "Mail,me,secret,mail.example\n", import_id="job1")
+    assert response.status_code == 200
+    assert response.json()["imported"] == 1
+    
+    assert client.get("/passwords/import/job1", headers=auth_headers).json()["status"] == "completed"
+    
+    import_progress.start(999, "other-user-job")  # job user lain, id ketahuan
+    assert client.get("/passwords/import/other-user-job", headers=auth_headers).status_code == 404
+
+def test_import_progress_is_scoped_per_user():
+    progress = ImportProgress()
+    progress.start(1, "job")
+    assert progress.get(1, "job")["status"] == "running"
+    assert progress.get(2, "job") is None
+
+def test_malformed_csv_returns_400_with_line(client, auth_headers):
+    oversized = "x" * 200000  # melewati csv.field_size_limit
+    content = CSV_HEADER + "Mail,me,secret,mail.example\n" + f"Bank,me,{oversized},bank.example\n"
+    response = _upload(client, auth_headers, content)
+    assert response.status_code == 400
+    assert "Malformed CSV at row 2" in response.json()["detail"]
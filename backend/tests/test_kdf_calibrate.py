@@ -0,0 +1,48 @@
+"""kdf_calibrate: batas cost, write_env dan rehash saat login setelah cost dinaikkan"""
+import kdf_calibrate
+import security
+from conftest import MASTER_PASSWORD
+from database import SessionLocal
+from models import User
+
+def test_bcrypt_calibration_stays_within_limits(monkeypatch):
+    # Model waktu: 20 ms di cost minimum, x2 per ronde
+    monkeypatch.setattr(kdf_calibrate, "bench_bcrypt",
+                        lambda rounds, repeat=3: 20.0 * 2 ** (rounds - kdf_calibrate.MIN_BCRYPT_ROUNDS))
+    assert kdf_calibrate.calibrate_bcrypt(250) == (13, 160.0)  # ronde 14 (320 ms) lewat target
+    assert kdf_calibrate.calibrate_bcrypt(1)[0] == kdf_calibrate.MIN_BCRYPT_ROUNDS
+    assert kdf_calibrate.calibrate_bcrypt(10 ** 9)[0] == kdf_calibrate.MAX_BCRYPT_ROUNDS
+
+def test_pbkdf2_calibration_rounds_down_and_keeps_minimum(monkeypatch):
+    # 1 ms per 1000 iterasi
+    monkeypatch.setattr(kdf_calibrate, "bench_pbkdf2", lambda iterations, repeat=3: iterations / 1000)
+    iterations, elapsed = kdf_calibrate.calibrate_pbkdf2(255)
+    assert iterations == 250000
+    assert iterations % kdf_calibrate.KDF_ITERATIONS_STEP == 0
+    assert elapsed == 250.0
+    assert kdf_calibrate.calibrate_pbkdf2(1)[0] == kdf_calibrate.MIN_KDF_ITERATIONS
+
+def test_write_env_updates_in_place_and_appends(tmp_path):
+    path = tmp_path / ".env"
+    path.write_text("# config\nDATABASE_URL=sqlite:///x.db\nBCRYPT_ROUNDS=12\n")
+    kdf_calibrate.write_env(str(path), {"BCRYPT_ROUNDS": 13, "KDF_ITERATIONS": 250000})
+    assert path.read_text() == "# config\nDATABASE_URL=sqlite:///x.db\nBCRYPT_ROUNDS=13\nKDF_ITERATIONS=250000\n"
+    
+    fresh = tmp_path / "new.env"
+    kdf_calibrate.write_env(str(fresh), {"BCRYPT_ROUNDS": 11})
+    assert fresh.read_text() == "BCRYPT_ROUNDS=11\n"
+    assert not (tmp_path / "new.env.tmp").exists()
+
+def _stored_cost():
+    db = SessionLocal()
+    try:
+        return int(db.query(User.master_password_hash).scalar().split("$")[2])
+    finally:
+        db.close()
+
+def test_login_rehashes_master_password_after_cost_increase(client, auth_headers, monkeypatch):
+    assert _stored_cost() == security.BCRYPT_ROUNDS
+    monkeypatch.setattr(security, "BCRYPT_ROUNDS", security.BCRYPT_ROUNDS + 1)
+    assert client.post("/auth/login", json={"master_password": MASTER_PASSWORD}).status_code == 200
+    assert _stored_cost() == security.BCRYPT_ROUNDS
+    assert client.post("/auth/login", json={"master_password": MASTER_PASSWORD}).status_code == 200
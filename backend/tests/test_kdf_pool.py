@@ -0,0 +1,27 @@
+"""KDF process pool: worker tidak mewarisi lock yang dipegang thread lain saat pool dibuat"""
+from conftest import run_script
+
+SCRIPT = """
+import asyncio, threading, time
+import metrics
+from security import kdf_service, SecurityManager
+
+held = threading.Event()
+
+def holder():
+    # Thread lain (misal request yang sedang mencatat metrics) memegang lock saat worker di-start
+    with metrics.crypto_latency._lock:
+        held.set()
+        time.sleep(1)
+
+threading.Thread(target=holder).start()
+held.wait()
+assert kdf_service._get_executor()._mp_context.get_start_method() != "fork"
+hashed = asyncio.run(asyncio.wait_for(kdf_service.run(SecurityManager.hash_master_password, "pw"), 30))
+assert asyncio.run(kdf_service.run(SecurityManager.verify_master_password, "pw", hashed))
+kdf_service.shutdown()
+print("ok")
+"""
+
+def test_process_pool_survives_locks_held_at_start(tmp_path):
+    assert "ok" in run_script(SCRIPT, tmp_path, KDF_EXECUTOR="process", KDF_WORKERS="2")
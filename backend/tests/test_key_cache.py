@@ -0,0 +1,35 @@
+"""Derived key cache per session: PBKDF2 tidak diulang selama session aktif"""
+from security import KeyCache, key_cache, kdf_service
+
+def test_key_cache_evicts_lru_and_expired_entries():
+    cache = KeyCache(ttl=60, max_entries=2)
+    cache.put("a", "key-a")
+    cache.put("b", "key-b")
+    assert cache.get("a") == "key-a"  # a jadi paling baru dipakai
+    cache.put("c", "key-c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "key-a"
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+    
+    expired = KeyCache(ttl=0)
+    expired.put("a", "key-a")
+    assert expired.get("a") is None
+
+def test_session_reuses_derived_key_until_logout(client, auth_headers):
+    response = client.post("/passwords", headers=auth_headers, json={"title": "Mail", "password": "secret"})
+    password_id = response.json()["id"]
+    kdf_before = kdf_service.completed
+    hits_before = key_cache.stats()["hits"]
+    
+    for _ in range(3):
+        response = client.post(f"/passwords/{password_id}/decrypt", headers=auth_headers)
+        assert response.json()["password"] == "secret"
+    assert kdf_service.completed == kdf_before  # tidak ada bcrypt / PBKDF2 lagi
+    assert key_cache.stats()["hits"] - hits_before >= 3
+    
+    assert client.post("/auth/logout", headers=auth_headers).status_code == 200
+    assert key_cache.stats()["size"] == 0
+    response = client.post(f"/passwords/{password_id}/decrypt", headers=auth_headers)
+    assert response.status_code == 401
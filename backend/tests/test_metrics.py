@@ -0,0 +1,47 @@
+"""GET /metrics: format text Prometheus, label route template dan METRICS_TOKEN"""
+import re
+import main
+from metrics import Counter, Histogram
+
+# metric{label="value",...} value
+SAMPLE_RE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? -?[0-9.e+-]+$')
+
+def test_histogram_and_counter_rendering():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe("/a", value=value)
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+    counter = Counter("requests_total", "Requests", ("path",))
+    counter.inc('say "hi"\n')
+    assert counter.render()[-1] == 'requests_total{path="say \\"hi\\"\\n"} 1'
+
+def test_metrics_endpoint_format_and_route_labels(client, auth_headers):
+    password_id = client.post("/passwords", headers=auth_headers, json={"title": "Mail", "password": "x"}).json()["id"]
+    client.get(f"/passwords/{password_id}", headers=auth_headers)
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    for line in lines:
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or SAMPLE_RE.match(line), line
+    # Label route memakai template, bukan id asli
+    assert any(line.startswith('http_requests_total{method="GET",route="/passwords/{password_id}",status="200"}')
+               for line in lines)
+    assert not any(f"/passwords/{password_id}\"" in line for line in lines)
+    assert any(line.startswith('crypto_operation_duration_seconds_count{operation="bcrypt_hash"}') for line in lines)
+    assert any(line.startswith("key_cache_hits ") for line in lines)
+
+def test_metrics_token_is_required_when_configured(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"X-Metrics-Token": "wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"X-Metrics-Token": "s3cret"}).status_code == 200
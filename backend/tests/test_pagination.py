@@ -0,0 +1,58 @@
+"""Keyset pagination /passwords dan /history: halaman stabil walau ada insert baru"""
+from datetime import datetime
+from database import SessionLocal
+from models import Password
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+def _create(client, headers, title):
+    response = client.post("/passwords", headers=headers, json={"title": title, "password": "x"})
+    return response.json()["id"]
+
+def _walk(client, headers, path, limit, between_pages=None):
+    """Semua id lewat cursor, `between_pages` dipanggil setelah setiap halaman"""
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200
+        page = [item["id"] for item in response.json()]
+        assert len(page) <= limit
+        ids.extend(page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+        if between_pages:
+            between_pages()
+
+def test_password_pages_stay_stable_across_inserts(client, auth_headers):
+    existing = [_create(client, auth_headers, f"entry {i}") for i in range(10)]
+    # Beberapa row dengan created_at sama persis: urutan ditentukan id
+    db = SessionLocal()
+    try:
+        same_time = datetime(2020, 1, 1)
+        db.query(Password).filter(Password.id.in_(existing[:4])).update(
+            {Password.created_at: same_time}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    inserted = []
+    
+    ids = _walk(client, auth_headers, "/passwords", 3,
+                lambda: inserted.append(_create(client, auth_headers, f"new {len(inserted)}")))
+    assert ids == list(reversed(existing[4:])) + list(reversed(existing[:4]))  # newest first, tanpa duplikat / lompat
+    assert inserted and not set(inserted) & set(ids)  # row baru ada di depan, bukan di halaman berikutnya
+
+def test_history_pages_cover_every_event_once(client, auth_headers):
+    for i in range(7):
+        _create(client, auth_headers, f"entry {i}")
+    response = client.get("/history", params={"limit": 500}, headers=auth_headers)
+    everything = [item["id"] for item in response.json()]
+    assert _walk(client, auth_headers, "/history", 2) == everything
+
+def test_cursor_round_trip_and_invalid_cursor(client, auth_headers):
+    timestamp = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+    for path in ("/passwords", "/history"):
+        response = client.get(path, params={"limit": 5, "cursor": "not-a-cursor"}, headers=auth_headers)
+        assert response.status_code == 400
@@ -0,0 +1,27 @@
+"""Principal cache tidak boleh dipakai untuk verifikasi master password"""
+from sqlalchemy import update
+from conftest import MASTER_PASSWORD
+from database import SessionLocal
+from dependencies import principal_cache
+from models import User
+from security import SecurityManager
+
+def _change_hash_elsewhere(new_password):
+    # Core UPDATE tanpa session event: seperti rotasi / rehash di worker lain,
+    # principal cache process ini tidak di-invalidate
+    db = SessionLocal()
+    db.execute(update(User).values(master_password_hash=SecurityManager.hash_master_password(new_password)))
+    db.commit()
+    db.close()
+
+def test_master_password_is_checked_against_current_hash(client, auth_headers):
+    password_id = client.post("/passwords", headers=auth_headers, json={"title": "t", "password": "p"}).json()["id"]
+    old = {"X-Master-Password": MASTER_PASSWORD}
+    assert client.post(f"/passwords/{password_id}/decrypt", headers=old).status_code == 200
+    assert principal_cache.get(None) is not None  # principal tanpa session sudah di-cache
+    
+    _change_hash_elsewhere("rotated elsewhere")
+    
+    assert client.post(f"/passwords/{password_id}/decrypt", headers=old).status_code == 401
+    assert client.post("/auth/login", json={"master_password": MASTER_PASSWORD}).status_code == 401
+    assert client.post("/auth/login", json={"master_password": "rotated elsewhere"}).status_code == 200
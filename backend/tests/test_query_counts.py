@@ -0,0 +1,46 @@
+"""Batas jumlah query per endpoint (deteksi N+1).
+
+Setiap endpoint diukur dengan vault kecil dan besar: jumlah query tidak boleh
+bertambah dengan jumlah entry, dan tidak boleh melewati batas di QUERY_LIMITS.
+"""
+import pytest
+from database import count_queries
+
+QUERY_LIMITS = {
+    "/passwords": 2,  # vault version + list
+    "/passwords?limit=5": 2,
+    "/passwords/{id}": 1,
+    "/history": 2,  # activity version + halaman
+    "/history?limit=5": 2,
+    "/dashboard/summary": 5,  # version, GROUP BY, category, password, history
+}
+
+def _seed(client, headers, count):
+    categories = client.get("/categories", headers=headers).json()
+    ids = []
+    for i in range(count):
+        response = client.post("/passwords", headers=headers, json={
+            "title": f"entry {i}",
+            "password": f"secret-{i}",
+            "category_id": categories[i % len(categories)]["id"] if i % 4 else None,
+        })
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+    return ids
+
+def _measure(client, headers, path):
+    client.get(path, headers=headers)  # principal cache / index hangat dulu
+    with count_queries() as counter:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return counter.count
+
+@pytest.mark.parametrize("template", sorted(QUERY_LIMITS))
+def test_query_count_is_bounded_and_constant(client, auth_headers, template):
+    ids = _seed(client, auth_headers, 3)
+    small = _measure(client, auth_headers, template.format(id=ids[-1]))
+    ids += _seed(client, auth_headers, 30)
+    large = _measure(client, auth_headers, template.format(id=ids[-1]))
+    
+    assert large == small, f"{template}: {small} queries with 3 entries, {large} with 33"
+    assert large <= QUERY_LIMITS[template]
@@ -0,0 +1,153 @@
+"""Rotasi master password: berhenti di tengah, lanjut dari checkpoint, tanpa tulis ganda"""
+import time
+import pytest
+from conftest import MASTER_PASSWORD
+from database import SessionLocal
+from models import Password
+from rotation import rotation_manager
+import security
+
+NEW_PASSWORD = "new master password"
+ROTATE = {"current_master_password": MASTER_PASSWORD, "new_master_password": NEW_PASSWORD}
+
+@pytest.fixture
+def slow_rotation(monkeypatch):
+    """Chunk kecil dan lambat supaya job bisa diamati / dihentikan di tengah"""
+    monkeypatch.setattr(rotation_manager, "chunk_size", 5)
+    original = rotation_manager._rotate_chunk
+    
+    def slow_chunk(*args):
+        time.sleep(0.05)
+        return original(*args)
+    monkeypatch.setattr(rotation_manager, "_rotate_chunk", slow_chunk)
+    yield
+    rotation_manager.stop()
+
+def _progress(client, headers):
+    return client.get("/auth/master-password/rotation", headers=headers).json()
+
+def _wait(client, headers, done):
+    for _ in range(200):
+        progress = _progress(client, headers)
+        if done(progress):
+            return progress
+        time.sleep(0.02)
+    raise AssertionError(f"rotation did not progress: {progress}")
+
+def _ciphertext(password_id):
+    db = SessionLocal()
+    try:
+        return bytes(db.get(Password, password_id).ciphertext)
+    finally:
+        db.close()
+
+def test_rotation_resumes_after_interrupt(client, auth_headers, slow_rotation):
+    ids = [
+        client.post("/passwords", headers=auth_headers, json={"title": f"t{i}", "password": f"secret-{i}"}).json()["id"]
+        for i in range(40)
+    ]
+    response = client.post("/auth/master-password/rotate", headers=auth_headers, json=ROTATE)
+    assert response.status_code == 202
+    assert client.post("/auth/master-password/rotate", headers=auth_headers, json=ROTATE).status_code == 409
+    _wait(client, auth_headers, lambda p: p["processed"] >= 10)
+    
+    # Selama job berjalan, decrypt tidak menulis ulang row (sudah / belum dirotasi)
+    for password_id in (ids[0], ids[-1]):
+        before = _ciphertext(password_id)
+        decrypted = client.post(f"/passwords/{password_id}/decrypt", headers=auth_headers).json()
+        assert decrypted == {"password": f"secret-{ids.index(password_id)}"}
+        assert _ciphertext(password_id) == before
+    
+    # "Crash": job berhenti di batas chunk, registrasi key rotasi in-memory hilang
+    rotation_manager.stop()
+    security._key_rotations.clear()
+    stopped = _progress(client, auth_headers)
+    assert stopped["status"] == "interrupted"
+    assert 0 < stopped["checkpoint"] < ids[-1]
+    
+    wrong = dict(ROTATE, new_master_password="something else")
+    assert client.post("/auth/master-password/rotate", headers=auth_headers, json=wrong).status_code == 409
+    
+    resumed = client.post("/auth/master-password/rotate", headers=auth_headers, json=ROTATE)
+    assert resumed.status_code == 202
+    assert resumed.json()["job_id"] == stopped["job_id"]
+    final = _wait(client, {"X-Master-Password": NEW_PASSWORD}, lambda p: p["status"] != "running")
+    assert final["status"] == "completed"
+    assert (final["processed"], final["failed"]) == (40, 0)
+    
+    assert client.post("/auth/login", json={"master_password": MASTER_PASSWORD}).status_code == 401
+    token = client.post("/auth/login", json={"master_password": NEW_PASSWORD}).json()["token"]
+    response = client.post("/passwords/decrypt-batch", headers={"Authorization": f"Bearer {token}"}, json={"ids": ids})
+    body = response.json()
+    assert body["failed"] == []
+    assert {p["id"]: p["password"] for p in body["passwords"]} == {pid: f"secret-{i}" for i, pid in enumerate(ids)}
+
+def test_rotation_with_undecryptable_rows_keeps_old_master_password(client, auth_headers, slow_rotation):
+    ids = [
+        client.post("/passwords", headers=auth_headers, json={"title": f"t{i}", "password": f"secret-{i}"}).json()["id"]
+        for i in range(12)
+    ]
+    broken = ids[7]
+    db = SessionLocal()
+    try:
+        row = db.get(Password, broken)
+        corrupted = bytearray(row.ciphertext)
+        corrupted[-1] ^= 0xFF  # tag GCM tidak cocok lagi
+        row.ciphertext = bytes(corrupted)
+        db.commit()
+    finally:
+        db.close()
+    
+    assert client.post("/auth/master-password/rotate", headers=auth_headers, json=ROTATE).status_code == 202
+    failed = _wait(client, auth_headers, lambda p: p["status"] != "running")
+    assert failed["status"] == "failed"
+    assert failed["failed_ids"] == [broken]
+    assert failed["processed"] == len(ids) - 1
+    
+    # Hash dan salt lama tetap: master password lama masih berlaku, yang baru belum
+    assert client.post("/auth/login", json={"master_password": NEW_PASSWORD}).status_code == 401
+    assert client.post("/auth/login", json={"master_password": MASTER_PASSWORD}).status_code == 200
+    
+    # Row rusak dihapus, lalu job dilanjutkan dan memindai ulang vault
+    assert client.delete(f"/passwords/{broken}", headers=auth_headers).status_code == 200
+    resumed = client.post("/auth/master-password/rotate", headers=auth_headers, json=ROTATE)
+    assert resumed.status_code == 202
+    assert resumed.json()["job_id"] == failed["job_id"]
+    final = _wait(client, {"X-Master-Password": NEW_PASSWORD}, lambda p: p["status"] != "running")
+    assert (final["status"], final["processed"], final["failed"], final["failed_ids"]) == ("completed", len(ids) - 1, 0, [])
+    assert client.post("/auth/login", json={"master_password": NEW_PASSWORD}).status_code == 200
+
+def test_secret_writes_are_refused_and_stale_rows_swept(client, auth_headers, slow_rotation):
+    ids = [
+        client.post("/passwords", headers=auth_headers, json={"title": f"t{i}", "password": f"secret-{i}"}).json()["id"]
+        for i in range(30)
+    ]
+    old_ciphertext = _ciphertext(ids[0])
+    assert client.post("/auth/master-password/rotate", headers=auth_headers, json=ROTATE).status_code == 202
+    _wait(client, auth_headers, lambda p: p["checkpoint"] >= ids[5])
+    
+    # Secret baru ditolak selama job belum selesai, field lain tetap bisa diedit
+    created = client.post("/passwords", headers=auth_headers, json={"title": "new", "password": "x"})
+    assert created.status_code == 409
+    assert client.put(f"/passwords/{ids[1]}", headers=auth_headers, json={"password": "y"}).status_code == 409
+    assert client.put(f"/passwords/{ids[1]}", headers=auth_headers, json={"title": "renamed"}).status_code == 200
+    
+    # Worker lain yang lolos cek menulis dengan key lama di belakang checkpoint
+    db = SessionLocal()
+    try:
+        db.get(Password, ids[0]).ciphertext = old_ciphertext
+        db.commit()
+    finally:
+        db.close()
+    
+    final = _wait(client, {"X-Master-Password": NEW_PASSWORD}, lambda p: p["status"] != "running")
+    assert final["status"] == "completed"
+    token = client.post("/auth/login", json={"master_password": NEW_PASSWORD}).json()["token"]
+    decrypted = client.post(f"/passwords/{ids[0]}/decrypt", headers={"Authorization": f"Bearer {token}"})
+    assert decrypted.json() == {"password": "secret-0"}
+    assert client.post("/passwords", headers={"Authorization": f"Bearer {token}"}, json={"title": "new", "password": "x"}).status_code == 200
+
+def test_rotation_disabled_without_long_running_server(client, auth_headers, monkeypatch):
+    import routes.auth
+    monkeypatch.setattr(routes.auth, "ROTATION_ENABLED", False)
+    assert client.post("/auth/master-password/rotate", headers=auth_headers, json=ROTATE).status_code == 503
@@ -0,0 +1,120 @@
+"""Search index: fuzzy / typo match, filter category dan sinkronisasi antar process"""
+import pytest
+from sqlalchemy import insert
+from database import SessionLocal
+from models import User, Password
+from search import UserSearchIndex, edit_distance, search_index
+from versioning import bump_versions, get_version
+import routes.passwords
+
+@pytest.fixture
+def index():
+    index = UserSearchIndex()
+    index.add(1, {"title": "GitHub", "website": "github.com", "username": "octo"})
+    index.add(2, {"title": "My site", "website": "example.org"})
+    index.add(3, {"title": "Gitlab", "website": "gitlab.com"})
+    index.add(4, {"title": "Bank", "email": "me@site.net"})
+    return index
+
+def _ids(results):
+    return [password_id for password_id, _ in results]
+
+@pytest.mark.parametrize("query, expected", [
+    ("githib", 1),   # satu huruf salah
+    ("gihtub", 1),   # huruf tertukar
+    ("gitlba", 3),
+    ("stie", 2),     # huruf tertukar di kata pendek
+])
+def test_single_typo_queries_match(index, query, expected):
+    assert _ids(index.search(query))[0] == expected
+
+def test_exact_match_outranks_fuzzy(index):
+    results = index.search("site")
+    assert _ids(results)[:2] == [2, 4]  # title lebih berat dari email
+    assert index.search("github")[0][1] > index.search("githib")[0][1]
+
+def test_unrelated_and_short_terms_do_not_fuzzy_match(index):
+    assert index.search("zzzz") == []
+    assert index.search("sitx zzzz") == []
+    assert 2 not in _ids(index.search("sot"))  # term < 4 huruf: tanpa edit distance
+
+def test_edit_distance_stops_at_limit():
+    assert edit_distance("stie", "site", 1) == 1
+    assert edit_distance("githib", "github", 1) == 1
+    assert edit_distance("abcd", "wxyz", 1) == 2
+    assert edit_distance("a", "abcdef", 2) == 3
+
+def _create(client, headers, title, category_id=None):
+    response = client.post("/passwords", headers=headers, json={
+        "title": title, "password": "x", "category_id": category_id
+    })
+    return response.json()["id"]
+
+def test_search_api_typo(client, auth_headers):
+    github = _create(client, auth_headers, "GitHub")
+    _create(client, auth_headers, "Netflix")
+    response = client.get("/passwords", params={"search": "githib"}, headers=auth_headers)
+    assert [p["id"] for p in response.json()] == [github]
+
+def test_search_with_category_filter_respects_limit(client, auth_headers, monkeypatch):
+    # Potongan kecil supaya filter category harus membaca beberapa potongan id
+    monkeypatch.setattr(routes.passwords, "SEARCH_ID_CHUNK", 4)
+    work, personal = client.get("/categories", headers=auth_headers).json()[:2]
+    for i in range(20):
+        _create(client, auth_headers, f"site {i}", work["id"] if i % 3 == 0 else personal["id"])
+    
+    response = client.get("/passwords", headers=auth_headers, params={
+        "search": "site", "category_id": work["id"], "limit": 5
+    })
+    results = response.json()
+    assert len(results) == 5
+    assert all(p["category_id"] == work["id"] for p in results)
+    # Skor sama: urut id terbaru dulu
+    assert [p["id"] for p in results] == sorted((p["id"] for p in results), reverse=True)
+    
+    all_work = client.get("/passwords", headers=auth_headers, params={"search": "site", "category_id": work["id"]})
+    assert len(all_work.json()) == 7
+
+def test_index_sees_writes_from_other_processes(client, auth_headers):
+    _create(client, auth_headers, "GitHub")
+    assert client.get("/passwords", params={"search": "dropbox"}, headers=auth_headers).json() == []
+    
+    # Tulis lewat Core (tanpa session event process ini), seperti worker lain
+    db = SessionLocal()
+    user_id = db.query(User.id).scalar()
+    db.execute(insert(Password).values(user_id=user_id, title="Dropbox", encrypted_password=""))
+    bump_versions(db, [user_id])
+    db.commit()
+    db.close()
+    
+    results = client.get("/passwords", params={"search": "dropbox"}, headers=auth_headers).json()
+    assert [p["title"] for p in results] == ["Dropbox"]
+
+def test_local_commit_does_not_hide_other_process_writes(client, auth_headers):
+    _create(client, auth_headers, "GitHub")
+    assert client.get("/passwords", params={"search": "dropbox"}, headers=auth_headers).json() == []
+    
+    db = SessionLocal()
+    user_id = db.query(User.id).scalar()
+    db.execute(insert(Password).values(user_id=user_id, title="Dropbox", encrypted_password=""))
+    bump_versions(db, [user_id])
+    db.commit()
+    db.close()
+    # Commit process ini sesudah commit process lain: index tidak boleh dianggap segar
+    _create(client, auth_headers, "Netflix")
+    
+    assert client.get("/passwords", params={"search": "dropbox"}, headers=auth_headers).json()[0]["title"] == "Dropbox"
+    assert client.get("/passwords", params={"search": "netflix"}, headers=auth_headers).json()[0]["title"] == "Netflix"
+
+def test_local_commit_keeps_index_fresh(client, auth_headers):
+    _create(client, auth_headers, "GitHub")
+    client.get("/passwords", params={"search": "github"}, headers=auth_headers)
+    db = SessionLocal()
+    user_id = db.query(User.id).scalar()
+    index = search_index._indexes[user_id]
+    
+    _create(client, auth_headers, "Netflix")
+    assert index.fingerprint == get_version(db, user_id)  # tanpa rebuild
+    assert client.get("/passwords", params={"search": "netflix"}, headers=auth_headers).json()[0]["title"] == "Netflix"
+    assert search_index._indexes[user_id] is index
+    db.close()
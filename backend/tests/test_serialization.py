@@ -0,0 +1,40 @@
+"""Fast JSON dan NDJSON: isi list sama persis, berapa pun ukuran batch stream"""
+import json
+import pytest
+import serialization
+from schemas import PasswordResponse
+
+NDJSON = {"Accept": serialization.NDJSON_MEDIA_TYPE}
+
+def _seed(client, headers, count):
+    categories = client.get("/categories", headers=headers).json()
+    for i in range(count):
+        client.post("/passwords", headers=headers, json={
+            "title": f"entry {i}",
+            "password": f"secret-{i}",
+            "username": f"user{i}" if i % 2 else None,
+            "notes": "ünïcode \"quoted\"\nline" if i % 3 == 0 else None,
+            "category_id": categories[i % len(categories)]["id"] if i % 4 else None,
+        })
+
+def _ndjson(response):
+    assert response.headers["content-type"].startswith(serialization.NDJSON_MEDIA_TYPE)
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+@pytest.mark.parametrize("params", [{}, {"search": "entry"}, {"include_category": "false"}])
+def test_ndjson_matches_json(client, auth_headers, monkeypatch, params):
+    monkeypatch.setattr(serialization, "STREAM_BATCH_SIZE", 3)  # beberapa chunk
+    _seed(client, auth_headers, 10)
+    
+    as_json = client.get("/passwords", params=params, headers=auth_headers)
+    as_ndjson = client.get("/passwords", params=params, headers={**auth_headers, **NDJSON})
+    assert as_json.status_code == as_ndjson.status_code == 200
+    assert len(as_json.json()) == 10
+    assert _ndjson(as_ndjson) == as_json.json()
+    assert as_json.headers["etag"] != as_ndjson.headers["etag"]
+    assert "Accept" in as_ndjson.headers["vary"]
+
+def test_fast_path_matches_response_model(client, auth_headers):
+    _seed(client, auth_headers, 5)
+    for item in client.get("/passwords", headers=auth_headers).json():
+        assert PasswordResponse.model_validate(item).model_dump(mode="json") == item
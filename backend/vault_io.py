@@ -0,0 +1,189 @@
+"""Helper import / export vault (CSV, JSON, NDJSON) secara streaming"""
+from collections import OrderedDict
+from typing import Iterator, Optional
+import codecs
+import csv
+import io
+import json
+import threading
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_BATCH_SIZE = 500
+MAX_TRACKED_IMPORTS = 50
+
+EXPORT_FIELDS = ["title", "username", "email", "password", "website", "notes", "category"]
+
+# Nama kolom dari password manager lain (Bitwarden, Chrome, LastPass, 1Password, ...)
+FIELD_ALIASES = {
+    "title": "title", "name": "title",
+    "username": "username", "login": "username", "login_username": "username", "user": "username",
+    "email": "email", "e-mail": "email",
+    "password": "password", "login_password": "password", "pass": "password",
+    "website": "website", "url": "website", "login_uri": "website", "uri": "website",
+    "notes": "notes", "note": "notes", "extra": "notes",
+    "category": "category", "folder": "category", "grouping": "category",
+}
+
+def normalize_entry(raw: dict) -> Optional[dict]:
+    """Map satu record ke field PasswordCreate, None kalau tidak valid"""
+    entry = {}
+    for field, value in raw.items():
+        target = FIELD_ALIASES.get(str(field).strip().lower())
+        if target and value not in (None, "") and target not in entry:
+            entry[target] = str(value).strip()
+    if not entry.get("password"):
+        return None
+    if not entry.get("title"):
+        entry["title"] = entry.get("website") or entry.get("username") or "Imported"
+    return entry
+
+def dedupe_key(website: Optional[str], username: Optional[str]) -> tuple:
+    return ((website or "").strip().lower(), (username or "").strip().lower())
+
+def iter_json_array(reader, chunk_size: int = 65536) -> Iterator[dict]:
+    """Parse JSON array besar object per object tanpa load seluruh file"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    eof = False
+    while True:
+        if not eof and len(buffer) < chunk_size:
+            data = reader.read(chunk_size)
+            if data:
+                buffer += data
+            else:
+                eof = True
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer:
+                if eof:
+                    return
+                continue
+            if buffer[0] != "[":
+                raise ValueError("JSON import must be an array of objects")
+            buffer = buffer[1:]
+            started = True
+            continue
+        if buffer.startswith(","):
+            buffer = buffer[1:]
+            continue
+        if buffer.startswith("]"):
+            return
+        if not buffer:
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError("Invalid JSON in import file")
+            # Object terpotong di batas chunk, baca lagi
+            data = reader.read(chunk_size)
+            if data:
+                buffer += data
+            else:
+                eof = True
+            continue
+        buffer = buffer[end:]
+        yield obj
+
+def iter_records(fileobj, fmt: str) -> Iterator[dict]:
+    """Iterate record dari upload (file binary) sesuai format"""
+    reader = codecs.getreader("utf-8-sig")(fileobj)
+    if fmt == "csv":
+        row_number = 0  # baris data, header tidak dihitung
+        try:
+            for row_number, row in enumerate(csv.DictReader(reader), start=1):
+                yield row
+        except csv.Error as e:
+            raise ValueError(f"Malformed CSV at row {row_number + 1}: {e}") from e
+    elif fmt == "ndjson":
+        for line in reader:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    elif fmt == "json":
+        yield from iter_json_array(reader)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+def detect_format(filename: Optional[str], declared: Optional[str]) -> str:
+    if declared:
+        return declared.lower()
+    name = (filename or "").lower()
+    if name.endswith(".ndjson") or name.endswith(".jsonl"):
+        return "ndjson"
+    if name.endswith(".json"):
+        return "json"
+    return "csv"
+
+class ImportProgress:
+    """Registry progress import in-process, bisa di-poll lewat GET /passwords/import/{id}.
+    
+    Job disimpan per (user_id, import_id): user lain tidak bisa membaca progress
+    walaupun menebak import_id.
+    """
+    
+    def __init__(self, max_tracked: int = MAX_TRACKED_IMPORTS):
+        self.max_tracked = max_tracked
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def start(self, user_id: int, import_id: str) -> dict:
+        state = {
+            "import_id": import_id,
+            "status": "running",
+            "processed": 0,
+            "imported": 0,
+            "skipped_duplicates": 0,
+            "failed": 0,
+            "chunks_committed": 0,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[(user_id, import_id)] = state
+            while len(self._jobs) > self.max_tracked:
+                self._jobs.popitem(last=False)
+        return state
+    
+    def get(self, user_id: int, import_id: str) -> Optional[dict]:
+        with self._lock:
+            state = self._jobs.get((user_id, import_id))
+            return dict(state) if state else None
+
+import_progress = ImportProgress()
+
+def _serialize_rows(rows, fmt: str) -> str:
+    if fmt == "csv":
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+        writer.writerows(rows)
+        return out.getvalue()
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+def stream_export(rows: Iterator[dict], fmt: str) -> Iterator[str]:
+    """Serialize export batch per batch supaya vault tidak pernah full di memory"""
+    if fmt == "csv":
+        yield ",".join(EXPORT_FIELDS) + "\r\n"
+    elif fmt == "json":
+        yield "["
+    first = True
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) < EXPORT_BATCH_SIZE:
+            continue
+        if fmt == "json":
+            yield ("" if first else ",") + ",".join(json.dumps(r) for r in batch)
+        else:
+            yield _serialize_rows(batch, fmt)
+        first = False
+        batch = []
+    if batch:
+        if fmt == "json":
+            yield ("" if first else ",") + ",".join(json.dumps(r) for r in batch)
+        else:
+            yield _serialize_rows(batch, fmt)
+    if fmt == "json":
+        yield "]"
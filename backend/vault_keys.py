@@ -0,0 +1,156 @@
+"""Salt per user dan pembuatan VaultKeyring dari master password.
+
+Setiap user punya salt sendiri (tabel key_salts) dengan parameter KDF-nya;
+users.key_salt_id menunjuk salt yang aktif. User lama mendapat salt saat key
+pertama kali di-derive. Key Fernet format lama (MASTER_KEY_SALT global) hanya
+ikut di-derive selama user masih punya row yang belum di-upgrade.
+
+Kalau KDF_ITERATIONS dinaikkan (lihat kdf_calibrate.py), login berikutnya
+membuat salt baru dengan iterasi baru. Salt lama tetap di-derive selama masih
+ada envelope yang memakainya; row itu di-upgrade lazy saat dibuka / diedit.
+"""
+from dataclasses import dataclass
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, Tuple
+import os
+import struct
+from database import SessionLocal
+from models import User, Password, KeySalt, RotationJob
+from security import SecurityManager, VaultKeyring, KDF_ITERATIONS, ENVELOPE_SALT_ID_OFFSET, run_crypto
+
+SALT_SIZE = 16
+
+@dataclass(frozen=True)
+class KeyParams:
+    salt_id: int
+    salt: bytes
+    iterations: int
+    has_legacy_rows: bool = False
+    previous: Tuple[Tuple[int, bytes, int], ...] = ()  # (salt id, salt, iterasi) lama yang masih dipakai row
+
+def create_key_salt(db: Session, user_id: int, iterations: int = KDF_ITERATIONS) -> KeySalt:
+    """Tambah salt baru untuk user (belum aktif sampai users.key_salt_id diisi)"""
+    key_salt = KeySalt(user_id=user_id, salt=os.urandom(SALT_SIZE), kdf="pbkdf2-sha256", iterations=iterations)
+    db.add(key_salt)
+    db.flush()
+    return key_salt
+
+def _params(key_salt: KeySalt, has_legacy_rows: bool = False, previous: tuple = ()) -> KeyParams:
+    return KeyParams(key_salt.id, bytes(key_salt.salt), key_salt.iterations, has_legacy_rows, previous)
+
+def _activate_salt(db: Session, user_id: int, current_salt_id: Optional[int], iterations: int = KDF_ITERATIONS) -> int:
+    """Buat salt baru dan jadikan aktif, return salt id yang aktif setelahnya"""
+    key_salt = create_key_salt(db, user_id, iterations)
+    # Conditional update: request paralel tidak boleh mengaktifkan salt yang berbeda
+    current = User.key_salt_id.is_(None) if current_salt_id is None else User.key_salt_id == current_salt_id
+    claimed = db.execute(
+        update(User).where(User.id == user_id, current).values(key_salt_id=key_salt.id)
+    ).rowcount
+    if claimed:
+        db.commit()
+        return key_salt.id
+    db.rollback()
+    return db.query(User.key_salt_id).filter(User.id == user_id).scalar()
+
+def _salts_in_use(db: Session, user_id: int) -> Tuple[set, bool]:
+    """(salt id di envelope milik user, apakah masih ada row format lama) dalam satu GROUP BY"""
+    salt_bytes = func.substr(Password.ciphertext, ENVELOPE_SALT_ID_OFFSET + 1, 4)
+    salt_ids, has_legacy = set(), False
+    for value, in db.query(salt_bytes).filter(Password.user_id == user_id).group_by(salt_bytes):
+        if value is None:
+            has_legacy = True  # ciphertext NULL: masih token Fernet lama
+        else:
+            salt_ids.add(struct.unpack(">I", bytes(value))[0])
+    return salt_ids, has_legacy
+
+def load_key_params(user_id: int, upgrade: bool = False) -> KeyParams:
+    """Salt aktif user (dibuat kalau belum ada), salt lama yang masih dipakai dan
+    apakah masih ada row format lama.
+    
+    `upgrade` (saat login): kalau iterasi salt aktif di bawah KDF_ITERATIONS,
+    aktifkan salt baru dengan iterasi sekarang.
+    """
+    db = SessionLocal()
+    try:
+        salt_id = db.query(User.key_salt_id).filter(User.id == user_id).scalar()
+        if salt_id is None:
+            salt_id = _activate_salt(db, user_id, None)
+        key_salt = db.get(KeySalt, salt_id)
+        if upgrade and key_salt.iterations < KDF_ITERATIONS:
+            # Jangan ganti salt di tengah rotasi master password: job memakai keyring yang sudah di-derive
+            rotating = db.query(
+                db.query(RotationJob.id).filter(RotationJob.user_id == user_id, RotationJob.status != "completed").exists()
+            ).scalar()
+            if not rotating:
+                salt_id = _activate_salt(db, user_id, key_salt.id)
+                key_salt = db.get(KeySalt, salt_id)
+                print(f"🔑 Raised KDF iterations for user {user_id} to {key_salt.iterations}")
+    
+        salt_ids, has_legacy = _salts_in_use(db, user_id)
+        salt_ids.discard(key_salt.id)
+        previous = ()
+        if salt_ids:
+            # Salt tujuan rotasi yang belum selesai milik master password baru, tidak bisa di-derive di sini
+            rotation_salts = db.query(RotationJob.new_key_salt_id).filter(
+                RotationJob.user_id == user_id, RotationJob.status != "completed"
+            )
+            old_salts = db.query(KeySalt).filter(
+                KeySalt.user_id == user_id,
+                KeySalt.id.in_(salt_ids),
+                KeySalt.id.notin_(rotation_salts.scalar_subquery())
+            ).all()
+            previous = tuple((old.id, bytes(old.salt), old.iterations) for old in old_salts)
+        return _params(key_salt, has_legacy, previous)
+    finally:
+        db.close()
+
+def new_key_params(user_id: int) -> KeyParams:
+    """Salt baru yang belum aktif (untuk rotasi master password)"""
+    db = SessionLocal()
+    try:
+        key_salt = create_key_salt(db, user_id)
+        db.commit()
+        return _params(key_salt)
+    finally:
+        db.close()
+
+def get_key_params(salt_id: int) -> KeyParams:
+    db = SessionLocal()
+    try:
+        return _params(db.get(KeySalt, salt_id))
+    finally:
+        db.close()
+
+def build_keyring(master_password: str, params: KeyParams) -> VaultKeyring:
+    """Versi sync (setup / script), derive langsung di thread pemanggil"""
+    key, legacy_key, previous = SecurityManager.derive_vault_keys(
+        master_password, params.salt, params.iterations, params.has_legacy_rows, params.previous
+    )
+    return VaultKeyring(params.salt_id, key, legacy_key, params.iterations, previous)
+
+async def derive_keyring(master_password: str, user_id: int, params: Optional[KeyParams] = None,
+                         upgrade: bool = False) -> VaultKeyring:
+    """Keyring untuk master password yang sudah diverifikasi, PBKDF2 jalan di kdf_service"""
+    if params is None:
+        params = await run_in_threadpool(load_key_params, user_id, upgrade)
+    key, legacy_key, previous = await run_crypto(
+        SecurityManager.derive_vault_keys, master_password, params.salt, params.iterations,
+        params.has_legacy_rows, params.previous
+    )
+    return VaultKeyring(params.salt_id, key, legacy_key, params.iterations, previous)
+
+def upgrade_secret(db: Session, password: Password, old_stored, envelope: bytes) -> bool:
+    """Lazy upgrade satu row ke envelope (compare-and-set, updated_at / change_seq tidak berubah)"""
+    table = Password.__table__
+    stmt = update(table).where(table.c.id == password.id)
+    if isinstance(old_stored, str):
+        stmt = stmt.where(table.c.ciphertext.is_(None), table.c.encrypted_password == old_stored)
+    else:
+        stmt = stmt.where(table.c.ciphertext == bytes(old_stored))
+    updated = db.execute(
+        stmt.values(ciphertext=envelope, encrypted_password="", updated_at=table.c.updated_at)
+    ).rowcount
+    db.commit()
+    return bool(updated)
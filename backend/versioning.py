@@ -0,0 +1,162 @@
+"""Vault version counter per user dan helper ETag untuk conditional GET.
+
+Setiap flush yang mengubah Password / Category menaikkan `version`, setiap
+ActivityLog baru menaikkan `activity_version`. List endpoint cukup membaca
+satu row (primary key) untuk menjawab If-None-Match dengan 304.
+
+Version yang sama juga dipakai sebagai change sequence untuk delta sync:
+row yang berubah mendapat `change_seq` = version baru, row yang dihapus
+meninggalkan Tombstone dengan sequence yang sama. Tombstone yang lebih tua dari
+TOMBSTONE_RETENTION_DAYS di-prune; client dengan cursor di bawah
+`tombstone_horizon` mendapat snapshot penuh (reset) di sync berikutnya.
+"""
+from datetime import datetime, timedelta
+from fastapi import Request, Response
+from sqlalchemy import event, func, select, update, insert
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Optional
+import hashlib
+import os
+from models import Password, Category, ActivityLog, VaultVersion, Tombstone
+
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "90"))  # 0 = simpan tombstone selamanya
+
+# session.info: {user_id: (version sebelum transaksi ini, version terakhir yang dinaikkan transaksi ini)}
+VERSION_RANGE_KEY = "vault_version_range"
+
+def bump_versions(db: Session, user_ids: Iterable[int], vault: bool = True, activity: bool = False) -> Dict[int, int]:
+    """Naikkan counter user di transaksi yang sedang berjalan.
+    
+    Return {user_id: vault version baru} kalau `vault` dinaikkan. UPDATE mengunci
+    row version sampai commit, jadi sequence per user urut sesuai urutan commit.
+    Range version transaksi ini dicatat di session.info[VERSION_RANGE_KEY]
+    (dipakai search index untuk tahu version yang di-commit process ini).
+    """
+    values = {}
+    if vault:
+        values["version"] = VaultVersion.version + 1
+    if activity:
+        values["activity_version"] = VaultVersion.activity_version + 1
+    for user_id in set(user_ids):
+        result = db.execute(update(VaultVersion).where(VaultVersion.user_id == user_id).values(**values))
+        if result.rowcount == 0:
+            db.execute(insert(VaultVersion).values(
+                user_id=user_id,
+                version=1 if vault else 0,
+                activity_version=1 if activity else 0
+            ))
+    if not vault:
+        return {}
+    rows = db.execute(select(VaultVersion.user_id, VaultVersion.version).where(
+        VaultVersion.user_id.in_(set(user_ids))
+    ))
+    versions = dict(rows.all())
+    ranges = db.info.setdefault(VERSION_RANGE_KEY, {})
+    for user_id, version in versions.items():
+        start = ranges[user_id][0] if user_id in ranges else version - 1
+        ranges[user_id] = (start, version)
+    return versions
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_flush(session, flush_context, instances):
+    vault_users, activity_users = set(), set()
+    changed, deleted = [], []
+    for obj in session.new:
+        if isinstance(obj, (Password, Category)):
+            changed.append(obj)
+        elif isinstance(obj, ActivityLog):
+            activity_users.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, (Password, Category)) and session.is_modified(obj):
+            changed.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, (Password, Category)):
+            deleted.append(obj)
+    for obj in changed + deleted:
+        vault_users.add(obj.user_id)
+    vault_users.discard(None)
+    activity_users.discard(None)
+    if vault_users:
+        versions = bump_versions(session, vault_users, vault=True, activity=False)
+        for obj in changed:
+            obj.change_seq = versions.get(obj.user_id, 0)
+        for obj in deleted:
+            seq = versions.get(obj.user_id, 0)
+            session.add(Tombstone(
+                user_id=obj.user_id,
+                entity="password" if isinstance(obj, Password) else "category",
+                entity_id=obj.id,
+                change_seq=seq
+            ))
+            if isinstance(obj, Category):
+                # Password di category ini jadi tanpa category, client harus ikut tahu
+                session.execute(update(Password).where(Password.category_id == obj.id).values(
+                    category_id=None, change_seq=seq
+                ))
+    if activity_users:
+        bump_versions(session, activity_users, vault=False, activity=True)
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_soft_rollback")
+def _reset_version_range(session, *args):
+    session.info.pop(VERSION_RANGE_KEY, None)
+
+def prune_tombstones(db: Session, retention_days: int = TOMBSTONE_RETENTION_DAYS, now: Optional[datetime] = None) -> int:
+    """Hapus tombstone yang lebih tua dari retention dan majukan tombstone_horizon user.
+    
+    Per user semua tombstone sampai seq tertinggi yang kadaluarsa ikut dihapus,
+    jadi seq <= horizon selalu sudah hilang dan seq > horizon selalu masih ada.
+    """
+    if retention_days <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    horizons = db.query(Tombstone.user_id, func.max(Tombstone.change_seq)).filter(
+        Tombstone.deleted_at < cutoff
+    ).group_by(Tombstone.user_id).all()
+    deleted = 0
+    for user_id, horizon in horizons:
+        db.execute(update(VaultVersion).where(
+            VaultVersion.user_id == user_id,
+            VaultVersion.tombstone_horizon < horizon
+        ).values(tombstone_horizon=horizon))
+        deleted += db.query(Tombstone).filter(
+            Tombstone.user_id == user_id,
+            Tombstone.change_seq <= horizon
+        ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def version_query(user_id: int, column):
+    return select(column).where(VaultVersion.user_id == user_id)
+
+def get_version(db: Session, user_id: int, column=VaultVersion.version) -> int:
+    return db.execute(version_query(user_id, column)).scalar() or 0
+
+def make_etag(prefix: str, version: int, request: Request, variant: str = "") -> str:
+    """Strong ETag dari version + query params (hasil beda per filter / halaman).
+    
+    `variant` untuk representasi hasil content negotiation (misal media type),
+    supaya JSON dan NDJSON tidak berbagi ETag.
+    """
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{variant}|{params}".encode()).hexdigest()[:12]
+    return f'"{prefix}-{version}-{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def not_modified(etag: str, vary: str = "") -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if vary:
+        headers["Vary"] = vary
+    return Response(status_code=304, headers=headers)
+
+def set_etag(response: Response, etag: str, vary: str = "") -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if vary:
+        response.headers["Vary"] = vary
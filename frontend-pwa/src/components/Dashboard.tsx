@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { passwordService, type Password } from '../services/password'
-import { categoryService, type Category } from '../services/category'
+import { dashboardService, type CategoryCount } from '../services/dashboard'
 import PasswordCard from './PasswordCard'
 import PasswordForm from './PasswordForm'
 import ConfirmModal from './ConfirmModal'
@@ -16,7 +16,7 @@ type View = 'passwords' | 'categories' | 'audit'
 
 export default function Dashboard({ onLogout }: DashboardProps) {
     const [passwords, setPasswords] = useState<Password[]>([])
-    const [categories, setCategories] = useState<Category[]>([])
+    const [categories, setCategories] = useState<CategoryCount[]>([])
     const [loading, setLoading] = useState(true)
     const [showForm, setShowForm] = useState(false)
     const [editingPassword, setEditingPassword] = useState<Password | null>(null)
@@ -38,12 +38,25 @@ export default function Dashboard({ onLogout }: DashboardProps) {
 
     const loadData = async () => {
         try {
-            const [passwordsData, categoriesData] = await Promise.all([
-                passwordService.getAll(),
-                categoryService.getAll()
-            ])
-            setPasswords(passwordsData)
-            setCategories(categoriesData)
+            // First paint from one request, remaining pages load in the background
+            const summary = await dashboardService.getSummary()
+            setPasswords(summary.passwords)
+            setCategories(summary.categories)
+            setLoading(false)
+
+            let cursor = summary.next_cursor
+            const loaded = [...summary.passwords]
+            let published = loaded.length
+            while (cursor) {
+                const page = await passwordService.getPage(200, cursor)
+                loaded.push(...page.items)
+                cursor = page.nextCursor
+                // Re-render once the list has doubled (and after the last page), so copying stays linear
+                if (!cursor || loaded.length >= published * 2) {
+                    setPasswords(loaded.slice())
+                    published = loaded.length
+                }
+            }
         } catch (error) {
             console.error('Failed to load data:', error)
         } finally {
@@ -231,7 +244,7 @@ export default function Dashboard({ onLogout }: DashboardProps) {
                                             borderRadius: '50%',
                                             background: selectedCategory === category.id ? 'white' : category.color
                                         }}></div>
-                                        {category.name}
+                                        {category.name} ({category.password_count})
                                     </button>
                                 ))}
                             </div>
@@ -6,6 +6,21 @@ interface AuthResponse {
     message: string;
 }
 
+export interface RotationJob {
+    job_id: number;
+    status: 'running' | 'interrupted' | 'failed' | 'completed';
+    total: number;
+    processed: number;
+    failed: number;
+    failed_ids: number[];
+    checkpoint: number;
+    rows_per_second: number;
+    eta_seconds: number | null;
+    started_at: string | null;
+    finished_at: string | null;
+    error: string | null;
+}
+
 interface SetupCheckResponse {
     setup_complete: boolean;
     biometric_enabled: boolean;
@@ -47,11 +62,30 @@ export const authService = {
         return token;
     },
 
+    // Change master password; the vault is re-encrypted in the background.
+    // Calling it again with the same passwords resumes an interrupted job.
+    async rotateMasterPassword(currentPassword: string, newPassword: string): Promise<RotationJob> {
+        const response = await api.post<RotationJob>('/auth/master-password/rotate', {
+            current_master_password: currentPassword,
+            new_master_password: newPassword
+        });
+        return response.data;
+    },
+
+    // Progress of the latest rotation job (all sessions are revoked once it completes)
+    async getRotationProgress(): Promise<RotationJob> {
+        const response = await api.get<RotationJob>('/auth/master-password/rotation');
+        return response.data;
+    },
+
     // Logout
     logout() {
-        localStorage.removeItem('auth_token');
-        localStorage.removeItem('user_id');
-        window.location.href = '/';
+        // Wipe the session's derived key on the server before dropping the token
+        api.post('/auth/logout').catch(() => undefined).finally(() => {
+            localStorage.removeItem('auth_token');
+            localStorage.removeItem('user_id');
+            window.location.href = '/';
+        });
     },
 
     // Check if user is authenticated
@@ -0,0 +1,28 @@
+import api from './api';
+import type { Password } from './password';
+import type { Category } from './category';
+import type { ActivityLog } from './history';
+
+export interface CategoryCount extends Category {
+    icon?: string;
+    is_default: boolean;
+    password_count: number;
+}
+
+export interface DashboardSummary {
+    total_passwords: number;
+    uncategorized: number;
+    categories: CategoryCount[];
+    passwords: Password[];
+    next_cursor: string | null;
+    history: ActivityLog[];
+    history_next_cursor: string | null;
+}
+
+export const dashboardService = {
+    // Categories with counts, first page of passwords and latest history in one request
+    async getSummary(limit: number = 50, historyLimit: number = 10): Promise<DashboardSummary> {
+        const response = await api.get('/dashboard/summary', { params: { limit, history_limit: historyLimit } });
+        return response.data;
+    }
+};
@@ -13,5 +13,11 @@ export const historyService = {
     async getAll(limit: number = 50): Promise<ActivityLog[]> {
         const response = await api.get('/history', { params: { limit } });
         return response.data;
+    },
+
+    // Get one page of activity history; nextCursor is null on the last page
+    async getPage(limit: number = 50, cursor?: string | null): Promise<{ items: ActivityLog[]; nextCursor: string | null }> {
+        const response = await api.get('/history', { params: { limit, cursor: cursor ?? undefined } });
+        return { items: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
     }
 };
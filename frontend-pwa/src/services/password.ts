@@ -19,6 +19,24 @@ export const passwordService = {
         return response.data;
     },
 
+    // Get one page of passwords (newest first); nextCursor is null on the last page
+    async getPage(limit: number = 50, cursor?: string | null): Promise<{ items: Password[]; nextCursor: string | null }> {
+        const response = await api.get('/passwords', { params: { limit, cursor: cursor ?? undefined } });
+        return { items: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
+    },
+
+    // Delta sync: entries changed since the last cursor (apply `deleted` first, then upsert)
+    async getChanges(since: number = 0): Promise<{
+        cursor: number;
+        reset: boolean;
+        passwords: Password[];
+        categories: { id: number; name: string; color: string; icon?: string; is_default: boolean }[];
+        deleted: { entity: 'password' | 'category'; entity_id: number; deleted_at: string }[];
+    }> {
+        const response = await api.get('/passwords/changes', { params: { since } });
+        return response.data;
+    },
+
     // Get single password
     async getById(id: number): Promise<Password> {
         const response = await api.get(`/passwords/${id}`);
@@ -51,9 +69,42 @@ export const passwordService = {
         return response.data.password;
     },
 
+    // Generate many candidates at once (random, pronounceable or passphrase) with strength info
+    async generateBatch(count: number, options: {
+        mode?: 'random' | 'pronounceable' | 'passphrase';
+        length?: number;
+        words?: number;
+        include_symbols?: boolean;
+    } = {}): Promise<{ password: string; entropy_bits: number; score: number; strength: string }[]> {
+        const response = await api.post('/passwords/generate', { ...options, count });
+        return response.data.candidates;
+    },
+
+    // Check every stored password against the server's local breach corpus
+    async breachAudit(): Promise<{
+        checked: number;
+        breached: { id: number; title: string }[];
+        reused: number[][];
+        failed: number[];
+        corpus_size: number;
+        elapsed_ms: number;
+    }> {
+        const response = await api.get('/passwords/breach-audit');
+        return response.data;
+    },
+
     // Decrypt password
     async decrypt(id: number): Promise<string> {
         const response = await api.post<{ password: string }>(`/passwords/${id}/decrypt`);
         return response.data.password;
+    },
+
+    // Decrypt many passwords in one round trip (export / vault health)
+    async decryptBatch(ids: number[], action: 'copied' | 'viewed' = 'viewed'): Promise<Record<number, string>> {
+        const response = await api.post<{ passwords: { id: number; password: string }[] }>(
+            '/passwords/decrypt-batch',
+            { ids, action }
+        );
+        return Object.fromEntries(response.data.passwords.map((p) => [p.id, p.password]));
     }
 };